@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the vpplib import time.
+
+Every statement is timed in a fresh interpreter, as a short-lived worker
+process would pay it. Besides the wall time the benchmark lists which heavy
+third-party packages got imported, so that an eager import sneaking back
+into a module is caught. With --max-seconds the script exits with an error
+if ``import vpplib`` is slower than the given limit.
+
+Usage::
+
+    python benchmarks/bench_import_time.py --repeat 5 --max-seconds 1.5
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+statements = {
+    "baseline": "import pandas",
+    "package": "import vpplib",
+    "electrical_energy_storage": "from vpplib import ElectricalEnergyStorage",
+    "virtual_power_plant": "from vpplib import VirtualPowerPlant",
+    "all": "from vpplib import *",
+}
+
+heavy_modules = (
+    "pandapower",
+    "wetterdienst",
+    "polars",
+    "pvlib",
+    "windpowerlib",
+    "matplotlib",
+    "PySAM",
+)
+
+_probe = """
+import sys, time
+start = time.perf_counter()
+{statement}
+duration = time.perf_counter() - start
+heavy = [m for m in {heavy_modules!r} if m in sys.modules]
+print(repr((duration, heavy)))
+"""
+
+
+def measure(statement, repeat=5):
+    """Time a statement in fresh interpreters, return the best of repeat."""
+    durations = []
+    heavy = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _probe.format(
+                statement=statement, heavy_modules=heavy_modules)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        duration, heavy = eval(output.strip().splitlines()[-1])
+        durations.append(duration)
+    return {"seconds": min(durations), "heavy_modules": heavy}
+
+
+def run(repeat=5):
+    """Run the benchmark and return the measured values."""
+    return {
+        "benchmark": "import_time",
+        "python": sys.version.split()[0],
+        "repeat": repeat,
+        "results": {
+            name: measure(statement, repeat)
+            for name, statement in statements.items()
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    result = run(args.repeat)
+    print(json.dumps(result, indent=2))
+
+    package = result["results"]["package"]
+    if package["heavy_modules"]:
+        sys.exit("import vpplib loads " + ", ".join(package["heavy_modules"]))
+    if args.max_seconds is not None and package["seconds"] > args.max_seconds:
+        sys.exit("import vpplib took {:.2f} s (limit {:.2f} s)".format(
+            package["seconds"], args.max_seconds))
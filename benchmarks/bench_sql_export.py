@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of VirtualPowerPlant.export_components_to_sql.
+
+Builds a virtual power plant from the prepared pv, wind, heat pump and
+electric vehicle templates of bench_suite.py (in equal shares, on the
+bundled input/ data) and measures the export to ./Results/<name>.sqlite.
+--steps is rounded up to whole days of 2015.
+
+Usage::
+
+    python benchmarks/bench_sql_export.py --components 1000 --steps 35040
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+
+# bench_suite puts the repository on sys.path before importing vpplib
+from bench_suite import Context, _prepared_virtual_power_plant, _templates
+
+
+def build_virtual_power_plant(n_components, n_steps):
+    """Create a virtual power plant of prepared components."""
+    context = Context(days=max(1, math.ceil(n_steps / 96)))
+    kinds = len(_templates(context))
+    return _prepared_virtual_power_plant(
+        context, max(1, math.ceil(n_components / kinds)))
+
+
+def run(n_components=1000, n_steps=35040, name="benchmark_sql_export"):
+    """Run the benchmark and return the measured values."""
+    os.makedirs("./Results", exist_ok=True)
+    vpp = build_virtual_power_plant(n_components, n_steps)
+    n_components = len(vpp.components)
+    n_steps = len(next(iter(vpp.components.values())).timeseries)
+
+    start = time.perf_counter()
+    vpp.export_components_to_sql(name=name, replace=True)
+    duration = time.perf_counter() - start
+
+    path = "./Results/" + name + ".sqlite"
+    rows = n_components * n_steps
+    return {
+        "benchmark": "export_components_to_sql",
+        "components": n_components,
+        "steps": n_steps,
+        "rows": rows,
+        "seconds": duration,
+        "rows_per_second": rows / duration,
+        "file_size_bytes": os.path.getsize(path),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--components", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=35040)
+    parser.add_argument("--name", default="benchmark_sql_export")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.components, args.steps, args.name), indent=2))
@@ -0,0 +1,588 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite of vpplib, driven by the bundled input/ data.
+
+Times and memory-profiles (peak of tracemalloc) prepare_time_series of
+every component class, UserProfile.get_thermal_energy_demand, the closed
+loop of ThermalEnergyStorage and HeatPump, Operator.run_base_scenario on a
+pandapower example grid and the export functions of VirtualPowerPlant, for
+every combination of horizon (days from 2015-01-01) and component count.
+No data is downloaded.
+
+The results are written as JSON to --output (default: the temporary
+directory of the system). The exports and the SimSES results of the
+benchmarks are written below --workdir (default: a temporary directory,
+removed afterwards), so nothing is left in the current directory. The
+script exits with an error if a benchmark failed and, with --compare, if a
+benchmark is slower than in a previous result file by more than
+--tolerance, so regressions show up across versions. Benchmarks in ISOLATED run in a child process, because
+they leave threads behind which keep the interpreter from exiting.
+
+vpplib is imported from the repository containing this script, so it does
+not have to be installed.
+
+Usage::
+
+    python benchmarks/bench_suite.py --days 1 7 --components 1 10
+    python benchmarks/bench_suite.py --only prepare_ --compare old.json
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+os.environ.setdefault("TQDM_DISABLE", "1")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import vpplib  # noqa: E402
+from vpplib import (  # noqa: E402
+    BatteryElectricVehicle,
+    CombinedHeatAndPower,
+    ElectricalEnergyStorage,
+    Environment,
+    HeatingRod,
+    HeatPump,
+    Operator,
+    Photovoltaic,
+    ThermalEnergyStorage,
+    UserProfile,
+    VirtualPowerPlant,
+    WindPower,
+)
+
+START = "2015-01-01 00:00:00"
+
+
+# %% inputs
+class Context(object):
+    """Environment and shared inputs of one horizon."""
+
+    def __init__(self, days):
+        self.days = days
+        self.templates = None
+        end = pd.Timestamp(START) + pd.Timedelta(days=days) - pd.Timedelta(
+            minutes=15)
+        self.environment = Environment(
+            timebase=15, start=START, end=str(end), year="2015",
+            time_freq="15 min",
+        )
+        environment = self.environment
+        environment.get_pv_data(os.path.join(ROOT, "input/pv/dwd_pv_data_2015.csv"))
+        environment.get_wind_data(os.path.join(ROOT, "input/wind/dwd_wind_data_2015.csv"),
+                                  utc=False)
+        environment.get_mean_temp_days(os.path.join(ROOT, "input/thermal/dwd_temp_days_2015.csv"))
+        environment.get_mean_temp_hours(
+            os.path.join(ROOT, "input/thermal/dwd_temp_hours_2015.csv"))
+        environment.mean_temp_days.index = pd.to_datetime(
+            environment.mean_temp_days.index)
+        environment.mean_temp_hours.index = pd.to_datetime(
+            environment.mean_temp_hours.index)
+        environment.mean_temp_quarter_hours = (
+            environment.mean_temp_hours.resample("15 Min").interpolate())
+
+        self.user_profile = user_profile(environment)
+        self.user_profile.get_thermal_energy_demand()
+        self.thermal_energy_demand = self.user_profile.thermal_energy_demand
+
+        # synthetic house load minus pv generation
+        pv = photovoltaic(environment, 0)
+        pv.prepare_time_series()
+        generation = pv.timeseries.iloc[:, 0]
+        steps = np.arange(len(generation))
+        load = 0.5 + 0.3 * np.sin(2 * np.pi * steps / 96)
+        self.residual_load = pd.Series(load - generation.to_numpy(),
+                                       index=generation.index)
+
+
+def user_profile(environment):
+    return UserProfile(
+        identifier="bench", latitude=None, longitude=None,
+        thermal_energy_demand_yearly=12500,
+        mean_temp_days=environment.mean_temp_days,
+        mean_temp_hours=environment.mean_temp_hours,
+        mean_temp_quarter_hours=environment.mean_temp_quarter_hours,
+        building_type="DE_HEF33", comfort_factor=None, t_0=40,
+    )
+
+
+def photovoltaic(environment, i):
+    return Photovoltaic(
+        unit="kW", identifier="bus%d_pv" % i, environment=environment,
+        latitude=50.94, longitude=6.96, module_lib="SandiaMod",
+        module="Canadian_Solar_CS5P_220M___2009_",
+        inverter_lib="cecinverter",
+        inverter="ABB__MICRO_0_25_I_OUTD_US_208__208V_", surface_tilt=20,
+        surface_azimuth=200, modules_per_string=2, strings_per_inverter=1,
+        temp_lib="sapm", temp_model="open_rack_glass_glass",
+    )
+
+
+def wind_power(environment, i):
+    return WindPower(
+        unit="kW", identifier="bus%d_wea" % i, environment=environment,
+        turbine_type="E-126/4200", hub_height=135, rotor_diameter=127,
+        fetch_curve="power_curve", data_source="oedb",
+        wind_speed_model="logarithmic", density_model="ideal_gas",
+        temperature_model="linear_gradient",
+        power_output_model="power_curve", density_correction=True,
+        obstacle_height=0, hellman_exp=None,
+    )
+
+
+def heat_pump(context, i):
+    return HeatPump(
+        identifier="bus%d_hp" % i, unit="kW",
+        environment=context.environment,
+        thermal_energy_demand=context.thermal_energy_demand,
+        heat_pump_type="Air", heat_sys_temp=60, el_power=5, th_power=8,
+        ramp_up_time=1 / 15, ramp_down_time=1 / 15, min_runtime=1,
+        min_stop_time=2,
+    )
+
+
+def battery_electric_vehicle(environment, i):
+    return BatteryElectricVehicle(
+        unit="kW", identifier="bus%d_bev" % i, environment=environment,
+        battery_max=16, battery_min=0, battery_usage=1, charging_power=11,
+        load_degradation_begin=0.8, charge_efficiency=0.98,
+    )
+
+
+def electrical_energy_storage(context, i):
+    storage = ElectricalEnergyStorage(
+        unit="kWh", identifier="bus%d_storage" % i,
+        environment=context.environment, capacity=5,
+        charge_efficiency=0.98, discharge_efficiency=0.98, max_power=2.5,
+        max_c=1,
+    )
+    storage.residual_load = context.residual_load
+    return storage
+
+
+def combined_heat_and_power(context, i):
+    return CombinedHeatAndPower(
+        unit="kW", identifier="bus%d_chp" % i,
+        environment=context.environment,
+        thermal_energy_demand=context.thermal_energy_demand, el_power=4,
+        th_power=6, overall_efficiency=0.8, ramp_up_time=1 / 15,
+        ramp_down_time=1 / 15, min_runtime=1, min_stop_time=2,
+    )
+
+
+def heating_rod(context, i):
+    return HeatingRod(
+        thermal_energy_demand=context.thermal_energy_demand, unit="kW",
+        identifier="bus%d_hr" % i, environment=context.environment,
+        el_power=5, rampUpTime=0, rampDownTime=0, min_runtime=0,
+        min_stop_time=0, efficiency=0.95,
+    )
+
+
+def thermal_energy_storage(context, i):
+    return ThermalEnergyStorage(
+        environment=context.environment, identifier="bus%d_tes" % i,
+        target_temperature=60, min_temperature=40, hysteresis=5, mass=500,
+        cp=4.2, thermal_energy_loss_per_day=0.13, unit="kWh",
+    )
+
+
+# %% benchmarks
+# Every benchmark takes the context and the component count, does its setup
+# and returns the function that is measured.
+def _prepare(factory, method="prepare_time_series"):
+    def setup(context, n):
+        random.seed(0)
+        components = [factory(context, i) for i in range(n)]
+
+        def work():
+            for component in components:
+                getattr(component, method)()
+
+        return work
+
+    return setup
+
+
+def _pysam_battery(context, n):
+    from vpplib.electrical_energy_storage import PySAMBatteryStateful
+
+    storages = []
+    for i in range(n):
+        storage = PySAMBatteryStateful(
+            identifier="bus%d_storage" % i, environment=context.environment)
+        storage.init_battery_stateful(nominal_energy=20)
+        storage.residual_load = context.residual_load
+        storages.append(storage)
+
+    def work():
+        for storage in storages:
+            storage.prepare_time_series()
+
+    return work
+
+
+def _electrolysis(context, n):
+    from vpplib.hydrogen import ElectrolysisSimses
+
+    os.makedirs("./Results/SimSES", exist_ok=True)
+    units = []
+    for i in range(n):
+        unit = ElectrolysisSimses(
+            electrolyzer_power=4, fuelcell_power=None, tank_size=700,
+            capacity=4, soc_start=0.1, soc_min=0.1, soc_max=0.9,
+            identifier="bus%d_h2" % i,
+            result_path="./Results/SimSES/bench_%d" % i,
+            environment=context.environment, unit="kW",
+        )
+        unit.residual_load = context.residual_load
+        units.append(unit)
+
+    def work():
+        for unit in units:
+            unit.prepare_time_series()
+
+    return work
+
+
+def _thermal_energy_demand(context, n):
+    profiles = [user_profile(context.environment) for _ in range(n)]
+
+    def work():
+        for profile in profiles:
+            profile.get_thermal_energy_demand()
+
+    return work
+
+
+def _thermal_storage_loop(context, n):
+    pairs = []
+    for i in range(n):
+        pairs.append((thermal_energy_storage(context, i),
+                      heat_pump(context, i)))
+
+    def work():
+        for storage, hp in pairs:
+            for timestamp in hp.timeseries.index:
+                storage.operate_storage(timestamp, hp)
+
+    return work
+
+
+def _templates(context):
+    """Prepared components copied into the virtual power plants."""
+    if context.templates is None:
+        environment = context.environment
+        context.templates = {
+            "pv": photovoltaic(environment, 0),
+            "wea": wind_power(environment, 0),
+            "hp": heat_pump(context, 0),
+            "bev": battery_electric_vehicle(environment, 0),
+        }
+        random.seed(0)
+        for component in context.templates.values():
+            component.prepare_time_series()
+    return context.templates
+
+
+def _prepared_virtual_power_plant(context, n):
+    vpp = VirtualPowerPlant("bench")
+    for i in range(n):
+        for kind, template in _templates(context).items():
+            component = copy.copy(template)
+            component.identifier = "bus%d_%s" % (i, kind)
+            component.bus = "bus%d" % i
+            timeseries = template.timeseries
+            if kind == "pv":
+                timeseries = timeseries.rename(
+                    columns={template.identifier: component.identifier})
+            component.timeseries = timeseries
+            vpp.add_component(component)
+    return vpp
+
+
+def _base_scenario(context, n):
+    import pandapower as pp
+    import pandapower.networks as pn
+
+    net = pn.create_kerber_landnetz_kabel_1()
+    net.load["type"] = "baseload"
+    net.load["name"] = ["load%d_baseload" % i for i in net.load.index]
+    buses = net.load.bus.unique()
+
+    template = _templates(context)
+    vpp = VirtualPowerPlant("bench")
+    for i in range(n):
+        bus = buses[i % len(buses)]
+        pv = copy.copy(template["pv"])
+        pv.identifier = "bus%d_pv%d" % (bus, i)
+        pv.timeseries = template["pv"].timeseries.rename(
+            columns={template["pv"].identifier: pv.identifier})
+        vpp.add_component(pv)
+        pp.create_sgen(net, bus=bus, name=pv.identifier, p_mw=0.0)
+        hp = copy.copy(template["hp"])
+        hp.identifier = "bus%d_hp%d" % (bus, i)
+        vpp.add_component(hp)
+        pp.create_load(net, bus=bus, name=hp.identifier, p_mw=0.0, type="HP")
+
+    index = template["pv"].timeseries.index
+    steps = np.arange(len(index))
+    baseload = pd.DataFrame(
+        {str(bus): 2000 + 1000 * np.sin(2 * np.pi * steps / 96)
+         for bus in net.bus.index},
+        index=index,
+    )
+    operator = Operator(virtual_power_plant=vpp, net=net, target_data=None)
+
+    def work():
+        operator.run_base_scenario(baseload)
+
+    return work
+
+
+def _export(method):
+    def setup(context, n):
+        vpp = _prepared_virtual_power_plant(context, n)
+        os.makedirs("./Results", exist_ok=True)
+
+        def work():
+            if method == "export_components":
+                vpp.export_components(context.environment)
+            elif method == "export_components_to_sql":
+                vpp.export_components_to_sql(name="bench_suite",
+                                             replace=True)
+            elif method == "export_to_parquet":
+                vpp.export_to_parquet("./Results/bench_suite_parquet")
+            else:
+                getattr(vpp, method)()
+
+        return work
+
+    return setup
+
+
+benchmarks = {
+    "prepare_photovoltaic": _prepare(
+        lambda context, i: photovoltaic(context.environment, i)),
+    "prepare_wind_power": _prepare(
+        lambda context, i: wind_power(context.environment, i)),
+    "prepare_heat_pump": _prepare(heat_pump),
+    "prepare_battery_electric_vehicle": _prepare(
+        lambda context, i: battery_electric_vehicle(context.environment, i)),
+    "prepare_electrical_energy_storage": _prepare(electrical_energy_storage),
+    "prepare_pysam_battery_stateful": _pysam_battery,
+    "prepare_combined_heat_and_power": _prepare(combined_heat_and_power),
+    "prepare_heating_rod": _prepare(heating_rod, "prepareTimeSeries"),
+    "prepare_thermal_energy_storage": _prepare(thermal_energy_storage),
+    "prepare_electrolysis_simses": _electrolysis,
+    "user_profile_thermal_energy_demand": _thermal_energy_demand,
+    "thermal_energy_storage_loop": _thermal_storage_loop,
+    "operator_run_base_scenario": _base_scenario,
+    "export_components": _export("export_components"),
+    "export_component_values": _export("export_component_values"),
+    "export_component_timeseries": _export("export_component_timeseries"),
+    "export_components_to_sql": _export("export_components_to_sql"),
+    "export_to_parquet": _export("export_to_parquet"),
+}
+
+# SimSES leaves threads behind, which keep the interpreter from exiting
+ISOLATED = ("prepare_electrolysis_simses",)
+
+
+# %% runner
+def measure(setup, context, n, repeat=1):
+    """Return the best time of repeat runs and the peak traced memory."""
+    durations = []
+    for _ in range(repeat):
+        work = setup(context, n)
+        start = time.perf_counter()
+        work()
+        durations.append(time.perf_counter() - start)
+
+    # tracing slows the run down, so the memory is measured separately
+    work = setup(context, n)
+    tracemalloc.start()
+    try:
+        work()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": min(durations), "peak_memory_bytes": peak}
+
+
+def measure_isolated(name, days, n, repeat=1, timeout=600):
+    """Run measure in a child process, see ISOLATED."""
+    command = [sys.executable, os.path.abspath(__file__), "--worker", name,
+               "--days", str(days), "--components", str(n),
+               "--repeat", str(repeat)]
+    try:
+        process = subprocess.run(command, stdout=subprocess.PIPE,
+                                 stderr=subprocess.DEVNULL, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"error": "timeout after %g seconds" % timeout}
+    lines = process.stdout.decode().strip().splitlines()
+    if not lines:
+        return {"error": "child process exited with %d" % process.returncode}
+    return json.loads(lines[-1])
+
+
+def _worker(name, days, n, repeat):
+    """Measure one benchmark and print the result (child process)."""
+    warnings.simplefilter("ignore")
+    result = {}
+    try:
+        result.update(measure(benchmarks[name], Context(days), n, repeat))
+    except ImportError as error:
+        result["skipped"] = str(error)
+    except Exception as error:
+        result["error"] = repr(error)
+    print(json.dumps(result))
+    sys.stdout.flush()
+    # do not wait for threads left behind by the benchmark
+    os._exit(0)
+
+
+def run(days=(1, 7), components=(1, 10), repeat=1, only=None, timeout=600):
+    """Run the benchmarks and return the results."""
+    selected = [name for name in benchmarks
+                if not only or any(part in name for part in only)]
+    results = []
+    for horizon in days:
+        context = Context(horizon)
+        for n in components:
+            for name in selected:
+                result = {"name": name, "days": horizon, "components": n}
+                try:
+                    if name in ISOLATED:
+                        result.update(measure_isolated(name, horizon, n,
+                                                       repeat, timeout))
+                    else:
+                        result.update(measure(benchmarks[name], context, n,
+                                              repeat))
+                except ImportError as error:
+                    result["skipped"] = str(error)
+                except Exception as error:
+                    result["error"] = repr(error)
+                print(json.dumps(result), file=sys.stderr)
+                results.append(result)
+
+    return {
+        "benchmark": "suite",
+        "vpplib": vpplib.__version__,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "created": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(result, previous, tolerance=0.2, min_seconds=0.01):
+    """
+    Return the benchmarks that got slower than in a previous result.
+
+    A benchmark is a regression if it takes more than (1 + tolerance)
+    times and at least min_seconds longer than before.
+    """
+    before = {
+        (entry["name"], entry["days"], entry["components"]): entry
+        for entry in previous["results"] if "seconds" in entry
+    }
+    regressions = []
+    for entry in result["results"]:
+        key = (entry["name"], entry["days"], entry["components"])
+        if "seconds" not in entry or key not in before:
+            continue
+        old = before[key]["seconds"]
+        if (entry["seconds"] > (1 + tolerance) * old
+                and entry["seconds"] - old >= min_seconds):
+            regressions.append({
+                "name": entry["name"],
+                "days": entry["days"],
+                "components": entry["components"],
+                "seconds": entry["seconds"],
+                "previous_seconds": old,
+                "ratio": entry["seconds"] / old,
+            })
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 7])
+    parser.add_argument("--components", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--only", nargs="+", default=None,
+                        help="run the benchmarks containing these names")
+    parser.add_argument("--output", default=None,
+                        help="JSON file (default: <temporary directory>/"
+                             "vpplib_bench_suite_<version>.json)")
+    parser.add_argument("--workdir", default=None,
+                        help="directory of the exports of the benchmarks "
+                             "(default: a temporary directory, removed "
+                             "afterwards)")
+    parser.add_argument("--compare", default=None,
+                        help="JSON file of a previous run")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed relative slowdown (default: 0.2)")
+    parser.add_argument("--min-seconds", type=float, default=0.01,
+                        help="ignore slowdowns below these seconds")
+    parser.add_argument("--timeout", type=float, default=600,
+                        help="seconds an isolated benchmark may take")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args.worker, args.days[0], args.components[0], args.repeat)
+
+    warnings.simplefilter("ignore")
+    output = os.path.abspath(args.output or os.path.join(
+        tempfile.gettempdir(),
+        "vpplib_bench_suite_" + vpplib.__version__ + ".json"))
+    previous = os.path.abspath(args.compare) if args.compare else None
+    workdir = args.workdir or tempfile.mkdtemp(prefix="vpplib_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    cwd = os.getcwd()
+    # the exports write to ./Results, the child processes inherit the cwd
+    os.chdir(workdir)
+    try:
+        result = run(args.days, args.components, args.repeat, args.only,
+                     args.timeout)
+    finally:
+        os.chdir(cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(result, file, indent=2)
+    print("Results written to " + output)
+
+    failures = []
+    errors = [entry for entry in result["results"] if "error" in entry]
+    if errors:
+        failures.append("%d benchmarks failed" % len(errors))
+    if previous:
+        with open(previous) as file:
+            regressions = compare(result, json.load(file), args.tolerance,
+                                  args.min_seconds)
+        print(json.dumps(regressions, indent=2))
+        if regressions:
+            failures.append("%d benchmarks got slower" % len(regressions))
+    if failures:
+        sys.exit(", ".join(failures))
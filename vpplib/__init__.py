@@ -2,16 +2,37 @@ __title__ = "vpplib"
 __version__ = "0.0.5"
 __license__ = "GNU General Public License v3 (GPLv3)"
 
-from .battery_electric_vehicle import BatteryElectricVehicle
-from .combined_heat_and_power import CombinedHeatAndPower
-from .component import Component
-from .electrical_energy_storage import ElectricalEnergyStorage
-from .environment import Environment
-from .heat_pump import HeatPump
-from .operator import Operator
-from .photovoltaic import Photovoltaic
-from .thermal_energy_storage import ThermalEnergyStorage
-from .user_profile import UserProfile
-from .virtual_power_plant import VirtualPowerPlant
-from .wind_power import WindPower
-from .heating_rod import HeatingRod
+import importlib
+
+# The classes are imported on first attribute access, so that e.g. a worker
+# only needing ElectricalEnergyStorage does not import the whole package.
+_lazy_exports = {
+    "BatteryElectricVehicle": ".battery_electric_vehicle",
+    "CombinedHeatAndPower": ".combined_heat_and_power",
+    "Component": ".component",
+    "ElectricalEnergyStorage": ".electrical_energy_storage",
+    "Environment": ".environment",
+    "HeatPump": ".heat_pump",
+    "Operator": ".operator",
+    "Photovoltaic": ".photovoltaic",
+    "ThermalEnergyStorage": ".thermal_energy_storage",
+    "UserProfile": ".user_profile",
+    "VirtualPowerPlant": ".virtual_power_plant",
+    "WindPower": ".wind_power",
+    "HeatingRod": ".heating_rod",
+}
+
+__all__ = list(_lazy_exports)
+
+
+def __getattr__(name):
+    if name in _lazy_exports:
+        module = importlib.import_module(_lazy_exports[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
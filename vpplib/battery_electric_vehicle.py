@@ -13,6 +13,10 @@ import random
 
 
 class BatteryElectricVehicle(Component):
+
+    cache_attributes = ("timeseries", "date", "hour", "weekday", "at_home")
+    state_attributes = ("limit",)
+
     def __init__(
         self,
         battery_max,
@@ -117,6 +121,16 @@ class BatteryElectricVehicle(Component):
         self.week_trip_end = week_trip_end
         self.weekend_trip_start = weekend_trip_start
         self.weekend_trip_end = weekend_trip_end
+        # the predefined trip times are filled in here rather than in
+        # prepare_time_series, so the fingerprint of the timeseries cache
+        # does not change by the preparation
+        if (
+            len(self.week_trip_start) == 0
+            or len(self.week_trip_end) == 0
+            or len(self.weekend_trip_start) == 0
+            or len(self.weekend_trip_end) == 0
+        ):
+            self.get_trip_times()
 
     def prepare_time_series(self):
 
@@ -207,77 +221,102 @@ class BatteryElectricVehicle(Component):
         lst_charger = []
 
         for i, at_home in self.at_home.iterrows():
-            if (at_home.item() == 0) & (battery_charge > self.battery_min):
-                # if car is not at home discharge battery with X kW
-                battery_charge = battery_charge - self.battery_usage * (
-                    self.environment.timebase / 60
-                )
+            battery_charge, charger = self.charge_step(
+                battery_charge, at_home.item()
+            )
+            lst_battery.append(battery_charge)
+            lst_charger.append(charger)
 
-                if battery_charge < self.battery_min:
-                    battery_charge = self.battery_min
-
-                lst_battery.append(battery_charge)
-                # if car is not at home, chargers energy consumption is 0
-                lst_charger.append(0)
-
-            # Function to apply the load_degradation to the load profile
-            elif (at_home.item() == 1) and (
-                battery_charge > self.battery_max * self.load_degradation_begin
-            ):
-                degraded_charging_power = self.charging_power * (
-                    1
-                    - (
-                        battery_charge / self.battery_max
-                        - self.load_degradation_begin
-                    )
-                    / (1 - self.load_degradation_begin)
-                )
+        self.timeseries["car_capacity"] = lst_battery
+        self.timeseries.car_charger = lst_charger
 
-                battery_charge = battery_charge + (
-                    degraded_charging_power
-                    * self.charge_efficiency
-                    * (self.environment.timebase / 60)
-                )
-                charger = degraded_charging_power
+    def charge_step(self, battery_charge, at_home):
 
-                if battery_charge > self.battery_max:
-                    charger = self.charging_power - (
-                        battery_charge - self.battery_max
-                    )
-                    battery_charge = self.battery_max
-
-                lst_battery.append(battery_charge)
-                lst_charger.append(charger)
-
-            # If car is at home, charge with charging power.
-            # If timescale is hours charging power results in kWh
-            elif (at_home.item() == 1) & (battery_charge < self.battery_max):
-                battery_charge = battery_charge + (
-                    self.charging_power
-                    * self.charge_efficiency
-                    * (self.environment.timebase / 60)
+        """
+        Info
+        ----
+        Determine the charge of the car battery and the power drawn by the
+        charger for one timestep.
+
+        Parameters
+        ----------
+        battery_charge: float
+            state of charge of the vehicle at the start of the timestep
+
+        at_home: int
+            1 if the car is at home during the timestep, else 0
+
+        Returns
+        -------
+        battery_charge: float
+            state of charge at the end of the timestep
+        charger: float
+            power demand of the charging station
+
+        """
+
+        if (at_home == 0) & (battery_charge > self.battery_min):
+            # if car is not at home discharge battery with X kW
+            battery_charge = battery_charge - self.battery_usage * (
+                self.environment.timebase / 60
+            )
+
+            if battery_charge < self.battery_min:
+                battery_charge = self.battery_min
+
+            # if car is not at home, chargers energy consumption is 0
+            charger = 0
+
+        # Function to apply the load_degradation to the load profile
+        elif (at_home == 1) and (
+            battery_charge > self.battery_max * self.load_degradation_begin
+        ):
+            degraded_charging_power = self.charging_power * (
+                1
+                - (
+                    battery_charge / self.battery_max
+                    - self.load_degradation_begin
                 )
-                charger = self.charging_power
+                / (1 - self.load_degradation_begin)
+            )
 
-                # If battery would be overcharged, charge only with kWh left
-                if battery_charge > self.battery_max:
-                    charger = self.charging_power - (
-                        battery_charge - self.battery_max
-                    )
-                    battery_charge = self.battery_max
+            battery_charge = battery_charge + (
+                degraded_charging_power
+                * self.charge_efficiency
+                * (self.environment.timebase / 60)
+            )
+            charger = degraded_charging_power
 
-                lst_battery.append(battery_charge)
-                lst_charger.append(charger)
+            if battery_charge > self.battery_max:
+                charger = self.charging_power - (
+                    battery_charge - self.battery_max
+                )
+                battery_charge = self.battery_max
+
+        # If car is at home, charge with charging power.
+        # If timescale is hours charging power results in kWh
+        elif (at_home == 1) & (battery_charge < self.battery_max):
+            battery_charge = battery_charge + (
+                self.charging_power
+                * self.charge_efficiency
+                * (self.environment.timebase / 60)
+            )
+            charger = self.charging_power
 
-            # If battery is full and car is at home,
-            # charger consumes no power and current state of charge of batter
-            # is returned
-            else:
-                lst_battery.append(battery_charge)
-                lst_charger.append(0)
+            # If battery would be overcharged, charge only with kWh left
+            if battery_charge > self.battery_max:
+                charger = self.charging_power - (
+                    battery_charge - self.battery_max
+                )
+                battery_charge = self.battery_max
 
-        self.timeseries["car_capacity"] = lst_battery
-        self.timeseries.car_charger = lst_charger
+        # If battery is full and car is at home,
+        # charger consumes no power and current state of charge of batter
+        # is returned
+        else:
+            charger = 0
+
+        return battery_charge, charger
 
     # In[Separate date and hours]:
 
@@ -430,7 +469,11 @@ class BatteryElectricVehicle(Component):
 
         """
 
-        if type(timestamp) == int:
+        if self.stream is not None:
+
+            return self.stream.value(timestamp, "car_charger") * self.limit
+
+        elif type(timestamp) == int:
 
             return self.timeseries.iloc[timestamp]["car_charger"] * self.limit
 
@@ -444,6 +487,65 @@ class BatteryElectricVehicle(Component):
                 + "Stringformat: YYYY-MM-DD hh:mm:ss"
             )
 
+    def values_for_timestamps(self, timestamps):
+        """
+        Returns the values for several timestamps at once.
+
+        Vectorized equivalent of value_for_timestamp.
+
+        Parameters
+        ----------
+        timestamps : pandas.DatetimeIndex
+            Timestamps of the timeseries.
+
+        Returns
+        -------
+        numpy.ndarray
+            Power of the charger in kW.
+        """
+        if self.stream is not None:
+            return self.stream.values(timestamps, "car_charger") * self.limit
+        values = self.timeseries["car_charger"].reindex(timestamps)
+        return values.to_numpy(dtype=float) * self.limit
+
+    def step(self, timestamp, data):
+        """
+        Info
+        ----
+        Charge or discharge the vehicle for one timestep in streaming
+        operation, see charge_step. The first timestep starts with a full
+        battery.
+
+        Parameters
+        ----------
+        timestamp : str or datetime
+            The timestamp of the timestep.
+        data : dict or pandas.Series
+            1 under the identifier if the car is at home during the
+            timestep, else 0.
+
+        Returns
+        -------
+        dict or None
+            car_charger, car_capacity and at_home of the timestep, None if
+            data holds nothing for the vehicle.
+        """
+        if self.identifier not in data:
+            return None
+
+        at_home = int(data[self.identifier])
+        if self.stream is not None and len(self.stream):
+            battery_charge = self.stream.latest("car_capacity")
+        else:
+            battery_charge = self.battery_max
+        battery_charge, charger = self.charge_step(battery_charge, at_home)
+
+        return {
+            "car_charger": charger,
+            "car_capacity": battery_charge,
+            "at_home": at_home,
+        }
+
     def observations_for_timestamp(self, timestamp):
 
         """
@@ -11,6 +11,11 @@ import pandas as pd
 
 
 class CombinedHeatAndPower(Component):
+
+    state_attributes = (
+        "limit", "is_running", "last_ramp_up", "last_ramp_down", "timeseries",
+    )
+
     def __init__(
         self,
         thermal_energy_demand,
@@ -116,6 +121,7 @@ class CombinedHeatAndPower(Component):
         self.is_running = False
         self.timeseries = pd.DataFrame(
             columns=["thermal_energy_output", "el_demand"],
+            dtype="float64",
             index=pd.date_range(
                 start=self.environment.start,
                 end=self.environment.end,
@@ -145,6 +151,7 @@ class CombinedHeatAndPower(Component):
 
         self.timeseries = pd.DataFrame(
             columns=["thermal_energy_output", "el_demand"],
+            dtype="float64",
             index=self.thermal_energy_demand.index,
         )
 
@@ -154,6 +161,7 @@ class CombinedHeatAndPower(Component):
 
         self.timeseries = pd.DataFrame(
             columns=["thermal_energy_output", "el_demand"],
+            dtype="float64",
             index=pd.date_range(
                 start=self.environment.start,
                 end=self.environment.end,
@@ -418,10 +426,14 @@ class CombinedHeatAndPower(Component):
 
         """
 
-        self.timeseries.loc[timestamp, "thermal_energy_output"] = observation[
-            "thermal_energy_output"
-        ]
-        self.timeseries.loc[timestamp, "el_demand"] = observation["el_demand"]
+        self.expand_time_series()
+        self.set_timeseries_value(
+            timestamp, "thermal_energy_output",
+            observation["thermal_energy_output"],
+        )
+        self.set_timeseries_value(
+            timestamp, "el_demand", observation["el_demand"]
+        )
 
         return self.timeseries
 
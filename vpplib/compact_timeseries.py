@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+Compact Timeseries Module
+-------------------------
+This module contains the CompactTimeseries class, an array-backed storage
+for the timeseries of a component.
+
+The columns of a timeseries are stored as one contiguous 2-D NumPy array
+(default float32, one row per column) and the time index is shared between
+all timeseries with equal index through shared_index. A pandas view of the
+data is only created on demand.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+_index_pool = {}
+
+
+def shared_index(index):
+    """
+    Returns a pooled index equal to index.
+
+    Indexes with equal values are stored once instead of once per
+    component. The name and freq of the index are not compared; the pooled
+    index keeps those of the first caller.
+
+    Parameters
+    ----------
+    index : pandas.Index
+        The index to pool.
+
+    Returns
+    -------
+    pandas.Index
+        An index object equal to index, shared by all callers.
+    """
+    if len(index) == 0:
+        return index
+    key = (
+        type(index).__name__,
+        len(index),
+        str(index.dtype),
+        repr(index[0]),
+        repr(index[-1]),
+    )
+    pooled = _index_pool.get(key)
+    if pooled is not None and pooled.equals(index):
+        return pooled
+    _index_pool[key] = index
+    return index
+
+
+def clear_index_pool():
+    """Removes all pooled indexes."""
+    _index_pool.clear()
+
+
+class CompactTimeseries(object):
+    """
+    Array-backed timeseries of a component.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        2-D array with one row per column of the timeseries.
+    index : pandas.Index
+        Time index of the timeseries.
+    columns : tuple
+        Column labels. For a Series the tuple holds its name.
+    is_series : bool, optional
+        Whether the original timeseries was a pandas.Series.
+    index_name : optional
+        Name of the index of the pandas view. Defaults to index.name.
+
+    Attributes
+    ----------
+    values : numpy.ndarray
+        The data with shape (number of columns, number of timesteps).
+    index : pandas.Index
+        The (shared) time index.
+    columns : tuple
+        Column labels.
+    is_series : bool
+        Whether to_pandas returns a Series.
+    index_name
+        Name of the index of the pandas view.
+    """
+
+    __slots__ = ("values", "index", "columns", "is_series", "index_name")
+
+    def __init__(self, values, index, columns, is_series=False,
+                 index_name=None):
+        if values.ndim != 2 or values.shape != (len(columns), len(index)):
+            raise ValueError(
+                "values must have the shape (len(columns), len(index))"
+            )
+        self.values = values
+        self.index = index
+        self.columns = tuple(columns)
+        self.is_series = is_series
+        self.index_name = index.name if index_name is None else index_name
+
+    @classmethod
+    def from_pandas(cls, timeseries, dtype=np.float32, share_index=True):
+        """
+        Creates a CompactTimeseries from a DataFrame or Series.
+
+        Parameters
+        ----------
+        timeseries : pandas.DataFrame or pandas.Series
+            Numeric timeseries. Object columns are converted to dtype,
+            empty cells become NaN.
+        dtype : numpy.dtype, optional
+            Dtype of the stored values (default: numpy.float32).
+        share_index : bool, optional
+            If True, the index is pooled with shared_index (default: True).
+
+        Returns
+        -------
+        CompactTimeseries
+        """
+        is_series = isinstance(timeseries, pd.Series)
+        if is_series:
+            columns = (timeseries.name,)
+            frame = timeseries.to_frame()
+        elif isinstance(timeseries, pd.DataFrame):
+            columns = tuple(timeseries.columns)
+            frame = timeseries
+        else:
+            raise ValueError(
+                "timeseries must be a pandas.DataFrame or pandas.Series"
+            )
+
+        values = np.empty((len(columns), len(frame)), dtype=dtype)
+        for i in range(len(columns)):
+            column = frame.iloc[:, i]
+            if column.dtype == object:
+                column = pd.to_numeric(column, errors="raise")
+            values[i] = column.to_numpy(dtype=dtype, na_value=np.nan)
+
+        index = timeseries.index
+        if share_index:
+            index = shared_index(index)
+        compact = cls(values, index, columns, is_series)
+        compact.index_name = timeseries.index.name
+        return compact
+
+    def to_pandas(self):
+        """
+        Returns a pandas view of the data.
+
+        The DataFrame (or Series) shares its memory with self.values, so no
+        data is copied and writes to it change the stored values.
+
+        Returns
+        -------
+        pandas.DataFrame or pandas.Series
+        """
+        index = self.index
+        if index.name != self.index_name:
+            index = index.rename(self.index_name)
+        if self.is_series:
+            return pd.Series(
+                self.values[0], index=index, name=self.columns[0], copy=False,
+            )
+        return pd.DataFrame(
+            self.values.T, index=index, columns=list(self.columns), copy=False,
+        )
+
+    def column(self, column):
+        """Returns the values of one column as a 1-D array view."""
+        return self.values[self.columns.index(column)]
+
+    def value(self, timestamp, column=None):
+        """
+        Returns a single value.
+
+        Parameters
+        ----------
+        timestamp : datetime-like
+            Label in the index.
+        column : optional
+            Column label. Defaults to the first column.
+
+        Returns
+        -------
+        float
+        """
+        row = 0 if column is None else self.columns.index(column)
+        return self.values[row, self.index.get_loc(timestamp)].item()
+
+    def set_value(self, timestamp, value, column=None):
+        """
+        Writes a single value to the stored values.
+
+        Unlike writes to the pandas view of to_pandas, which may go to a
+        temporary copy, the value is written to self.values (cast to its
+        dtype).
+
+        Parameters
+        ----------
+        timestamp : datetime-like
+            Label in the index.
+        value : float
+            The value.
+        column : optional
+            Column label. Defaults to the first column.
+        """
+        row = 0 if column is None else self.columns.index(column)
+        self.values[row, self.index.get_loc(timestamp)] = value
+
+    def to_memmap(self, path):
+        """
+        Moves the values to a file and maps them into memory.
+
+        The values are written to an .npy file and replaced by a
+        numpy.memmap of it, so the operating system loads them on access
+        and can drop them from memory again.
+
+        Parameters
+        ----------
+        path : str
+            Path of the .npy file. Existing files are overwritten.
+
+        Returns
+        -------
+        CompactTimeseries
+            self
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        values = np.lib.format.open_memmap(
+            path, mode="w+", dtype=self.values.dtype, shape=self.values.shape
+        )
+        values[:] = self.values
+        values.flush()
+        self.values = values
+
+        return self
+
+    @property
+    def shape(self):
+        """Shape of the timeseries as (number of timesteps, number of columns)."""
+        return (len(self.index), len(self.columns))
+
+    @property
+    def nbytes(self):
+        """Memory used by the values (the shared index is not counted)."""
+        return self.values.nbytes
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self.index = shared_index(self.index)
+
+    def __repr__(self):
+        return "CompactTimeseries(columns={}, length={}, dtype={})".format(
+            list(self.columns), len(self.index), self.values.dtype
+        )
@@ -8,6 +8,45 @@ including common attributes and methods that are inherited by specific component
 like photovoltaic systems, energy storage, heat pumps, etc.
 """
 
+import inspect
+
+from vpplib import instrumentation
+
+
+class _TimeseriesAttribute(object):
+    """Descriptor of Component.timeseries.
+
+    Returns the timeseries stored in the instance or, in compact mode, a
+    pandas view of the CompactTimeseries. Assigning a timeseries ends the
+    compact mode of the component.
+    """
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        state = instance.__dict__
+        if "timeseries" in state:
+            return state["timeseries"]
+        compact = state.get("_compact_timeseries")
+        if compact is None:
+            raise AttributeError(
+                "{!r} object has no attribute 'timeseries'".format(
+                    type(instance).__name__
+                )
+            )
+        return compact.to_pandas()
+
+    def __set__(self, instance, value):
+        instance.__dict__.pop("_compact_timeseries", None)
+        instance.__dict__["timeseries"] = value
+
+    def __delete__(self, instance):
+        instance.__dict__.pop("_compact_timeseries", None)
+        try:
+            del instance.__dict__["timeseries"]
+        except KeyError:
+            raise AttributeError("timeseries") from None
+
 
 class Component(object):
     """Base class for all components in a virtual power plant.
@@ -26,8 +65,65 @@ class Component(object):
         A unique identifier for the component.
     timeseries : list or pandas.DataFrame
         Time series data for the component.
+    environment_data : tuple of str
+        Names of the Environment data attributes the component reads in
+        prepare_time_series. Part of the key of the timeseries cache.
+    cache_attributes : tuple of str
+        Attributes set by prepare_time_series, which are stored in and
+        restored from the timeseries cache.
+    cache_excluded_attributes : tuple of str
+        Attributes which are not part of the key of the timeseries cache,
+        because they are results or derived from other attributes. The
+        cache_attributes are never part of the key either. Child classes
+        extend the tuple of the base class.
+    state_attributes : tuple of str
+        Attributes changed by operating the component, which are saved by
+        get_state and restored by set_state.
+    stream : RingBuffer or None
+        Recent history of the component in streaming operation, see
+        advance. None if the component uses its precomputed timeseries.
+    spill_attributes : tuple of str
+        Further pandas attributes moved to disk by spill_time_series, e.g.
+        timeseries_year, of which the timeseries of heat pumps and heating
+        rods is a slice.
+    model_attributes : tuple of str
+        Model objects of third-party libraries, which are not stored by
+        VirtualPowerPlant.export_to_parquet and rebuilt by rebuild_model.
+    instrumented_methods : tuple of str
+        Methods timed in vpplib.instrumentation.registry as stage
+        "<class name>.<method>" while the instrumentation is enabled. Child
+        classes overriding them are instrumented automatically.
     """
 
+    environment_data = ()
+    cache_attributes = ("timeseries",)
+    cache_excluded_attributes = (
+        "environment", "timeseries", "_compact_timeseries", "stream"
+    )
+
+    state_attributes = ()
+
+    spill_attributes = ("timeseries_year",)
+
+    model_attributes = ()
+
+    stream = None
+
+    timeseries = _TimeseriesAttribute()
+
+    instrumented_methods = (
+        "value_for_timestamp", "values_for_timestamps", "operate_storage"
+    )
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in cls.instrumented_methods:
+            method = cls.__dict__.get(name)
+            if (inspect.isfunction(method)
+                    and not getattr(method, "instrumented", False)):
+                setattr(cls, name, instrumentation.timed(
+                    cls.__name__ + "." + name)(method))
+
     def __init__(self,
                  unit=None,
                  environment=None,
@@ -49,6 +145,7 @@ class Component(object):
         self.identifier = identifier
         self.environment = environment
 
+    @instrumentation.timed("Component.value_for_timestamp")
     def value_for_timestamp(self, timestamp):
         """Get the component's value for a specific timestamp.
         
@@ -73,8 +170,41 @@ class Component(object):
         the timeseries attribute. Child classes may override this method to
         implement custom behavior.
         """
+        if self.stream is not None:
+            return self.stream.value(timestamp)
+
+        compact = self.__dict__.get("_compact_timeseries")
+        if compact is not None and "timeseries" not in self.__dict__:
+            return compact.value(timestamp)
+
         return self.timeseries.loc[timestamp].item()
 
+    @instrumentation.timed("Component.values_for_timestamps")
+    def values_for_timestamps(self, timestamps):
+        """Get the component's values for several timestamps at once.
+
+        Parameters
+        ----------
+        timestamps : pandas.DatetimeIndex
+            The timestamps for which to retrieve the values.
+
+        Returns
+        -------
+        numpy.ndarray
+            The values with the sign convention of value_for_timestamp.
+
+        Notes
+        -----
+        The base class calls value_for_timestamp for every timestamp. Child
+        classes with a timeseries override this with a vectorized lookup.
+        """
+        import numpy as np
+
+        return np.array(
+            [self.value_for_timestamp(str(timestamp)) for timestamp in timestamps],
+            dtype=float,
+        )
+
     def observations_for_timestamp(self, timestamp):
         """Get component observations for a specific timestamp.
         
@@ -121,6 +251,368 @@ class Component(object):
 
         self.timeseries = []
 
+    def start_stream(self, capacity=672):
+        """Start the streaming operation of the component.
+
+        In streaming operation the component is advanced one timestep at a
+        time with advance and value_for_timestamp reads the recent history
+        instead of the precomputed timeseries.
+
+        Parameters
+        ----------
+        capacity : int, optional
+            Number of timesteps kept in the history (default: 672, one week
+            of quarter hours).
+
+        Returns
+        -------
+        RingBuffer
+            The history of the component.
+        """
+        from vpplib.streaming import RingBuffer
+
+        self.stream = RingBuffer(capacity)
+
+        return self.stream
+
+    def stop_stream(self):
+        """End the streaming operation and drop the history."""
+        self.stream = None
+
+    def advance(self, timestamp, data):
+        """Advance the component by one timestep in streaming operation.
+
+        The values of the timestep are calculated by step and appended to
+        the history. Streaming operation is started with the default
+        capacity if necessary.
+
+        Parameters
+        ----------
+        timestamp : str or datetime
+            The timestamp of the new timestep.
+        data : dict or pandas.Series
+            Weather and measurement values of the timestep.
+
+        Returns
+        -------
+        dict or None
+            The values of the timestep, None if data holds nothing for the
+            component.
+        """
+        values = self.step(timestamp, data)
+        if values is None:
+            return None
+        if self.stream is None:
+            self.start_stream()
+        self.stream.append(timestamp, values)
+
+        return values
+
+    def step(self, timestamp, data):
+        """Calculate the values of one timestep in streaming operation.
+
+        The base class reads a measured value stored under the identifier
+        of the component in data. Child classes calculate their values from
+        weather data and their current state with constant work per step.
+
+        Parameters
+        ----------
+        timestamp : str or datetime
+            The timestamp of the timestep.
+        data : dict or pandas.Series
+            Weather and measurement values of the timestep.
+
+        Returns
+        -------
+        dict or None
+            The values of the timestep by column of the timeseries, None if
+            data holds nothing for the component.
+        """
+        if self.identifier is not None and self.identifier in data:
+            return {self.identifier: float(data[self.identifier])}
+
+        return None
+
+    def fingerprint(self):
+        """Calculate the key of the component in the timeseries cache.
+
+        The key is a content hash of the component class, its attributes
+        (without cache_excluded_attributes and cache_attributes, so it is
+        the same before and after the preparation) and the environment data
+        listed in environment_data.
+
+        Returns
+        -------
+        str
+            Hexadecimal sha256 digest.
+        """
+        from vpplib.timeseries_cache import fingerprint
+
+        cls = type(self)
+        parameters = {
+            name: value for name, value in vars(self).items()
+            if name not in self.cache_excluded_attributes
+            and name not in self.cache_attributes
+        }
+        environment = None
+        if self.environment is not None:
+            environment = self.environment.fingerprint(self.environment_data)
+
+        return fingerprint(
+            cls.__module__ + "." + cls.__qualname__, parameters, environment
+        )
+
+    def prepare_time_series_cached(self, cache=None, use_cache=True,
+                                   refresh=False):
+        """Prepare the time series, reusing a cached result if possible.
+
+        On a cache hit the attributes in cache_attributes are restored from
+        the cache instead of calling prepare_time_series. On a miss the time
+        series is prepared and stored in the cache. Components in lean mode
+        release their model results after a cache hit as well.
+
+        Parameters
+        ----------
+        cache : TimeseriesCache, optional
+            The cache to use. By default a TimeseriesCache in
+            './Cache/timeseries' is used.
+        use_cache : bool, optional
+            If False, the cache is bypassed completely (default: True).
+        refresh : bool, optional
+            If True, the time series is recalculated and the cache entry
+            overwritten (default: False).
+
+        Returns
+        -------
+        object
+            The prepared timeseries attribute.
+
+        Raises
+        ------
+        NotImplementedError
+            If the class does not implement prepare_time_series.
+
+        Notes
+        -----
+        Components with random behaviour (e.g. BatteryElectricVehicle)
+        return the draw of the run that filled the cache.
+        """
+        if type(self).prepare_time_series is Component.prepare_time_series:
+            raise NotImplementedError(
+                type(self).__name__ + " does not implement prepare_time_series."
+            )
+
+        if not use_cache:
+            return self.prepare_time_series()
+
+        if cache is None:
+            from vpplib.timeseries_cache import TimeseriesCache
+
+            cache = TimeseriesCache()
+
+        key = self.fingerprint()
+        if not refresh:
+            state = cache.get(key)
+            if state is not None:
+                for name, value in state.items():
+                    setattr(self, name, value)
+                if getattr(self, "lean", False):
+                    self.release_model_results()
+                return self.timeseries
+
+        self.prepare_time_series()
+        cache.put(key, {
+            name: getattr(self, name) for name in self.cache_attributes
+            if hasattr(self, name)
+        })
+
+        return self.timeseries
+
+    def compact_time_series(self, dtype="float32", share_index=True):
+        """Store the timeseries as a compact array.
+
+        The columns are stored as one contiguous array of the given dtype
+        and the time index is shared with all components with an equal
+        index. Afterwards the timeseries attribute returns a pandas view of
+        the array. Assigning a new timeseries ends the compact mode.
+
+        Parameters
+        ----------
+        dtype : str or numpy.dtype, optional
+            Dtype of the stored values (default: "float32").
+        share_index : bool, optional
+            Whether to share the time index (default: True).
+
+        Returns
+        -------
+        CompactTimeseries or None
+            The compact storage or None, if the timeseries is not a pandas
+            object.
+        """
+        import pandas as pd
+        from vpplib.compact_timeseries import CompactTimeseries
+
+        timeseries = self.__dict__.get("timeseries")
+        if not isinstance(timeseries, (pd.DataFrame, pd.Series)):
+            return self.__dict__.get("_compact_timeseries")
+
+        compact = CompactTimeseries.from_pandas(
+            timeseries, dtype=dtype, share_index=share_index
+        )
+        del self.__dict__["timeseries"]
+        self.__dict__["_compact_timeseries"] = compact
+
+        return compact
+
+    def spill_time_series(self, path, dtype="float64"):
+        """Move the timeseries to a file on disk.
+
+        The timeseries is stored compact (see compact_time_series) with its
+        values mapped from an .npy file, so the operating system loads them
+        on access and can drop them from memory again. value_for_timestamp
+        and the timeseries attribute keep working. expand_time_series loads
+        the timeseries into memory again; operate_storage and
+        log_observation do so before they write to it.
+
+        The numeric attributes in spill_attributes are replaced by pandas
+        objects mapped from "<path without .npy>.<attribute>.npy". Data
+        already mapped from a file is not written again.
+
+        Parameters
+        ----------
+        path : str
+            Path of the .npy file.
+        dtype : str or numpy.dtype, optional
+            Dtype of the stored values (default: "float64", which keeps the
+            values unchanged).
+
+        Returns
+        -------
+        CompactTimeseries or None
+            The compact storage or None, if the timeseries is not a pandas
+            object.
+        """
+        import os
+
+        import pandas as pd
+        from vpplib.compact_timeseries import CompactTimeseries
+        from vpplib.memory import resident_data_bytes
+
+        compact = self.__dict__.get("_compact_timeseries")
+        if compact is None or "timeseries" in self.__dict__:
+            compact = self.compact_time_series(dtype=dtype)
+        if compact is not None and resident_data_bytes(compact) > 0:
+            compact.to_memmap(path)
+
+        root, extension = os.path.splitext(path)
+        for name in self.spill_attributes:
+            value = self.__dict__.get(name)
+            if (not isinstance(value, (pd.DataFrame, pd.Series))
+                    or resident_data_bytes(value) == 0):
+                continue
+            try:
+                spilled = CompactTimeseries.from_pandas(value, dtype=dtype)
+            except (TypeError, ValueError):
+                # not numeric
+                continue
+            spilled.to_memmap(root + "." + name + (extension or ".npy"))
+            setattr(self, name, spilled.to_pandas())
+
+        return compact
+
+    def expand_time_series(self):
+        """End the compact mode and store the timeseries as float64 pandas object.
+
+        Components operated step by step (operate_storage, log_observation)
+        call it first, so a spilled or compact timeseries is loaded into
+        memory before it is written.
+
+        Returns
+        -------
+        pandas.DataFrame or pandas.Series
+            The timeseries, None if the component has none.
+        """
+        compact = self.__dict__.get("_compact_timeseries")
+        if compact is not None and "timeseries" not in self.__dict__:
+            self.timeseries = compact.to_pandas().astype("float64")
+
+        return self.__dict__.get("timeseries")
+
+    def set_timeseries_value(self, timestamp, column, value):
+        """Write one value of the timeseries.
+
+        In compact mode the value is written to the CompactTimeseries,
+        because the timeseries attribute then returns a new pandas view on
+        every access and writes to it may be lost.
+
+        Parameters
+        ----------
+        timestamp : datetime-like
+            Label in the index of the timeseries.
+        column : str
+            Column of the timeseries.
+        value : float
+            The value.
+        """
+        compact = self.__dict__.get("_compact_timeseries")
+        if compact is not None and "timeseries" not in self.__dict__:
+            compact.set_value(timestamp, value, column)
+        else:
+            self.timeseries.loc[timestamp, column] = value
+
+    def get_state(self):
+        """Return a snapshot of the operating state of the component.
+
+        The snapshot holds copies of the attributes in state_attributes, so
+        operating the component does not change it. A compact timeseries is
+        copied as CompactTimeseries.
+
+        Returns
+        -------
+        dict
+            The state, to be restored with set_state.
+        """
+        import copy
+
+        state = {}
+        for name in self.state_attributes:
+            if name == "timeseries" and "timeseries" not in self.__dict__:
+                if "_compact_timeseries" in self.__dict__:
+                    state["_compact_timeseries"] = copy.deepcopy(
+                        self.__dict__["_compact_timeseries"]
+                    )
+            elif hasattr(self, name):
+                state[name] = copy.deepcopy(getattr(self, name))
+
+        return state
+
+    def set_state(self, state):
+        """Restore a snapshot of get_state.
+
+        The snapshot is copied again, so it can be restored several times.
+
+        Parameters
+        ----------
+        state : dict
+            The state returned by get_state.
+        """
+        import copy
+
+        for name, value in state.items():
+            if name == "_compact_timeseries":
+                self.__dict__.pop("timeseries", None)
+                self.__dict__[name] = copy.deepcopy(value)
+            else:
+                setattr(self, name, copy.deepcopy(value))
+
+    def rebuild_model(self):
+        """Rebuild the objects in model_attributes from the other attributes.
+
+        Called by VirtualPowerPlant.load_from_parquet after the attributes
+        of the component are restored. The objects in model_attributes are
+        None at that point.
+        """
+
     def reset_time_series(self):
         """Reset the time series data for the component.
         
@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+"""
+Control Loop Module
+-------------------
+This module contains an asyncio runtime which drives a virtual power plant
+through an Operator in real time (WallClock) or on a simulated clock
+(SimulatedClock).
+
+Every tick of the ControlLoop
+
+1. reads the measurements of all components concurrently through their
+   adapters,
+2. passes the measurements to the operator (Operator.measurements) and
+   calls Operator.operate_at_timestamp,
+3. writes the setpoints returned by the operator concurrently through the
+   adapters.
+
+The adapters (subclasses of ComponentAdapter) connect the loop to the
+assets, e.g. through HTTP or Modbus endpoints. SimulatedAdapter uses the
+vpplib component itself as stand-in endpoint, with configurable latency and
+failures for tests. The latency of every tick and missed deadlines are
+recorded in ControlLoop.metrics.
+"""
+
+import asyncio
+import collections
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# %% clocks
+class SimulatedClock(object):
+    """
+    Clock of a simulated control loop.
+
+    Parameters
+    ----------
+    start : str or datetime
+        Timestamp of the first tick.
+    interval : str or pandas.Timedelta, optional
+        Time between two ticks (default: "15min").
+    speed : float, optional
+        Ratio of simulated to real time, e.g. 60 runs a 15 minute interval
+        every 15 seconds. None (default) runs the ticks without waiting.
+    """
+
+    def __init__(self, start, interval="15min", speed=None):
+        self.start = pd.Timestamp(start)
+        self.interval = pd.Timedelta(interval)
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive")
+        self.speed = speed
+        self._origin = None
+
+    @property
+    def tick_seconds(self):
+        """Real seconds between two ticks, None without waiting."""
+        if self.speed is None:
+            return None
+        return self.interval.total_seconds() / self.speed
+
+    def timestamp(self, tick):
+        """Return the timestamp of a tick."""
+        return self.start + tick * self.interval
+
+    async def wait(self, tick):
+        """
+        Wait for a tick.
+
+        Returns
+        -------
+        float
+            Seconds the tick starts late.
+        """
+        if self.speed is None:
+            await asyncio.sleep(0)
+            return 0.0
+        if self._origin is None:
+            self._origin = time.monotonic() - tick * self.tick_seconds
+        delay = self._origin + tick * self.tick_seconds - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return max(-delay, 0.0)
+
+
+class WallClock(SimulatedClock):
+    """
+    Clock following the wall-clock time.
+
+    Parameters
+    ----------
+    interval : str or pandas.Timedelta, optional
+        Time between two ticks (default: "1min").
+    start : str or datetime, optional
+        Timestamp of the first tick. By default the next full interval.
+    """
+
+    def __init__(self, interval="1min", start=None):
+        interval = pd.Timedelta(interval)
+        if start is None:
+            start = pd.Timestamp.now().ceil(interval)
+        super(WallClock, self).__init__(start, interval, speed=1.0)
+
+    async def wait(self, tick):
+        delay = (self.timestamp(tick) - pd.Timestamp.now()).total_seconds()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return max(-delay, 0.0)
+
+
+# %% adapters
+class ComponentAdapter(object):
+    """
+    Asynchronous connection to one asset of the virtual power plant.
+
+    Subclasses implement read and write for a specific endpoint.
+
+    Attributes
+    ----------
+    commands : tuple of str
+        Setpoint commands accepted by write.
+    """
+
+    commands = ("limit_power_to", "ramp_up", "ramp_down", "operate_storage")
+
+    async def read(self, timestamp):
+        """
+        Read the measurement of the asset.
+
+        Parameters
+        ----------
+        timestamp : str
+            Timestamp of the tick ('YYYY-MM-DD hh:mm:ss').
+
+        Returns
+        -------
+        float
+            Power in kW with the sign convention of value_for_timestamp.
+        """
+        raise NotImplementedError(
+            "read needs to be implemented by child classes!"
+        )
+
+    async def write(self, command, *args):
+        """
+        Send a setpoint command to the asset.
+
+        Parameters
+        ----------
+        command : str
+            One of commands, e.g. "limit_power_to".
+        *args
+            Arguments of the command, e.g. the limit.
+        """
+        raise NotImplementedError(
+            "write needs to be implemented by child classes!"
+        )
+
+
+class SimulatedAdapter(ComponentAdapter):
+    """
+    Adapter using a vpplib component as stand-in endpoint.
+
+    Parameters
+    ----------
+    component : Component
+        The simulated asset.
+    latency : float, optional
+        Seconds every read and write takes (default: 0.0).
+    jitter : float, optional
+        Additional random latency of up to jitter seconds (default: 0.0).
+    failure_rate : float, optional
+        Probability of a read or write raising ConnectionError (default:
+        0.0).
+    seed : int, optional
+        Seed of the random latency and failures.
+    """
+
+    def __init__(self, component, latency=0.0, jitter=0.0, failure_rate=0.0,
+                 seed=None):
+        self.component = component
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+
+    async def _respond(self):
+        delay = self.latency + self.jitter * self._random.random()
+        await asyncio.sleep(delay)
+        if self._random.random() < self.failure_rate:
+            raise ConnectionError(
+                "Simulated failure of " + str(self.component.identifier)
+            )
+
+    async def read(self, timestamp):
+        await self._respond()
+        return float(self.component.value_for_timestamp(timestamp))
+
+    async def write(self, command, *args):
+        if command not in self.commands:
+            raise ValueError(
+                "command must be one of " + str(self.commands) + ", not "
+                + repr(command)
+            )
+        await self._respond()
+        return getattr(self.component, command)(*args)
+
+
+# %% runtime
+class ControlLoop(object):
+    """
+    Asyncio runtime of an Operator.
+
+    Parameters
+    ----------
+    operator : Operator
+        The operator. operate_at_timestamp may return an iterable of
+        (component name, command, args) setpoints, which are written
+        through the adapters; args is a tuple of the command arguments.
+        Operators changing the components directly return None.
+    clock : SimulatedClock or WallClock
+        The clock of the loop.
+    adapters : dict, optional
+        ComponentAdapter by component name. By default every component of
+        the VPP gets a SimulatedAdapter.
+    deadline : float, optional
+        Seconds a tick may take, including its late start. By default the
+        real time between two ticks; without it (SimulatedClock without
+        speed) deadlines are not checked.
+    timeout : float, optional
+        Seconds a single read or write may take. Defaults to deadline.
+    history : int, optional
+        Number of ticks kept in metrics (default: 10000).
+
+    Attributes
+    ----------
+    measurements : dict
+        Measurement of the last tick by component name, nan if the read
+        failed. A copy is set as operator.measurements before
+        operate_at_timestamp is called.
+    metrics : collections.deque of dict
+        Per tick the timestamp, the lateness of its start and the seconds
+        of reading, operating, writing and in total, whether the deadline
+        was missed and the number of failed reads and writes.
+    errors : collections.deque of tuple
+        (timestamp, component name, exception) of the latest failures.
+    """
+
+    def __init__(self, operator, clock, adapters=None, deadline=None,
+                 timeout=None, history=10000):
+        self.operator = operator
+        self.clock = clock
+        if adapters is None:
+            adapters = {
+                name: SimulatedAdapter(component)
+                for name, component
+                in operator.virtual_power_plant.components.items()
+            }
+        self.adapters = dict(adapters)
+        self.deadline = clock.tick_seconds if deadline is None else deadline
+        self.timeout = self.deadline if timeout is None else timeout
+
+        self.measurements = {}
+        self.metrics = collections.deque(maxlen=history)
+        self.errors = collections.deque(maxlen=history)
+
+    async def _call(self, coroutine):
+        if self.timeout is None:
+            return await coroutine
+        return await asyncio.wait_for(coroutine, self.timeout)
+
+    async def tick(self, tick):
+        """
+        Run one tick of the loop.
+
+        Parameters
+        ----------
+        tick : int
+            Number of the tick, see the timestamp method of the clock.
+
+        Returns
+        -------
+        dict
+            The metrics of the tick.
+        """
+        lateness = await self.clock.wait(tick)
+        timestamp = str(self.clock.timestamp(tick))
+        start = time.perf_counter()
+
+        names = list(self.adapters)
+        results = await asyncio.gather(
+            *(self._call(self.adapters[name].read(timestamp))
+              for name in names),
+            return_exceptions=True,
+        )
+        failed_reads = 0
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                self.errors.append((timestamp, name, result))
+                self.measurements[name] = np.nan
+                failed_reads += 1
+            else:
+                self.measurements[name] = result
+        read_end = time.perf_counter()
+
+        self.operator.measurements = dict(self.measurements)
+        setpoints = list(self.operator.operate_at_timestamp(timestamp) or ())
+        operate_end = time.perf_counter()
+
+        for name, _, _ in setpoints:
+            if name not in self.adapters:
+                raise ValueError("No adapter for the component " + name)
+        results = await asyncio.gather(
+            *(self._call(self.adapters[name].write(command, *args))
+              for name, command, args in setpoints),
+            return_exceptions=True,
+        )
+        failed_writes = 0
+        for (name, _, _), result in zip(setpoints, results):
+            if isinstance(result, BaseException):
+                self.errors.append((timestamp, name, result))
+                failed_writes += 1
+        end = time.perf_counter()
+
+        metrics = {
+            "timestamp": timestamp,
+            "lateness_seconds": lateness,
+            "read_seconds": read_end - start,
+            "operate_seconds": operate_end - read_end,
+            "write_seconds": end - operate_end,
+            "total_seconds": end - start,
+            "missed_deadline": (
+                self.deadline is not None
+                and lateness + end - start > self.deadline
+            ),
+            "failed_reads": failed_reads,
+            "failed_writes": failed_writes,
+        }
+        self.metrics.append(metrics)
+
+        return metrics
+
+    async def run(self, ticks, first_tick=0):
+        """
+        Run the loop.
+
+        Parameters
+        ----------
+        ticks : int
+            Number of ticks.
+        first_tick : int, optional
+            Number of the first tick (default: 0).
+
+        Returns
+        -------
+        pandas.DataFrame
+            The metrics, see metrics_frame.
+        """
+        for tick in range(first_tick, first_tick + ticks):
+            await self.tick(tick)
+
+        return self.metrics_frame()
+
+    def run_sync(self, ticks, first_tick=0):
+        """Run the loop in a new event loop, see run."""
+        return asyncio.run(self.run(ticks, first_tick))
+
+    def metrics_frame(self):
+        """
+        Return the metrics of the kept ticks.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per tick, indexed by timestamp.
+        """
+        return pd.DataFrame(list(self.metrics)).set_index("timestamp")
+
+    def summary(self):
+        """
+        Summarize the metrics of the kept ticks.
+
+        Returns
+        -------
+        dict
+            Number of ticks, mean, 95th percentile and maximum of the tick
+            duration in seconds, number of missed deadlines and of failed
+            reads and writes.
+        """
+        total = np.array([metrics["total_seconds"]
+                          for metrics in self.metrics])
+        if len(total) == 0:
+            return {"ticks": 0}
+        return {
+            "ticks": len(total),
+            "mean_seconds": float(total.mean()),
+            "p95_seconds": float(np.percentile(total, 95)),
+            "max_seconds": float(total.max()),
+            "missed_deadlines": int(sum(metrics["missed_deadline"]
+                                        for metrics in self.metrics)),
+            "failed_reads": int(sum(metrics["failed_reads"]
+                                    for metrics in self.metrics)),
+            "failed_writes": int(sum(metrics["failed_writes"]
+                                     for metrics in self.metrics)),
+        }
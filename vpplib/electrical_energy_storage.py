@@ -12,10 +12,13 @@ import datetime as dt
 import time
 from configparser import ConfigParser
 
-import PySAM.BatteryStateful as battery
+# PySAM is imported in init_battery_stateful
 
 
 class ElectricalEnergyStorage(Component):
+
+    state_attributes = ("state_of_charge", "timeseries")
+
     def __init__(
         self,
         capacity,
@@ -142,6 +145,7 @@ class ElectricalEnergyStorage(Component):
         ...
 
         """
+        self.expand_time_series()
 
         if residual_load >= 0:
             return self.discharge(residual_load)
@@ -149,6 +153,39 @@ class ElectricalEnergyStorage(Component):
         elif residual_load < 0:
             return self.charge(residual_load)
 
+    def step(self, timestamp, data):
+        """
+        Info
+        ----
+        Operate the storage for one timestep in streaming operation.
+
+        Parameters
+        ----------
+        timestamp : str or datetime
+            The timestamp of the timestep.
+        data : dict or pandas.Series
+            The residual load of the timestep in kW under the identifier,
+            see operate_storage.
+
+        Returns
+        -------
+        dict or None
+            state_of_charge and residual_load after the operation, None if
+            data holds no residual load of the storage.
+
+        """
+        if self.identifier not in data:
+            return None
+
+        state_of_charge, residual_load = self.operate_storage(
+            residual_load=float(data[self.identifier])
+        )
+
+        return {
+            "state_of_charge": state_of_charge,
+            "residual_load": residual_load,
+        }
+
     # ===================================================================================
     # Observation Functions
     # ===================================================================================
@@ -357,7 +394,11 @@ class ElectricalEnergyStorage(Component):
     # Override balancing function from super class.
     def value_for_timestamp(self, timestamp):
 
-        if type(timestamp) == int:
+        if self.stream is not None:
+
+            return self.stream.value(timestamp, "residual_load")
+
+        elif type(timestamp) == int:
 
             return self.timeseries.iloc[timestamp]["residual_load"]
 
@@ -432,6 +473,8 @@ class PySAMBatteryStateful(Component):
                             C_rate=0.200, Vcut=2,
                             initial_SOC=50.0, maximum_SOC=95.0, minimum_SOC=5.0):
 
+        import PySAM.BatteryStateful as battery
+
         self.battery_config = {
             # Control using current (0) or power (1) [0/1]
             "control_mode": 1,
@@ -602,6 +645,7 @@ class PySAMBatteryStateful(Component):
             The power that is charged/discharged.
 
         """
+        self.expand_time_series()
         self.battery_stateful.Controls.input_power = load
         self.battery_stateful.execute()
         
@@ -11,20 +11,19 @@ and provides this data to the components of the virtual power plant for simulati
 
 import pandas as pd
 import os
+import csv
+import json
 import zoneinfo
-import polars as pl
 import datetime
-_ = pl.Config.set_tbl_hide_dataframe_shape(True)
-from wetterdienst.provider.dwd.observation import (
-    DwdObservationRequest,
-    DwdObservationResolution,
-)
-from wetterdienst.provider.dwd.mosmix import DwdMosmixRequest, DwdMosmixType
-from wetterdienst import Settings
-from pvlib import irradiance
-from pvlib.solarposition import get_solarposition
+import zlib
+from collections import defaultdict
 import numpy as np
 
+from vpplib import instrumentation
+
+# polars, wetterdienst and pvlib are imported where they are used, so that
+# importing vpplib does not pay for them unless weather data is processed.
+
 class Environment(object):
     """Environment class for providing external data to the virtual power plant simulation.
     
@@ -63,6 +62,8 @@ class Environment(object):
         Whether to force the end time.
     use_timezone_aware_time_index : bool
         Whether to use timezone-aware time index.
+    use_polars_processing : bool
+        Whether DWD observation data is pivoted, cleaned and resampled in polars.
     """
     
     def __init__(
@@ -82,6 +83,7 @@ class Environment(object):
         surpress_output_globally = True,
         force_end_time = False,
         use_timezone_aware_time_index = False,
+        use_polars_processing = False,
     ):
         """Initialize an Environment object.
         
@@ -117,6 +119,10 @@ class Environment(object):
             Whether to force the end time (default: False).
         use_timezone_aware_time_index : bool, optional
             Whether to use timezone-aware time index (default: False).
+        use_polars_processing : bool, optional
+            Whether DWD observation data is pivoted, cleaned and resampled
+            lazily in polars and only converted to pandas at the end
+            (default: False). MOSMIX data is always processed in pandas.
         """
         self.timebase = timebase
         self.timezone = zoneinfo.ZoneInfo(timezone)
@@ -133,6 +139,7 @@ class Environment(object):
         self.__surpress_output_globally = surpress_output_globally
         self.__force_end_time = force_end_time
         self.__use_timezone_aware_time_index = use_timezone_aware_time_index
+        self.__use_polars_processing = use_polars_processing
         if not start is None and not end is None:
             
             if type(self.start) == str:
@@ -222,26 +229,155 @@ class Environment(object):
 
 
 
-    def get_pv_data(self, file):
+    def __read_csv_cached(self, file, read_function, use_cache = True):
+        """
+            Reads a csv file with a binary sidecar cache.
 
-        self.pv_data = pd.read_csv(file, index_col="time")
-        self.pv_data.index = pd.to_datetime(self.pv_data.index)
+            The parsed DataFrame is stored next to the csv file as
+            '<file>.parquet' with the modification time of the csv file.
+            The sidecar is reused as long as the modification time of the
+            csv file is unchanged. Caching is skipped if pyarrow is not
+            installed or the directory is not writable.
+
+            Parameters
+            ----------
+            file : str
+                Path of the csv file.
+            read_function : callable
+                Function that parses the csv file into a DataFrame.
+            use_cache : bool, optional
+                Whether to read and write the sidecar cache (default: True).
+
+            Returns
+            -------
+            df : pandas.DataFrame
+                Parsed data of the csv file.
+        """
+        sidecar = str(file) + ".parquet"
+        if use_cache:
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                use_cache = False
+        if use_cache:
+            csv_mtime = os.stat(file).st_mtime_ns
+            if os.path.exists(sidecar) and os.stat(sidecar).st_mtime_ns == csv_mtime:
+                try:
+                    return pd.read_parquet(sidecar)
+                except Exception:
+                    pass
+
+        df = read_function(file)
+
+        if use_cache:
+            try:
+                df.to_parquet(sidecar)
+                os.utime(sidecar, ns = (csv_mtime, csv_mtime))
+            except (OSError, ValueError):
+                pass
+        return df
+
+    @staticmethod
+    def __read_time_series_csv(file, parse_dates = True):
+        """Reads a csv file with a 'time' column and float columns."""
+        df = pd.read_csv(
+            file,
+            index_col = "time",
+            dtype = defaultdict(lambda: np.float64, time = str),
+            )
+        if parse_dates:
+            df.index = pd.to_datetime(df.index, format = "ISO8601")
+        return df
+
+    @staticmethod
+    def __read_wind_csv(file):
+        """Reads a windpowerlib csv file with parameter names and heights as header."""
+        with open(file, newline = "") as csv_file:
+            reader = csv.reader(csv_file)
+            names = next(reader)
+            heights = next(reader)
+            index_name = next(reader)[0]
+        df = pd.read_csv(
+            file,
+            skiprows = 3,
+            header = None,
+            index_col = 0,
+            dtype = defaultdict(lambda: np.float64, {0: str}),
+            )
+        df.index = pd.to_datetime(df.index, format = "ISO8601")
+        df.index.name = index_name
+        df.columns = pd.MultiIndex.from_arrays(
+            [names[1:], [int(height) for height in heights[1:]]])
+        return df
+
+    @instrumentation.timed()
+    def get_pv_data(self, file, use_cache = True):
+        """
+        Imports photovoltaic weather data from a csv file.
+
+        Parameters
+        ----------
+        file : str
+            Filename of the csv file with a 'time' column and irradiance columns.
+        use_cache : bool, optional
+            Whether to use the binary sidecar cache of the csv file (default: True).
+
+        Returns
+        -------
+        pv_data : pandas.DataFrame
+            Weather data with datetime index.
+        """
+        self.pv_data = self.__read_csv_cached(
+            file, self.__read_time_series_csv, use_cache)
 
         return self.pv_data
 
-    def get_mean_temp_days(self, file):
+    @instrumentation.timed()
+    def get_mean_temp_days(self, file, use_cache = True):
+        """
+        Imports daily mean temperatures from a csv file.
 
-        self.mean_temp_days = pd.read_csv(file, index_col="time")
+        Parameters
+        ----------
+        file : str
+            Filename of the csv file with a 'time' and 'temperature' column.
+        use_cache : bool, optional
+            Whether to use the binary sidecar cache of the csv file (default: True).
+
+        Returns
+        -------
+        mean_temp_days : pandas.DataFrame
+            Temperatures indexed by the time strings of the file.
+        """
+        self.mean_temp_days = self.__read_csv_cached(
+            file, lambda file: self.__read_time_series_csv(file, parse_dates = False), use_cache)
 
         return self.mean_temp_days
 
-    def get_mean_temp_hours(self, file):
+    @instrumentation.timed()
+    def get_mean_temp_hours(self, file, use_cache = True):
+        """
+        Imports hourly mean temperatures from a csv file.
+
+        Parameters
+        ----------
+        file : str
+            Filename of the csv file with a 'time' and 'temperature' column.
+        use_cache : bool, optional
+            Whether to use the binary sidecar cache of the csv file (default: True).
 
-        self.mean_temp_hours = pd.read_csv(file, index_col="time")
+        Returns
+        -------
+        mean_temp_hours : pandas.DataFrame
+            Temperatures indexed by the time strings of the file.
+        """
+        self.mean_temp_hours = self.__read_csv_cached(
+            file, lambda file: self.__read_time_series_csv(file, parse_dates = False), use_cache)
 
         return self.mean_temp_hours
 
-    def get_wind_data(self, file, utc=False):
+    @instrumentation.timed()
+    def get_wind_data(self, file, utc=False, use_cache = True):
 
         r"""
         Imports weather data from a file.
@@ -259,6 +395,9 @@ class Environment(object):
             
         utc : boolean
             Decide, weather to use utc conversion or not
+
+        use_cache : boolean
+            Whether to use the binary sidecar cache of the csv file (default: True).
     
         Returns
         -------
@@ -272,37 +411,439 @@ class Environment(object):
                 (e.g. 10, if it was measured at a height of 10 m).
     
         """
+        df = self.__read_csv_cached(file, self.__read_wind_csv, use_cache)
 
         if utc == True:
-            df = pd.read_csv(
-                file,
-                index_col=0,
-                header=[0, 1],
-                date_parser=lambda idx: pd.to_datetime(idx, utc=True),
-            )
-            # change type of index to datetime and set time zone
-            df.index = pd.to_datetime(df.index).tz_convert(self.timezone)
-
-        else:
-            df = pd.read_csv(file, index_col=0, header=[0, 1])
-            df.index = pd.to_datetime(df.index)
+            # time stamps of the file are given in UTC
+            df.index = df.index.tz_localize("UTC").tz_convert(self.timezone)
 
-        # change type of height from str to int by resetting columns
-        l0 = [_[0] for _ in df.columns]
-        l1 = [int(_[1]) for _ in df.columns]
-        df.columns = [l0, l1]
         self.wind_data = df
 
         return self.wind_data
 
+    _weather_store_frames = (
+        "pv_data",
+        "wind_data",
+        "temp_data",
+        "mean_temp_days",
+        "mean_temp_hours",
+        "mean_temp_quarter_hours",
+    )
+
+    def export_weather_store(self, path):
+        """
+        Exports the weather data to a memory-mapped columnar store.
+
+        Every DataFrame in pv_data, wind_data, temp_data, mean_temp_days,
+        mean_temp_hours and mean_temp_quarter_hours is written as one
+        float64 array with one contiguous row per column plus its index.
+        The time settings of the Environment are stored in metadata.json.
+
+        Parameters
+        ----------
+        path : str
+            Directory of the store. It is created if necessary.
+
+        Returns
+        -------
+        path : str
+            Directory of the store.
+
+        Notes
+        -----
+        Reopen the store with Environment.from_weather_store. Workers of a
+        multiprocessing pool that open the same store share one physical
+        copy of the weather data through the page cache.
+        """
+        os.makedirs(path, exist_ok = True)
+        metadata = {
+            "timebase": self.timebase,
+            "timezone": str(self.timezone),
+            "start": None,
+            "end": None,
+            "year": self.year,
+            "time_freq": self.time_freq,
+            "surpress_output_globally": self.__surpress_output_globally,
+            "force_end_time": self.__force_end_time,
+            "use_timezone_aware_time_index": self.__use_timezone_aware_time_index,
+            "use_polars_processing": self.__use_polars_processing,
+            "frames": {},
+            }
+        if self.start is not None and self.end is not None:
+            metadata["start"] = self.__start_dt_target_tz.strftime('%Y-%m-%d %H:%M:%S')
+            metadata["end"] = self.__end_dt_target_tz.strftime('%Y-%m-%d %H:%M:%S')
+
+        for name in self._weather_store_frames:
+            df = getattr(self, name)
+            if not isinstance(df, pd.DataFrame) or df.empty:
+                continue
+            values = np.ascontiguousarray(df.to_numpy(dtype = np.float64).T)
+            np.save(os.path.join(path, name + ".values.npy"), values)
+
+            if isinstance(df.index, pd.DatetimeIndex):
+                index_kind = "datetime"
+                index_values = df.index.as_unit("ns").asi8
+                index_tz = None if df.index.tz is None else str(df.index.tz)
+            else:
+                index_kind = "string"
+                index_values = df.index.to_numpy(dtype = str)
+                index_tz = None
+            np.save(os.path.join(path, name + ".index.npy"), index_values)
+
+            if isinstance(df.columns, pd.MultiIndex):
+                columns = [[level for level in column] for column in df.columns]
+            else:
+                columns = list(df.columns)
+            metadata["frames"][name] = {
+                "columns": columns,
+                "multiindex": isinstance(df.columns, pd.MultiIndex),
+                "column_names": list(df.columns.names),
+                "index_kind": index_kind,
+                "index_name": df.index.name,
+                "index_tz": index_tz,
+                }
+
+        with open(os.path.join(path, "metadata.json"), "w") as metadata_file:
+            json.dump(metadata, metadata_file, indent = 2, default = str)
+        return path
+
+    @staticmethod
+    def __read_weather_store_frame(path, name, frame_metadata):
+        """Opens one DataFrame of a weather store as read-only view on the memory map."""
+        values = np.load(os.path.join(path, name + ".values.npy"), mmap_mode = "r")
+        index_values = np.load(os.path.join(path, name + ".index.npy"), mmap_mode = "r")
+
+        if frame_metadata["index_kind"] == "datetime":
+            index = pd.DatetimeIndex(index_values.view("M8[ns]"), name = frame_metadata["index_name"])
+            if frame_metadata["index_tz"] is not None:
+                try:
+                    index_tz = zoneinfo.ZoneInfo(frame_metadata["index_tz"])
+                except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+                    index_tz = frame_metadata["index_tz"]
+                index = index.tz_localize("UTC").tz_convert(index_tz)
+        else:
+            index = pd.Index(index_values.astype(object), name = frame_metadata["index_name"])
+
+        if frame_metadata["multiindex"]:
+            columns = pd.MultiIndex.from_tuples(
+                [tuple(column) for column in frame_metadata["columns"]],
+                names = frame_metadata["column_names"])
+        else:
+            columns = pd.Index(frame_metadata["columns"], name = frame_metadata["column_names"][0])
+
+        #values.T is a view, the DataFrame uses the memory map without copy
+        return pd.DataFrame(values.T, index = index, columns = columns, copy = False)
+
+    @classmethod
+    @instrumentation.timed()
+    def from_weather_store(cls, path, **kwargs):
+        """
+        Creates an Environment from a store written by export_weather_store.
+
+        The weather DataFrames are read-only, zero-copy views on the memory
+        mapped files. Pickling the returned Environment only transfers the
+        path of the store for these DataFrames, so multiprocessing workers
+        reopen the memory map instead of copying the data.
+
+        Parameters
+        ----------
+        path : str
+            Directory of the store.
+        **kwargs
+            Arguments of Environment, overriding the stored settings.
+
+        Returns
+        -------
+        environment : Environment
+            Environment with the time settings and weather data of the store.
+        """
+        with open(os.path.join(path, "metadata.json")) as metadata_file:
+            metadata = json.load(metadata_file)
+        frames = metadata.pop("frames")
+        metadata.update(kwargs)
+        environment = cls(**metadata)
+        environment.__open_weather_store(path, frames)
+        return environment
+
+    def __open_weather_store(self, path, frames):
+        """Attaches the DataFrames of a weather store to the Environment."""
+        self.__weather_store = {
+            "path": os.path.abspath(path),
+            "frames": {},
+            }
+        for name, frame_metadata in frames.items():
+            df = self.__read_weather_store_frame(path, name, frame_metadata)
+            setattr(self, name, df)
+            self.__weather_store["frames"][name] = (df, frame_metadata)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        weather_store = state.pop("_Environment__weather_store", None)
+        if weather_store is not None:
+            reopen = {}
+            for name, (df, frame_metadata) in weather_store["frames"].items():
+                #Only replace DataFrames, which were not changed by the user
+                if state.get(name) is df:
+                    state[name] = []
+                    reopen[name] = frame_metadata
+            state["_Environment__weather_store_reopen"] = (weather_store["path"], reopen)
+        return state
+
+    def __setstate__(self, state):
+        reopen = state.pop("_Environment__weather_store_reopen", None)
+        self.__dict__.update(state)
+        if reopen is not None:
+            self.__open_weather_store(*reopen)
+
+    def fingerprint(self, data = None):
+        """
+        Calculates a content hash of the time settings and the weather data.
+
+        The hash of every data attribute is calculated once and reused
+        while the attribute, its index, shape and a checksum of its values
+        are unchanged, so data changed in place is hashed again.
+
+        Parameters
+        ----------
+        data : iterable of str, optional
+            Names of the data attributes to include, e.g. ("pv_data",).
+            By default all weather DataFrames are included.
+
+        Returns
+        -------
+        str
+            Hexadecimal sha256 digest, used as part of the key of the
+            TimeseriesCache.
+        """
+        from vpplib.timeseries_cache import fingerprint
+
+        if data is None:
+            data = self._weather_store_frames
+        settings = (
+            self.start,
+            self.end,
+            self.year,
+            self.time_freq,
+            self.timebase,
+            str(self.timezone),
+            self.__force_end_time,
+            self.__use_timezone_aware_time_index,
+            )
+        return fingerprint(
+            settings, {name: self.__data_fingerprint(name) for name in data}
+        )
+
+    def __data_fingerprint(self, name):
+        """Return the content hash of a data attribute, memoized.
+
+        The hash is recalculated if the attribute is reassigned (see
+        __setattr__), its index or shape changed or the checksum of its
+        values (see __data_checksum) differs, e.g. after
+        ``pv_data.loc[...] = ...``.
+        """
+        from vpplib.timeseries_cache import fingerprint
+
+        value = getattr(self, name, None)
+        index = getattr(value, "index", None)
+        shape = getattr(value, "shape", None)
+        checksum = self.__data_checksum(value)
+        fingerprints = self.__dict__.setdefault("_data_fingerprints", {})
+        memo = fingerprints.get(name)
+        if (memo is not None and memo[0] is value and memo[1] is index
+                and memo[2] == shape and checksum is not None
+                and memo[3] == checksum):
+            return memo[4]
+        digest = fingerprint(value)
+        fingerprints[name] = (value, index, shape, checksum, digest)
+
+        return digest
+
+    @staticmethod
+    def __data_checksum(value):
+        """Return a CRC32 of the values of a DataFrame or Series.
+
+        About ten times faster than the content hash of fingerprint. None
+        for other objects, which are always hashed again.
+        """
+        if isinstance(value, pd.Series):
+            columns = [value]
+        elif isinstance(value, pd.DataFrame):
+            values = value.to_numpy()
+            if not values.dtype.hasobject:
+                # a frame of one dtype is usually one block, whose transpose
+                # is contiguous and not copied
+                return zlib.crc32(np.ascontiguousarray(values.T))
+            columns = [value.iloc[:, i] for i in range(value.shape[1])]
+        else:
+            return None
+        checksum = 0
+        for column in columns:
+            values = column.to_numpy()
+            if values.dtype.hasobject:
+                values = pd.util.hash_pandas_object(column, index=False).to_numpy()
+            checksum = zlib.crc32(np.ascontiguousarray(values), checksum)
+
+        return checksum
+
+    def __setattr__(self, name, value):
+        # reassigning data invalidates its memoized hash, see fingerprint
+        fingerprints = self.__dict__.get("_data_fingerprints")
+        if fingerprints is not None:
+            fingerprints.pop(name, None)
+        object.__setattr__(self, name, value)
+
     def get_time_from_dwd(self):
         #Get time from dwd server
+        from wetterdienst.provider.dwd.observation import (
+            DwdObservationRequest,
+            DwdObservationResolution,
+        )
+
         wd_time_result = DwdObservationRequest(
             parameter  = "wind_speed",
             resolution = DwdObservationResolution.HOURLY,
         )
         return wd_time_result.now.replace(second=0,microsecond=0)
         
+    def __get_solar_position(self, date, lat, lon, height, pressure = None, temperature = None):
+        """
+            Calculates the solar zenith angles for the middle of each time intervall.
+
+            Parameters
+            ----------
+            date : pandas.DatetimeIndex
+                date assumet in UTC if no tz given
+            lat : float
+                Latitude of the location.
+            lon : float
+                Longitude of the location.
+            height : float
+                Altitude or height of the location. [m]
+            pressure : array-like, optional
+                pressure at height      [Pa]
+            temperature : array-like, optional
+                temperature at height   [C], 12 °C if not given
+
+            Returns
+            -------
+            zenith, apparent_zenith : numpy.ndarray
+                Solar zenith and apparent zenith angles [°] in the order of date.
+        """
+        from pvlib.solarposition import get_solarposition
+
+        #https://pvlib-python.readthedocs.io/en/stable/reference/generated/pvlib.solarposition.get_solarposition.html#pvlib.solarposition.get_solarposition
+        #Shift by -30 min to get the solar position for the middle of the time intervall
+        #Arrays are passed to aviod index alignment of pressure and temperature with the shifted date index
+        solpos = get_solarposition(
+                    date.shift(freq = '-30min'),
+                    latitude    = lat,
+                    longitude   = lon,
+                    altitude    = height,
+                    pressure    = None if pressure is None else np.asarray(pressure, dtype = float),
+                    temperature = 12 if temperature is None else np.asarray(temperature, dtype = float)
+                    )
+        return solpos.zenith.to_numpy(), solpos.apparent_zenith.to_numpy()
+
+    def __decompose_ghi(self, date, ghi, zenith, apparent_zenith, pressure = None, dew_point = None, methode_lst = ['disc']):
+        """
+            Estimates DNI and DHI from GHI for several methods in one pass.
+
+            All inputs are NumPy arrays of shape (time,) or (time, stations).
+            The solar position is calculated once by the caller and shared by
+            all methods. 'disc', 'erbs' and 'boland' work element-wise on the
+            flattened arrays, 'dirint' needs a time series per station.
+
+            Parameters
+            ----------
+            date : pandas.DatetimeIndex
+                Timestamps of the first axis.
+            ghi : numpy.ndarray
+                Global Irradiance       [W/m2]
+            zenith : numpy.ndarray
+                Solar zenith angle      [°]
+            apparent_zenith : numpy.ndarray
+                Apparent solar zenith angle [°]
+            pressure : numpy.ndarray, optional
+                pressure at height      [Pa]
+            dew_point : numpy.ndarray, optional
+                dew point               [C], only used by 'dirint'
+            methode_lst : list, optional
+                Options: 'disc', 'erbs', 'dirint', 'boland' (default is ['disc']).
+
+            Returns
+            -------
+            decomposition : dict
+                {methode: {'dni': numpy.ndarray, 'dhi': numpy.ndarray}} with
+                the shape of ghi.
+        """
+        from pvlib import irradiance
+
+        shape = ghi.shape
+        doy = np.broadcast_to(
+            date.dayofyear.to_numpy().reshape((-1,) + (1,) * (ghi.ndim - 1)), shape
+            ).ravel()
+        flat_ghi = ghi.ravel()
+        flat_zenith = zenith.ravel()
+        flat_pressure = None if pressure is None else np.broadcast_to(pressure, shape).ravel()
+        cos_apparent_zenith = np.cos(np.radians(apparent_zenith))
+
+        decomposition = {}
+        for methode in methode_lst:
+            if methode == 'disc':
+                dni = irradiance.disc(
+                            ghi             = flat_ghi,
+                            solar_zenith    = flat_zenith,
+                            datetime_or_doy = doy,
+                            pressure        = flat_pressure,
+                            )['dni'].reshape(shape)
+                dhi = ghi - dni * cos_apparent_zenith
+
+            elif methode == 'erbs':
+                out_erbs = irradiance.erbs(
+                            ghi             = flat_ghi,
+                            zenith          = flat_zenith,
+                            datetime_or_doy = doy
+                            )
+                dni = out_erbs['dni'].reshape(shape)
+                dhi = out_erbs['dhi'].reshape(shape)
+
+            elif methode == 'dirint':
+                ghi_2d = ghi.reshape(len(date), -1)
+                dni = np.empty(ghi_2d.shape)
+                for column in range(ghi_2d.shape[1]):
+                    dni[:, column] = irradiance.dirint(
+                                ghi          = pd.Series(ghi_2d[:, column], index = date),
+                                solar_zenith = pd.Series(zenith.reshape(ghi_2d.shape)[:, column], index = date),
+                                times        = date,
+                                pressure     = None if pressure is None else pd.Series(
+                                    np.broadcast_to(pressure, shape).reshape(ghi_2d.shape)[:, column], index = date),
+                                temp_dew     = None if dew_point is None else pd.Series(
+                                    np.broadcast_to(dew_point, shape).reshape(ghi_2d.shape)[:, column], index = date)
+                                ).to_numpy()
+                dni = dni.reshape(shape)
+                dhi = ghi - dni * cos_apparent_zenith
+                dni = np.nan_to_num(dni, nan = 0.0)
+                dhi = np.nan_to_num(dhi, nan = 0.0)
+
+            elif methode == 'boland':
+                out_boland = irradiance.boland(
+                            ghi             = flat_ghi,
+                            solar_zenith    = flat_zenith,
+                            datetime_or_doy = doy,
+                            a_coeff         = 8.645,
+                            b_coeff         = 0.613,
+                            min_cos_zenith  = 0.065,
+                            max_zenith      = 87
+                            )
+                dni = out_boland['dni'].reshape(shape)
+                dhi = out_boland['dhi'].reshape(shape)
+
+            else:
+                raise ValueError("Unknown estimation methode: " + str(methode))
+
+            decomposition[methode] = {'dni': dni, 'dhi': dhi}
+        return decomposition
+
     def __get_solar_parameter (self, date, ghi, lat, lon, height, temperature = None, pressure = None, dew_point = None, methode = 'disc', use_methode_name_in_columns = False, extended_solar_data = False,):
         """
             Calculates solar parameters based on the given method by using pvlib estimation modells.
@@ -325,9 +866,10 @@ class Environment(object):
                  drew point             [C]
             pressure : list or series, optional
                 pressure at height      [Pa]
-            method : str, optional
-                Method for solar parameter calculation (default is 'disc').
+            method : str or list, optional
+                Method or list of methods for solar parameter calculation (default is 'disc').
                 Options: 'disc', 'erbs', 'dirint', 'boland'.
+                The solar position is calculated once and shared by all methods.
             use_method_name_in_columns : bool, optional
                 If True, method name is included in the column names of the output DataFrame (default is False).
             extended_solar_data : bool
@@ -347,98 +889,93 @@ class Environment(object):
             - Examples:
                 https://pvlib-python.readthedocs.io/en/stable/gallery/irradiance-decomposition/plot_diffuse_fraction.html#sphx-glr-gallery-irradiance-decomposition-plot-diffuse-fraction-py
         """
-        
-        """
-        https://pvlib-python.readthedocs.io/en/stable/reference/generated/pvlib.solarposition.get_solarposition.html#pvlib.solarposition.get_solarposition
-        """
-        
-        #Calculate solar position parameters
-        #Shift by -30 min to get the solar position for the middle of the time intervall
-        #The index has to be converted to a list, to aviod index alignment of the series pressure and temperature with the shifted date index
-        solpos = get_solarposition(
-                    list(date.shift(freq = '-30min')), 
-                    latitude    = lat,
-                    longitude   = lon, 
-                    altitude    = height,
-                    pressure    = pressure,
-                    temperature = temperature if temperature is not None else 12
-                    )
-        #Shift back after calculation
-        solpos.index = date
-            
-        if methode == 'disc':
-            out_disc = irradiance.disc(
-                        ghi             = ghi, 
-                        solar_zenith    = solpos.zenith, 
-                        datetime_or_doy = date, 
-                        pressure        = pressure,
-                        )
-        
-            df_disc = irradiance.complete_irradiance(
-                        solar_zenith = solpos.apparent_zenith, 
-                        ghi          = ghi, 
-                        dni          = out_disc.dni,
-                        dhi          = None
-                        )
-            out_disc['dhi'] = df_disc.dhi
-            out_df = out_disc.drop(['kt', 'airmass'],axis = 1)
-            
-            
-        elif methode == 'erbs':
-            out_erbs = irradiance.erbs(
-                        ghi             = ghi,
-                        zenith          = solpos.zenith, 
-                        datetime_or_doy = date
-                        )
-            out_df = out_erbs.drop(['kt'],axis = 1)
-            
-        elif methode == 'dirint':
-            dni_dirint = irradiance.dirint(
-                            ghi          = ghi, 
-                            solar_zenith = solpos.zenith, 
-                            times        = date, 
-                            pressure     = pressure,
-                            temp_dew     = dew_point
-                            )
-        
-            df_dirint = irradiance.complete_irradiance(
-                            solar_zenith = solpos.apparent_zenith,
-                            ghi          = ghi, 
-                            dni          = dni_dirint,
-                            dhi          = None
-                            )
-            out_dirint = pd.DataFrame(
-                            {'dni': dni_dirint, 'dhi': df_dirint.dhi}, index = date
-                            )
-            out_df = out_dirint.fillna(0)
-            
-        elif methode == 'boland':
-            out_boland = irradiance.boland(
-                            ghi             = ghi,
-                            solar_zenith    = solpos.zenith,
-                            datetime_or_doy = date, 
-                            a_coeff         = 8.645, 
-                            b_coeff         = 0.613, 
-                            min_cos_zenith  = 0.065, 
-                            max_zenith      = 87
-                            )
-            out_df = out_boland.drop(['kt'], axis = 1)
+        methode_lst = [methode] if isinstance(methode, str) else list(methode)
+        ghi = np.asarray(ghi, dtype = float)
+        zenith, apparent_zenith = self.__get_solar_position(
+            date, lat, lon, height, pressure = pressure, temperature = temperature)
+        decomposition = self.__decompose_ghi(
+            date, ghi, zenith, apparent_zenith,
+            pressure  = None if pressure  is None else np.asarray(pressure,  dtype = float),
+            dew_point = None if dew_point is None else np.asarray(dew_point, dtype = float),
+            methode_lst = methode_lst)
+
+        out_df = pd.DataFrame(index = date)
+        for methode in methode_lst:
+            columns = dict(decomposition[methode])
+            if extended_solar_data:
+                columns['bh'] = ghi - columns['dhi']
+                columns['zenith'] = zenith
+                if temperature is not None:
+                    columns['apparent_zenith'] = apparent_zenith
+            #Add methode to column name of the parameters
+            for column, values in columns.items():
+                out_df[column + '_' + methode if use_methode_name_in_columns else column] = values
 
-        if extended_solar_data:
-            out_df['bh'] = ghi - out_df['dhi']
-            out_df['zenith'] = solpos.zenith
-            if temperature is not None:
-                out_df['apparent_zenith'] = solpos.apparent_zenith
-        
-        
-        #Add methode to column name of the parameters
-        if use_methode_name_in_columns: out_df.columns = [str(col) + '_' + methode for col in out_df.columns]
-        
         #Delete values in out_df, when ghi is NaN.
-        out_df.where(cond=(np.isnan(ghi) != True), other=None, inplace=True)
+        out_df.loc[np.isnan(ghi)] = None
 
         return out_df
 
+    def get_solar_parameter_batch(self, date, ghi, lat, lon, height, temperature = None, pressure = None, dew_point = None, methode_lst = ['disc']):
+        """
+            Calculates solar parameters for several stations at once.
+
+            The GHI series of all stations are processed as one 2-D array.
+            The solar position is calculated once per station and shared by
+            all methods.
+
+            Parameters
+            ----------
+            date : pandas.DatetimeIndex
+                date assumet in UTC if no tz given
+            ghi : pandas.DataFrame or numpy.ndarray
+                Global Irradiance [W/m2] with one column per station.
+            lat, lon, height : array-like
+                Latitude, longitude and height [m] of each station.
+            temperature : pandas.DataFrame or numpy.ndarray, optional
+                temperature at height   [C] with the shape of ghi
+            pressure : pandas.DataFrame or numpy.ndarray, optional
+                pressure at height      [Pa] with the shape of ghi
+            dew_point : pandas.DataFrame or numpy.ndarray, optional
+                dew point               [C] with the shape of ghi
+            methode_lst : list, optional
+                Options: 'disc', 'erbs', 'dirint', 'boland' (default is ['disc']).
+
+            Returns
+            -------
+            out_df : pandas.DataFrame
+                DataFrame indexed by date with the column levels 'station' and
+                'parameter' ('dni_<methode>', 'dhi_<methode>').
+        """
+        stations = list(ghi.columns) if isinstance(ghi, pd.DataFrame) else list(range(np.shape(ghi)[1]))
+        ghi = np.asarray(ghi, dtype = float)
+        lat, lon, height = (np.broadcast_to(np.asarray(value, dtype = float), (len(stations),)) for value in (lat, lon, height))
+
+        def as_array(values):
+            return None if values is None else np.broadcast_to(np.asarray(values, dtype = float), ghi.shape)
+        temperature, pressure, dew_point = as_array(temperature), as_array(pressure), as_array(dew_point)
+
+        zenith = np.empty(ghi.shape)
+        apparent_zenith = np.empty(ghi.shape)
+        for column in range(len(stations)):
+            zenith[:, column], apparent_zenith[:, column] = self.__get_solar_position(
+                date, lat[column], lon[column], height[column],
+                pressure    = None if pressure    is None else pressure[:, column],
+                temperature = None if temperature is None else temperature[:, column])
+
+        decomposition = self.__decompose_ghi(
+            date, ghi, zenith, apparent_zenith,
+            pressure = pressure, dew_point = dew_point, methode_lst = methode_lst)
+
+        invalid = np.isnan(ghi)
+        frames = {}
+        for methode in methode_lst:
+            for parameter, values in decomposition[methode].items():
+                frames[parameter + '_' + methode] = pd.DataFrame(
+                    np.where(invalid, np.nan, values), index = date, columns = stations)
+        out_df = pd.concat(frames, axis = 1, names = ['parameter', 'station'])
+        return out_df.swaplevel(axis = 1).sort_index(axis = 1, level = 'station', sort_remaining = False)
+
     def __get_solar_power_from_energy(self, df, query_type):
         """
             Calculates solar power from solar energy data.
@@ -597,8 +1134,195 @@ class Environment(object):
         df = df.reindex(sorted(df.columns), axis=1)
         df = round(df,2)
         return df
-    
-    
+
+    def __resample_data_polars(self, pl_df, time_freq = None):
+        """
+            Resamples and interpolates weather data in polars.
+
+            Polars counterpart of __resample_data. All steps are collected in
+            one lazy query, so polars can run them multi-threaded, and the
+            result is converted to pandas only once at the end.
+
+            Parameters
+            ----------
+            pl_df : polars.DataFrame or polars.LazyFrame
+                Weather data with a timezone aware 'date' column and one
+                column per parameter.
+            time_freq : str, optional
+                Time frequency for resampling, e.g., '60 min' for hourly. If not provided,
+                the time frequency from the class instance is used.
+
+            Returns
+            -------
+            resampled_df : pandas.DataFrame
+                DataFrame with resampled and interpolated weather data and a
+                datetime index named 'time', see __resample_data.
+
+            Notes
+            -----
+            - Missing data marked with -999 is replaced by null.
+            - Gaps are filled by linear interpolation. Missing values at the end
+            are filled with the last valid value unless force_end_time is set.
+            - Timestamps without data after resampling are filled the same way.
+        """
+        import polars as pl
+
+        if time_freq is None:
+            time_freq = self.time_freq
+        every = str(int(pd.Timedelta(time_freq).total_seconds())) + "s"
+        timezone = str(self.timezone)
+
+        lf = pl_df.lazy().with_columns(
+            pl.col("date").dt.convert_time_zone(timezone))
+        parameter_columns = [column for column in lf.collect_schema().names() if column != "date"]
+
+        def fill_missing(column):
+            #if force_end_time == True keep the missing values at the end
+            expression = pl.col(column).interpolate()
+            if not self.__force_end_time:
+                expression = expression.forward_fill()
+            return expression
+
+        #Missing dwd data is marked with -999. Replace by null and interpolate
+        lf = lf.sort("date").with_columns([
+            pl.when(pl.col(column) == -999).then(None).otherwise(pl.col(column)).alias(column)
+            for column in parameter_columns
+            ]).with_columns([fill_missing(column) for column in parameter_columns])
+
+        #Resample to given resolution
+        lf = lf.group_by_dynamic(
+            "date", every = every, closed = "left", label = "left"
+            ).agg([pl.col(column).mean() for column in parameter_columns])
+
+        #Add empty intervals (upsampling) and interpolate over them
+        bounds = lf.select(
+            pl.col("date").min().alias("first"),
+            pl.col("date").max().alias("last")
+            ).collect()
+        full_range = pl.LazyFrame({
+            "date": pl.datetime_range(
+                bounds["first"][0], bounds["last"][0],
+                interval = every, time_zone = timezone, eager = True)
+            }).with_columns(pl.col("date").cast(lf.collect_schema()["date"]))
+        lf = full_range.join(lf, on = "date", how = "left").with_columns(
+            [fill_missing(column) for column in parameter_columns])
+
+        #Remove timestamps which are not needed
+        lf = lf.filter(pl.col("date") <= self.__end_dt_target_tz)
+        if not self.__use_timezone_aware_time_index:
+            lf = lf.with_columns(pl.col("date").dt.replace_time_zone(None))
+
+        df = lf.select(
+            ["date"] + [pl.col(column).round(2) for column in sorted(parameter_columns)]
+            ).collect().to_pandas()
+        df = df.set_index("date")
+        df.index.rename("time", inplace = True)
+        return df
+
+    def __process_observation_parameter_polars(self, pl_sorted_data_for_station, dataset, pd_station_metadata = None, extended_solar_data = False):
+        """
+            Processes observation parameters in polars.
+
+            Polars counterpart of __process_observation_parameter with the same
+            input and output units. Only the timestamps are handed to pvlib to
+            calculate the solar zenith angle.
+
+            Parameters
+            ----------
+            pl_sorted_data_for_station : polars.DataFrame
+                DataFrame containing weather data for a station in 10min resolution
+                with a 'date' column.
+            dataset : str
+                Type of weather dataset, either 'solar', 'air' or 'wind'.
+            pd_station_metadata : pandas.DataFrame, optional for wind and temperature dataset, necessary for solar dataset
+                DataFrame containing station metadata.
+            extended_solar_data : bool, optional
+                Same behaviour as in __process_observation_parameter (default is False).
+
+            Returns
+            -------
+            resampled_data : pandas.DataFrame
+                Resampled and processed weather data in class time resolution.
+        """
+        import polars as pl
+        from pvlib import irradiance
+        from pvlib.solarposition import get_solarposition
+
+        lf = pl_sorted_data_for_station.lazy()
+        if dataset == 'solar':
+            date = pl_sorted_data_for_station["date"]
+            resolution = (date[1] - date[0]).total_seconds()
+            lf = lf.with_columns([
+                (pl.col(column) * 10e3 / resolution).alias(column) #/J/cm2 -> J/m2 -> W/m2
+                for column in ['ghi', 'dhi'] if column in pl_sorted_data_for_station.columns
+                ]).with_columns((pl.col('ghi') - pl.col('dhi')).alias('bh'))
+
+            #Zenith angle is calculatet for the middle of the time intervall
+            zenith = get_solarposition(
+                pd.DatetimeIndex(date.to_pandas()).shift(freq = '-5min'),
+                latitude    = pd_station_metadata['latitude' ].values[0],
+                longitude   = pd_station_metadata['longitude'].values[0],
+                altitude    = pd_station_metadata['height'   ].values[0],
+                temperature = 0
+                ).zenith.to_numpy()
+            df = lf.with_columns(pl.Series('zenith', zenith)).collect()
+
+            #Calculate Direct Normal Irradiance (DNI) from GHI and DHI
+            dni = irradiance.dni(
+                ghi = df['ghi'].to_numpy(),
+                dhi = df['dhi'].to_numpy(),
+                zenith = zenith
+                )
+            #Remove sign error for -0.0 values
+            lf = df.lazy().with_columns(pl.Series('dni', dni + 0.0).fill_nan(None))
+
+            if extended_solar_data:
+                lf = lf.drop(['zenith', 'bh'])
+
+        elif dataset == 'wind':
+            lf = lf.with_columns(
+                pl.col('pressure') * 100,       # hPa to Pa
+                pl.col('temperature') + 273.15, #°C to K
+                pl.lit(0.15).alias('roughness_length'),
+                )
+
+        resampled_data = self.__resample_data_polars(lf)
+        if dataset == 'wind':
+            resampled_data.columns = self.__get_multi_index_for_windpowerlib(
+                resampled_data.columns)
+        return resampled_data
+
+    def __pivot_dwd_data_polars(self, pl_unsorted_data_for_station, req_parameter_dict):
+        """
+            Pivots the long format DWD query result in polars.
+
+            Parameters
+            ----------
+            pl_unsorted_data_for_station : polars.DataFrame
+                Query result with the columns 'date', 'parameter' and 'value'.
+            req_parameter_dict : dict
+                Mapping of column names to DWD parameter names.
+
+            Returns
+            -------
+            pl_sorted_data_for_station : polars.DataFrame
+                DataFrame with a 'date' column and one column per parameter.
+        """
+        import polars as pl
+
+        return (
+            pl_unsorted_data_for_station.lazy()
+            .filter(pl.col('parameter').is_in(list(req_parameter_dict.values())))
+            .group_by('date')
+            .agg([
+                pl.col('value').filter(pl.col('parameter') == parameter).first().alias(key)
+                for key, parameter in req_parameter_dict.items()
+                ])
+            .sort('date')
+            .collect()
+            )
+
+
     def __get_multi_index_for_windpowerlib (self, columns):
         """
        Creates a MultiIndex DataFrame for wind-related parameters.
@@ -676,6 +1400,9 @@ class Environment(object):
             __get_multi_index_for_windpowerlib method and resamples the data.
             - Because the air parameter does not need to be processed, the function does not change them.
         """
+        from pvlib import irradiance
+        from pvlib.solarposition import get_solarposition
+
         if dataset == 'solar': 
             
             #Calculate power from irradiance
@@ -772,20 +1499,19 @@ class Environment(object):
             Available methods for solar parameter calculation:
              ['disc','erbs','dirint','boland']
             """
-            for methode in estimation_methode_lst:
-                calculated_solar_parameter = self.__get_solar_parameter(
-                        date        = pd_sorted_data_for_station.index, 
-                        ghi         = pd_sorted_data_for_station.ghi, 
-                        temperature = pd_sorted_data_for_station.temperature - 273.15 if 'temperature' in pd_sorted_data_for_station.columns else None, 
-                        pressure    = pd_sorted_data_for_station.pressure             if 'pressure'    in pd_sorted_data_for_station.columns else None, 
-                        dew_point  = pd_sorted_data_for_station.dew_point - 273.15    if 'dew_point'   in pd_sorted_data_for_station.columns else None,
-                        lat         = pd_station_metadata['latitude' ].values[0], 
-                        lon         = pd_station_metadata['longitude'].values[0],
-                        height      = pd_station_metadata['height'   ].values[0],
-                        methode     = methode,
-                        use_methode_name_in_columns = (len(estimation_methode_lst) > 1),
-                        extended_solar_data = extended_solar_data)
-                pd_sorted_data_for_station = pd_sorted_data_for_station.merge(right = calculated_solar_parameter, left_index = True, right_index = True)
+            calculated_solar_parameter = self.__get_solar_parameter(
+                    date        = pd_sorted_data_for_station.index, 
+                    ghi         = pd_sorted_data_for_station.ghi, 
+                    temperature = pd_sorted_data_for_station.temperature - 273.15 if 'temperature' in pd_sorted_data_for_station.columns else None, 
+                    pressure    = pd_sorted_data_for_station.pressure             if 'pressure'    in pd_sorted_data_for_station.columns else None, 
+                    dew_point  = pd_sorted_data_for_station.dew_point - 273.15    if 'dew_point'   in pd_sorted_data_for_station.columns else None,
+                    lat         = pd_station_metadata['latitude' ].values[0], 
+                    lon         = pd_station_metadata['longitude'].values[0],
+                    height      = pd_station_metadata['height'   ].values[0],
+                    methode     = estimation_methode_lst,
+                    use_methode_name_in_columns = (len(estimation_methode_lst) > 1),
+                    extended_solar_data = extended_solar_data)
+            pd_sorted_data_for_station = pd_sorted_data_for_station.merge(right = calculated_solar_parameter, left_index = True, right_index = True)
             if not extended_solar_data:
                 for additional_parameter in ['temperature','dew_point','pressure']:
                     if additional_parameter in pd_sorted_data_for_station.columns:
@@ -810,6 +1536,7 @@ class Environment(object):
         return self.__resample_data(pd_sorted_data_for_station)
     
     
+    @instrumentation.timed()
     def __get_dwd_data(
         self, dataset, lat = None, lon = None, user_station_id = None, distance = 30, min_quality_per_parameter = 80
         ):
@@ -833,8 +1560,10 @@ class Environment(object):
         
             Returns
             -------
-            pd_sorted_data_for_station : pandas.DataFrame
-                raw dwd data for the selected station
+            pd_sorted_data_for_station : pandas.DataFrame or polars.DataFrame
+                raw dwd data for the selected station. Observation data is
+                returned as polars.DataFrame with a 'date' column when
+                use_polars_processing is set.
             station_metadata : pandas.DataFrame
                 Metadata of the selected weather station.
 
@@ -859,6 +1588,15 @@ class Environment(object):
             - It checks the validity of the query result for each station based on the percentage of valid data for each parameter.
             - If a station with valid data is found, the function preturns the raw dwd data
          """
+        import polars as pl
+        from wetterdienst.provider.dwd.observation import (
+            DwdObservationRequest,
+            DwdObservationResolution,
+        )
+        from wetterdienst.provider.dwd.mosmix import DwdMosmixRequest, DwdMosmixType
+        from wetterdienst import Settings
+        _ = pl.Config.set_tbl_hide_dataframe_shape(True)
+
         activate_output = not self.__surpress_output_globally
 
         if  self.start is None or self.end is None:
@@ -976,6 +1714,30 @@ class Environment(object):
             #Get query result for the actual station
             wd_unsorted_data_for_station = wd_query_result.filter_by_station_id(station_id=station_id).values.all().df
 
+            if (self.__use_polars_processing
+                and isinstance(wd_query_result, DwdObservationRequest)
+                and isinstance(wd_unsorted_data_for_station, pl.DataFrame)):
+                #Pivot and count valid data without converting to pandas
+                pd_sorted_data_for_station = self.__pivot_dwd_data_polars(
+                    wd_unsorted_data_for_station, req_parameter_dict)
+                quality_per_parameter = pd.Series({
+                    column: round((pd_sorted_data_for_station[column].is_not_null().mean() or 0) * 100, 1)
+                    for column in req_parameter_dict.keys()
+                    })
+                if activate_output:
+                    print("Quality of the data set:")
+                    print(quality_per_parameter.to_string(header = False))
+                if quality_per_parameter.min() >= min_quality_per_parameter:
+                    valid_station_data  = True
+                    if activate_output:
+                        print("Query result valid!")
+                        print("Station " + station_id + " " + station_name + " used")
+                        if user_station_id is None:
+                            distance = str(round(pd_nearby_stations.loc[pd_nearby_stations['station_id'] == station_id]['distance'].values[0]))
+                            print("Distance to location: " + distance + " km")
+                    break
+                continue
+
             if isinstance(wd_unsorted_data_for_station,pd.core.frame.DataFrame):
                 pd_unsorted_data_for_station = wd_unsorted_data_for_station
             elif isinstance(wd_unsorted_data_for_station,pl.DataFrame):
@@ -1043,6 +1805,7 @@ class Environment(object):
             pd_sorted_data_for_station,
             station_metadata)
        
+    @instrumentation.timed()
     def get_dwd_pv_data(
         self, lat = None, lon = None, station_id = None, distance = 30, min_quality_per_parameter = 80, estimation_methode_lst = ['disc'], extended_solar_data = False
         ):
@@ -1079,6 +1842,8 @@ class Environment(object):
             - The query result is saved in class variable pv_data  
             - Station metadate is not saved in class      
     """
+        import polars as pl
+
         dataset = 'solar'
         raw_dwd_data, station_metadata = self.__get_dwd_data(
             dataset = dataset,
@@ -1088,7 +1853,14 @@ class Environment(object):
             distance = distance, 
             min_quality_per_parameter = min_quality_per_parameter
             )   
-        if station_metadata.station_type.iloc[0] == 'OBSERVATION':
+        if isinstance(raw_dwd_data, pl.DataFrame):
+            self.pv_data = self.__process_observation_parameter_polars(
+                pl_sorted_data_for_station = raw_dwd_data,
+                pd_station_metadata = station_metadata,
+                dataset = dataset,
+                extended_solar_data = extended_solar_data
+                )
+        elif station_metadata.station_type.iloc[0] == 'OBSERVATION':
             self.pv_data = self.__process_observation_parameter(
                  pd_sorted_data_for_station = raw_dwd_data, 
                  pd_station_metadata = station_metadata,
@@ -1117,6 +1889,7 @@ class Environment(object):
             
         return station_metadata
 
+    @instrumentation.timed()
     def get_dwd_wind_data(
         self, lat = None, lon = None, station_id = None, distance = 30, min_quality_per_parameter = 80, station_splitting = False
         ):
@@ -1152,6 +1925,7 @@ class Environment(object):
             - The query result is saved in class variable wind_data  
             - Station meta data is not saved in class      
         """
+        import polars as pl
 
         dataset = 'wind'
         if not station_splitting:
@@ -1176,14 +1950,23 @@ class Environment(object):
                     min_quality_per_parameter = min_quality_per_parameter
                     )
                 station_metadata = pd.concat([station_metadata,station_metadata_buf], axis = 0)
-                raw_dwd_data = pd.concat([raw_dwd_data,raw_dwd_data_buf], axis = 1)
+                if isinstance(raw_dwd_data_buf, pl.DataFrame):
+                    raw_dwd_data = raw_dwd_data_buf if isinstance(raw_dwd_data, pd.DataFrame) else raw_dwd_data.join(
+                        raw_dwd_data_buf, on = 'date', how = 'full', coalesce = True)
+                else:
+                    raw_dwd_data = pd.concat([raw_dwd_data,raw_dwd_data_buf], axis = 1)
                 
             if station_metadata.station_type.nunique() != 1:
                 raise Exception("Station type error while dataset splitting. Please check times!")
             if station_metadata.station_id.nunique() != 1:
                 print ("Warning! Used different stations for one dataset.")
         
-        if station_metadata.station_type.iloc[0] == 'OBSERVATION': 
+        if isinstance(raw_dwd_data, pl.DataFrame):
+            self.wind_data = self.__process_observation_parameter_polars(
+                 pl_sorted_data_for_station = raw_dwd_data.sort('date'),
+                 dataset = dataset
+                 )
+        elif station_metadata.station_type.iloc[0] == 'OBSERVATION': 
             self.wind_data = self.__process_observation_parameter(
                  pd_sorted_data_for_station = raw_dwd_data,
                  dataset = dataset
@@ -1196,6 +1979,7 @@ class Environment(object):
                  )
         return station_metadata
 
+    @instrumentation.timed()
     def get_dwd_temp_data(
         self, lat = None, lon = None, station_id = None, distance = 30, min_quality_per_parameter = 80
         ):
@@ -1227,6 +2011,8 @@ class Environment(object):
             - Station meta data is saved in class variable __temp_station_metadata 
             for usage in get_dwd_mean_temp_hours / get_dwd_mean_temp_days / get_dwd_mean_quarter_hours
         """
+        import polars as pl
+
         dataset = 'air'
         raw_dwd_data, station_metadata = self.__get_dwd_data(
             dataset = dataset, 
@@ -1236,7 +2022,12 @@ class Environment(object):
             distance = distance, 
             min_quality_per_parameter = min_quality_per_parameter
             )    
-        if station_metadata.station_type.iloc[0] == 'OBSERVATION':
+        if isinstance(raw_dwd_data, pl.DataFrame):
+            self.temp_data = self.__process_observation_parameter_polars(
+                 pl_sorted_data_for_station = raw_dwd_data,
+                 dataset = dataset
+                 )
+        elif station_metadata.station_type.iloc[0] == 'OBSERVATION':
             self.temp_data = self.__process_observation_parameter(
                  pd_sorted_data_for_station = raw_dwd_data, 
                  dataset = dataset
@@ -1248,6 +2039,7 @@ class Environment(object):
                  )
         return self.__temp_station_metadata
     
+    @instrumentation.timed()
     def get_dwd_mean_temp_hours(
         self, lat = None, lon = None, station_id = None, distance = 30, min_quality_per_parameter = 80
         ):
@@ -1288,6 +2080,7 @@ class Environment(object):
         self.mean_temp_hours = self.__resample_data(self.temp_data,'60 min')
         return self.__temp_station_metadata
     
+    @instrumentation.timed()
     def get_dwd_mean_temp_days(
         self, lat = None, lon = None, station_id = None, distance = 30, min_quality_per_parameter = 80
         ):
@@ -1328,6 +2121,7 @@ class Environment(object):
         self.mean_temp_days = self.__resample_data(self.temp_data,'1440 min')
         return self.__temp_station_metadata
     
+    @instrumentation.timed()
     def get_dwd_mean_quarter_hours(
         self, lat = None, lon = None, station_id = None, distance = 30, min_quality_per_parameter = 80
         ):
@@ -11,6 +11,13 @@ from .component import Component
 
 
 class HeatPump(Component):
+
+    environment_data = ("mean_temp_hours", "mean_temp_quarter_hours")
+    cache_attributes = ("timeseries", "cop", "timeseries_year")
+    state_attributes = (
+        "limit", "is_running", "last_ramp_up", "last_ramp_down", "timeseries",
+    )
+
     def __init__(
         self,
         thermal_energy_demand,
@@ -106,10 +113,12 @@ class HeatPump(Component):
 
         self.timeseries_year = pd.DataFrame(
             columns=["thermal_energy_output", "cop", "el_demand"],
+            dtype="float64",
             index=self.thermal_energy_demand.index,
         )
         self.timeseries = pd.DataFrame(
             columns=["thermal_energy_output", "cop", "el_demand"],
+            dtype="float64",
             index=pd.date_range(
                 start=self.environment.start,
                 end=self.environment.end,
@@ -303,6 +312,7 @@ class HeatPump(Component):
 
         self.timeseries = pd.DataFrame(
             columns=["thermal_energy_output", "cop", "el_demand"],
+            dtype="float64",
             index=pd.date_range(
                 start=self.environment.start,
                 end=self.environment.end,
@@ -354,7 +364,11 @@ class HeatPump(Component):
     # Override balancing function from super class.
     def value_for_timestamp(self, timestamp):
 
-        if type(timestamp) == int:
+        if self.stream is not None:
+
+            return self.stream.value(timestamp, "el_demand") * self.limit
+
+        elif type(timestamp) == int:
 
             return self.timeseries.iloc[timestamp]["el_demand"] * self.limit
 
@@ -368,6 +382,58 @@ class HeatPump(Component):
                 + "Stringformat: YYYY-MM-DD hh:mm:ss"
             )
 
+    def values_for_timestamps(self, timestamps):
+        """
+        Returns the values for several timestamps at once.
+
+        Vectorized equivalent of value_for_timestamp.
+
+        Parameters
+        ----------
+        timestamps : pandas.DatetimeIndex
+            Timestamps of the timeseries.
+
+        Returns
+        -------
+        numpy.ndarray
+            Electrical demand in kW.
+        """
+        if self.stream is not None:
+            return self.stream.values(timestamps, "el_demand") * self.limit
+        values = self.timeseries["el_demand"].reindex(timestamps)
+        return values.to_numpy(dtype=float) * self.limit
+
+    def step(self, timestamp, data):
+        """
+        Calculate the operation of one timestep in streaming operation.
+
+        Parameters
+        ----------
+        timestamp : str or datetime
+            The timestamp of the timestep.
+        data : dict or pandas.Series
+            The thermal energy demand of the timestep in kW under the
+            identifier and the outdoor temperature in degree Celsius under
+            "temperature".
+
+        Returns
+        -------
+        dict or None
+            thermal_energy_output, cop and el_demand of the timestep, None
+            if data holds no thermal energy demand of the heat pump.
+        """
+        if self.identifier not in data:
+            return None
+
+        thermal_energy_output = float(data[self.identifier])
+        cop = float(self.get_current_cop(float(data["temperature"])))
+
+        return {
+            "thermal_energy_output": thermal_energy_output,
+            "cop": cop,
+            "el_demand": thermal_energy_output / cop,
+        }
+
     def observations_for_timestamp(self, timestamp):
         """
         Info
@@ -483,11 +549,15 @@ class HeatPump(Component):
 
     def log_observation(self, observation, timestamp):
 
-        self.timeseries.loc[timestamp, "thermal_energy_output"] = observation[
-            "thermal_energy_output"
-        ]
-        self.timeseries.loc[timestamp, "cop"] = observation["cop"]
-        self.timeseries.loc[timestamp, "el_demand"] = observation["el_demand"]
+        self.expand_time_series()
+        self.set_timeseries_value(
+            timestamp, "thermal_energy_output",
+            observation["thermal_energy_output"],
+        )
+        self.set_timeseries_value(timestamp, "cop", observation["cop"])
+        self.set_timeseries_value(
+            timestamp, "el_demand", observation["el_demand"]
+        )
 
         return self.timeseries
 
@@ -55,6 +55,11 @@ class HeatingRod(Component):
     isRunning : bool
         Flag indicating whether the heating rod is currently running
     """
+
+    cache_attributes = ("timeseries", "timeseries_year")
+    state_attributes = (
+        "limit", "isRunning", "lastRampUp", "lastRampDown", "timeseries",
+    )
     
     def __init__(self, 
                  thermal_energy_demand,
@@ -235,6 +240,20 @@ class HeatingRod(Component):
         self.timeseries = self.timeseries_year.loc[self.environment.start:self.environment.end]
         
         return self.timeseries
+
+    def prepare_time_series(self):
+        """
+        Prepare the time series data for the simulation period.
+
+        Name of prepareTimeSeries used by Component.prepare_time_series_cached
+        and the other components.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Time series of heat output and electrical demand for the simulation period.
+        """
+        return self.prepareTimeSeries()
     
     def get_timeseries_year(self):
         """
@@ -426,8 +445,13 @@ class HeatingRod(Component):
         pandas.DataFrame
             The updated timeseries DataFrame.
         """
-        self.timeseries.loc[timestamp, "heat_output"] = observation["heat_output"]
-        self.timeseries.loc[timestamp, "el_demand"] = observation["el_demand"]
+        self.expand_time_series()
+        self.set_timeseries_value(
+            timestamp, "heat_output", observation["heat_output"]
+        )
+        self.set_timeseries_value(
+            timestamp, "el_demand", observation["el_demand"]
+        )
         
         return self.timeseries
     #%% ramping functions
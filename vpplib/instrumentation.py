@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentation Module
+----------------------
+This module contains a registry of timers and counters for the hot paths of
+vpplib: the stages of Operator.run_base_scenario and
+Operator.run_simbench_scenario, value_for_timestamp and operate_storage of
+every component class and the data fetches of the Environment.
+
+The instrumentation is disabled by default. The hooks then only check one
+flag, so they cost well below a microsecond per call. Enable it around the
+code of interest::
+
+    from vpplib import instrumentation
+
+    instrumentation.enable(trace=True)
+    operator.run_base_scenario(baseload)
+    instrumentation.disable()
+
+    instrumentation.registry.summary()            # totals and percentiles
+    instrumentation.registry.to_json("stages.json")
+    instrumentation.registry.to_chrome_trace("trace.json")
+
+The trace can be opened in chrome://tracing or https://ui.perfetto.dev.
+"""
+
+import array
+import functools
+import json
+import os
+import random
+import threading
+import time
+
+
+class _Stage(object):
+    """Durations of one stage."""
+
+    __slots__ = ("calls", "total", "minimum", "maximum", "samples")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = 0.0
+        self.samples = array.array("d")
+
+
+class _NullTimer(object):
+    """Context manager doing nothing, returned while disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_null_timer = _NullTimer()
+
+
+class _Timer(object):
+
+    __slots__ = ("registry", "name", "start")
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class Registry(object):
+    """
+    Registry of stage timings and counters.
+
+    Parameters
+    ----------
+    max_samples : int, optional
+        Number of durations kept per stage for the percentiles. Beyond it a
+        uniform random sample of the durations is kept (default: 100000).
+        Calls, totals, minimum and maximum are exact.
+    max_events : int, optional
+        Number of trace events kept; later events are counted in
+        dropped_events (default: 1000000).
+
+    Attributes
+    ----------
+    enabled : bool
+        Whether the hooks record.
+    trace : bool
+        Whether every call is also kept as trace event.
+    counters : dict
+        Counts by name, see count.
+    events : list of tuple
+        (name, start, end, thread id) of the recorded calls if trace is
+        True, start and end in seconds of time.perf_counter.
+    dropped_events : int
+        Number of calls not kept in events because of max_events.
+    """
+
+    def __init__(self, max_samples=100000, max_events=1000000):
+        self.max_samples = max_samples
+        self.max_events = max_events
+        self.enabled = False
+        self.trace = False
+        self._lock = threading.Lock()
+        self._random = random.Random(0)
+        self.reset()
+
+    def reset(self):
+        """Delete all recorded timings, counters and events."""
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+            self.events = []
+            self.dropped_events = 0
+
+    def enable(self, trace=False):
+        """
+        Start recording.
+
+        Parameters
+        ----------
+        trace : bool, optional
+            Also keep every call as trace event for to_chrome_trace
+            (default: False).
+        """
+        self.trace = trace
+        self.enabled = True
+
+    def disable(self):
+        """Stop recording. The recorded data is kept."""
+        self.enabled = False
+
+    def timer(self, name):
+        """
+        Return a context manager timing a stage.
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage, e.g. "Operator.runpp".
+        """
+        if not self.enabled:
+            return _null_timer
+        return _Timer(self, name)
+
+    def record(self, name, start, end):
+        """
+        Record one call of a stage.
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage.
+        start, end : float
+            Start and end of the call in seconds of time.perf_counter.
+        """
+        duration = end - start
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = _Stage()
+            stage.calls += 1
+            stage.total += duration
+            if duration < stage.minimum:
+                stage.minimum = duration
+            if duration > stage.maximum:
+                stage.maximum = duration
+            if len(stage.samples) < self.max_samples:
+                stage.samples.append(duration)
+            else:
+                # reservoir sampling
+                position = self._random.randrange(stage.calls)
+                if position < self.max_samples:
+                    stage.samples[position] = duration
+
+            if self.trace:
+                if len(self.events) < self.max_events:
+                    self.events.append(
+                        (name, start, end, threading.get_ident())
+                    )
+                else:
+                    self.dropped_events += 1
+
+    def count(self, name, n=1):
+        """Add n to the counter name if enabled."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self, percentiles=(50, 90, 99)):
+        """
+        Summarize the recorded stages.
+
+        Parameters
+        ----------
+        percentiles : tuple of float, optional
+            Percentiles of the duration (default: (50, 90, 99)).
+
+        Returns
+        -------
+        dict
+            "stages": by stage name the calls, the total, mean, minimum,
+            maximum and percentiles ("p50_seconds", ...) of the duration in
+            seconds, sorted by descending total; "counters": the counters.
+        """
+        import numpy as np
+
+        with self._lock:
+            stages = {}
+            for name, stage in sorted(self.stages.items(),
+                                      key=lambda item: -item[1].total):
+                samples = np.frombuffer(stage.samples, dtype=float)
+                result = {
+                    "calls": stage.calls,
+                    "total_seconds": stage.total,
+                    "mean_seconds": stage.total / stage.calls,
+                    "min_seconds": stage.minimum,
+                    "max_seconds": stage.maximum,
+                }
+                for percentile, value in zip(
+                        percentiles, np.percentile(samples, percentiles)):
+                    result["p%g_seconds" % percentile] = float(value)
+                stages[name] = result
+
+            return {"stages": stages, "counters": dict(self.counters)}
+
+    def to_json(self, path=None, **kwargs):
+        """
+        Return the summary as JSON string or write it to a file.
+
+        Parameters
+        ----------
+        path : str, optional
+            File to write. By default the string is returned.
+        **kwargs
+            Passed to summary.
+        """
+        text = json.dumps(self.summary(**kwargs), indent=2)
+        if path is None:
+            return text
+        with open(path, "w") as file:
+            file.write(text)
+
+    def chrome_trace(self):
+        """
+        Return the trace events in the Chrome trace event format.
+
+        Returns
+        -------
+        dict
+            {"traceEvents": [...]} with one complete event ("ph": "X") per
+            recorded call and the counters as metadata. Times are in
+            microseconds since the first event.
+        """
+        with self._lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+        origin = min((event[1] for event in events), default=0.0)
+        pid = os.getpid()
+        trace_events = [
+            {
+                "name": name,
+                "cat": name.split(".")[0],
+                "ph": "X",
+                "ts": (start - origin) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": pid,
+                "tid": tid,
+            }
+            for name, start, end, tid in events
+        ]
+        return {
+            "traceEvents": trace_events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "counters": counters,
+                "dropped_events": self.dropped_events,
+            },
+        }
+
+    def to_chrome_trace(self, path):
+        """Write the trace events to a file, see chrome_trace."""
+        with open(path, "w") as file:
+            json.dump(self.chrome_trace(), file)
+
+
+registry = Registry()
+"""The registry used by the hooks of vpplib."""
+
+
+def enable(trace=False):
+    """Start recording in the registry, see Registry.enable."""
+    registry.enable(trace)
+
+
+def disable():
+    """Stop recording in the registry."""
+    registry.disable()
+
+
+def reset():
+    """Delete the data recorded in the registry."""
+    registry.reset()
+
+
+def timer(name):
+    """Return a context manager timing a stage in the registry."""
+    if not registry.enabled:
+        return _null_timer
+    return _Timer(registry, name)
+
+
+def count(name, n=1):
+    """Add n to a counter of the registry."""
+    if registry.enabled:
+        registry.count(name, n)
+
+
+def timed(name=None):
+    """
+    Decorate a function to time its calls in the registry.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of the stage. Defaults to the qualified name of the function.
+    """
+
+    def decorate(function):
+        stage = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not registry.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                registry.record(stage, start, time.perf_counter())
+
+        wrapper.instrumented = True
+        return wrapper
+
+    return decorate
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+Memory Module
+-------------
+This module contains the memory accounting of virtual power plants: the
+estimate of the bytes held by components and weather data (see
+VirtualPowerPlant.memory_usage and VirtualPowerPlant.memory_report), the
+resident set size of the process and the MemoryBudgetError raised if a
+virtual power plant exceeds its memory budget.
+
+The bytes of an object are estimated by walking its attributes. NumPy and
+pandas data are counted with their buffer size, every buffer only once, so
+e.g. a time index shared by many timeseries is counted for the first
+object holding it. Arrays mapped from a file (numpy.memmap, see
+Component.spill_time_series), also as columns of a DataFrame, are counted
+as spilled instead of resident.
+"""
+
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+
+
+class MemoryBudgetError(MemoryError):
+    """Raised if a virtual power plant exceeds its memory budget."""
+
+
+_skipped_types = (
+    type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+    types.MethodType,
+)
+
+
+def _root_array(array):
+    """Return the array owning the buffer of an array view."""
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+
+def _measure_column(column, seen, totals):
+    """Add the bytes of the data of a Series to totals."""
+    values = column.values
+    if not isinstance(values, np.ndarray) or values.dtype.hasobject:
+        totals[0] += int(column.memory_usage(index=False, deep=True))
+        return
+    root = _root_array(values)
+    if root is values and values.base is not None:
+        # temporary view of a buffer not owned by a NumPy array
+        totals[0] += values.nbytes
+        return
+    _measure(root, seen, totals)
+
+
+def _measure(value, seen, totals):
+    """Add the resident and spilled bytes of value to totals."""
+    if value is None or isinstance(value, _skipped_types):
+        return
+    if id(value) in seen:
+        return
+    seen.add(id(value))
+
+    if isinstance(value, np.ndarray):
+        root = _root_array(value)
+        if root is not value:
+            if id(root) in seen:
+                return
+            seen.add(id(root))
+        if isinstance(root, np.memmap) or isinstance(value, np.memmap):
+            totals[1] += root.nbytes
+        elif root.dtype.hasobject:
+            totals[0] += root.nbytes
+            for item in root.ravel():
+                _measure(item, seen, totals)
+        else:
+            totals[0] += root.nbytes
+
+    elif isinstance(value, pd.Index):
+        totals[0] += int(value.memory_usage(deep=True))
+
+    elif isinstance(value, pd.Series):
+        _measure_column(value, seen, totals)
+        _measure(value.index, seen, totals)
+
+    elif isinstance(value, pd.DataFrame):
+        for _, column in value.items():
+            _measure_column(column, seen, totals)
+        _measure(value.index, seen, totals)
+        _measure(value.columns, seen, totals)
+
+    elif isinstance(value, (str, bytes, int, float, complex, bool)):
+        totals[0] += sys.getsizeof(value)
+
+    elif isinstance(value, dict):
+        totals[0] += sys.getsizeof(value)
+        for key, item in value.items():
+            _measure(key, seen, totals)
+            _measure(item, seen, totals)
+
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        totals[0] += sys.getsizeof(value)
+        for item in value:
+            _measure(item, seen, totals)
+
+    else:
+        totals[0] += sys.getsizeof(value)
+        state = getattr(value, "__dict__", None)
+        if isinstance(state, dict):
+            for item in state.values():
+                _measure(item, seen, totals)
+        for cls in type(value).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if name not in ("__dict__", "__weakref__"):
+                    _measure(getattr(value, name, None), seen, totals)
+
+
+def object_memory(value, seen=None):
+    """
+    Estimate the memory held by an object.
+
+    Parameters
+    ----------
+    value : object
+        The object, e.g. a DataFrame or a component.
+    seen : set, optional
+        Ids of objects already counted, which are skipped. The ids of the
+        objects counted are added, so a set shared between calls counts
+        every object once.
+
+    Returns
+    -------
+    tuple of int
+        (resident, spilled) bytes. Spilled bytes are mapped from a file.
+    """
+    totals = [0, 0]
+    _measure(value, set() if seen is None else seen, totals)
+
+    return totals[0], totals[1]
+
+
+def resident_data_bytes(value):
+    """
+    Return the bytes of the data of a timeseries held in memory.
+
+    Parameters
+    ----------
+    value : pandas.DataFrame, pandas.Series or CompactTimeseries
+        The timeseries.
+
+    Returns
+    -------
+    int
+        The bytes of the values without the index. Values mapped from a
+        file are not counted.
+    """
+    seen = set()
+    index = getattr(value, "index", None)
+    if index is not None:
+        seen.add(id(index))
+    if isinstance(value, pd.DataFrame):
+        seen.add(id(value.columns))
+    elif not isinstance(value, pd.Series):
+        value = getattr(value, "values", None)
+        if not isinstance(value, np.ndarray):
+            return 0
+
+    return object_memory(value, seen)[0]
+
+
+# fields of /proc/self/status
+_status_fields = {
+    "VmRSS": "rss_bytes",
+    "RssAnon": "anonymous_rss_bytes",
+    "VmHWM": "peak_rss_bytes",
+}
+
+
+def process_memory():
+    """
+    Return the memory of the running process.
+
+    Returns
+    -------
+    dict
+        "rss_bytes": the current resident set size, "anonymous_rss_bytes":
+        the part of it not backed by files (Linux only), which cannot be
+        dropped by the operating system, "peak_rss_bytes": the highest
+        resident set size so far. None if a value is not available on the
+        platform (psutil is used if it is installed).
+    """
+    memory = {"rss_bytes": None, "anonymous_rss_bytes": None,
+              "peak_rss_bytes": None}
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                name, _, value = line.partition(":")
+                key = _status_fields.get(name)
+                if key is not None:
+                    # kilobytes
+                    memory[key] = int(value.split()[0]) * 1024
+    except (OSError, ValueError):
+        pass
+    if memory["peak_rss_bytes"] is None:
+        try:
+            import resource
+        except ImportError:
+            pass
+        else:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # kilobytes on Linux, bytes on macOS
+            if sys.platform != "darwin":
+                peak *= 1024
+            memory["peak_rss_bytes"] = peak
+    if memory["rss_bytes"] is None:
+        try:
+            import psutil
+        except ImportError:
+            pass
+        else:
+            info = psutil.Process().memory_info()
+            memory["rss_bytes"] = info.rss
+            if memory["peak_rss_bytes"] is None:
+                memory["peak_rss_bytes"] = getattr(info, "peak_wset", None)
+
+    return memory
@@ -0,0 +1,429 @@
+# -*- coding: utf-8 -*-
+"""
+Model Predictive Operator Module
+--------------------------------
+This module contains the ModelPredictiveOperator class, which operates a
+virtual power plant with receding-horizon (model predictive) control: at
+every timestamp the next steps are re-optimized with the model of
+OptimalDispatch from the current state of the components, and only the
+first step of the plan is applied.
+
+The model is assembled once for the whole target horizon. Every window is
+a slice of it with the same sparsity pattern, so a step only updates the
+bounds, costs, coefficients and right-hand sides that changed (forecast,
+state of charge) instead of building the model again. With highspy, the
+model stays in one HiGHS instance and every solve starts from the basis of
+the previous one (warm start).
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from vpplib.battery_electric_vehicle import BatteryElectricVehicle
+from vpplib.combined_heat_and_power import CombinedHeatAndPower
+from vpplib.electrical_energy_storage import ElectricalEnergyStorage
+from vpplib.heat_pump import HeatPump
+from vpplib.heating_rod import HeatingRod
+from vpplib.operator import Operator
+from vpplib.optimal_dispatch import OptimalDispatch
+from vpplib.photovoltaic import Photovoltaic
+from vpplib.thermal_energy_storage import ThermalEnergyStorage
+from vpplib.wind_power import WindPower
+
+
+class ModelPredictiveOperator(Operator):
+    """
+    Receding-horizon operator of a virtual power plant.
+
+    Parameters
+    ----------
+    virtual_power_plant : VirtualPowerPlant
+        The VPP with prepared timeseries of its non-controllable components.
+    net : pandapower.pandapowerNet
+        Pandapower network model for power flow calculations.
+    target_data : list of tuples
+        Target balance in kW (positive for generation) by timestamp, see
+        Operator.
+    environment : Environment, optional
+        Environment object containing weather data and simulation
+        parameters.
+    steps : int, optional
+        Number of timesteps optimized at every timestamp (default: 96).
+    heat_storage : dict, optional
+        Name of the ThermalEnergyStorage of every heat generator, see
+        OptimalDispatch.
+    curtailment : bool, optional
+        Whether photovoltaic and wind power may be curtailed (default:
+        True).
+    integer : bool, optional
+        If True, heat pumps and CHP plants are on/off units (MILP), see
+        OptimalDispatch.
+    solver : str, optional
+        "highspy" keeps the model in a HiGHS instance and warm starts every
+        solve, "scipy" solves every window from scratch with
+        scipy.optimize.milp. "auto" (default) uses highspy if it is
+        installed.
+    time_limit : float, optional
+        Time limit per solve in seconds.
+
+    Attributes
+    ----------
+    plan : pandas.DataFrame
+        Plan of the last window, see OptimalDispatch.solve.
+    statistics : list of dict
+        Build and solve time in seconds, solver status, objective value and
+        whether the solver model was rebuilt, per operated timestamp.
+
+    Notes
+    -----
+    Applying the first step of the plan
+
+    - limits photovoltaic and wind power with limit_power_to,
+    - sets the state of charge of electrical and the temperature of
+      thermal energy storages,
+    - writes the planned operation of heat pumps, CHP plants, heating rods
+      and battery electric vehicles to their timeseries.
+
+    The energy content of battery electric vehicles is tracked by the
+    operator; it starts at battery_max. The window gets shorter at the end
+    of the target data, which rebuilds the solver model once per length.
+    """
+
+    def __init__(
+        self,
+        virtual_power_plant,
+        net,
+        target_data,
+        environment=None,
+        steps=96,
+        heat_storage=None,
+        curtailment=True,
+        integer=False,
+        solver="auto",
+        time_limit=None,
+    ):
+        super(ModelPredictiveOperator, self).__init__(
+            virtual_power_plant, net, target_data, environment
+        )
+        if steps < 1:
+            raise ValueError("steps must be at least 1")
+        if solver not in ("auto", "highspy", "scipy"):
+            raise ValueError(
+                "solver must be 'auto', 'highspy' or 'scipy', not "
+                + repr(solver)
+            )
+        if solver != "scipy":
+            try:
+                import highspy  # noqa: F401
+            except ImportError:
+                if solver == "highspy":
+                    raise
+                solver = "scipy"
+            else:
+                solver = "highspy"
+
+        self.dispatch = OptimalDispatch(
+            virtual_power_plant,
+            target_data,
+            heat_storage=heat_storage,
+            curtailment=curtailment,
+            integer=integer,
+            time_limit=time_limit,
+        )
+        self.steps = steps
+        self.solver = solver
+        self.time_limit = time_limit
+
+        self.plan = None
+        self.statistics = []
+
+        self._problem = None
+        self._layout = None
+        self._levels = None
+        self._vehicle_level = {}
+        self._highs = None
+        self._model = None
+
+    # %% model
+    def _prepare(self):
+        """Build the model of the whole target horizon once."""
+        state = self.dispatch._initial_state()
+        self._vehicle_level = {
+            name: level for name, level in state.items()
+            if isinstance(self.virtual_power_plant.components[name],
+                          BatteryElectricVehicle)
+        }
+        # the state enters the windows through previous
+        self._problem, self._layout = self.dispatch._build(
+            self.dispatch.target.index, dict.fromkeys(state, 0.0)
+        )
+
+        # variable block of the storage level of every component
+        n = self._problem.n_steps
+        self._levels = {}
+        for name, entry in self._layout.items():
+            if not isinstance(entry, tuple):
+                continue
+            if entry[0] == "storage":
+                self._levels[name] = entry[3][0] // n
+            elif entry[0] == "vehicle":
+                self._levels[name] = entry[2][0] // n
+            elif entry[0] == "thermal_storage":
+                self._levels[name] = entry[1][0] // n
+
+    def _current_state(self):
+        """Return the storage levels of the components."""
+        components = self.virtual_power_plant.components
+        previous = {}
+        for name, block in self._levels.items():
+            component = components[name]
+            if isinstance(component, ElectricalEnergyStorage):
+                previous[block] = float(component.state_of_charge)
+            elif isinstance(component, BatteryElectricVehicle):
+                previous[block] = self._vehicle_level[name]
+            else:
+                previous[block] = float(component.current_temperature) + 273.15
+        return previous
+
+    def _window_layout(self, start, length):
+        """Return the layout of OptimalDispatch for a window."""
+        n = self._problem.n_steps
+        steps = np.arange(length)
+
+        def window(value):
+            if isinstance(value, np.ndarray) and len(value) == n:
+                if value.dtype.kind == "i":
+                    return value[0] // n * length + steps
+                return value[start:start + length]
+            return value
+
+        return {
+            name: (tuple(window(value) for value in entry)
+                   if isinstance(entry, tuple) else window(entry))
+            for name, entry in self._layout.items()
+        }
+
+    # %% solvers
+    def _solve_scipy(self, arrays):
+        """Solve a window from scratch with scipy.optimize.milp."""
+        from scipy.optimize import Bounds, LinearConstraint, milp
+        from scipy.sparse import csc_array
+
+        matrix = csc_array(
+            (arrays["values"], arrays["index"], arrays["start"]),
+            shape=(len(arrays["rhs"]), len(arrays["cost"])),
+        )
+        options = {}
+        if self.time_limit is not None:
+            options["time_limit"] = self.time_limit
+        result = milp(
+            c=arrays["cost"],
+            constraints=LinearConstraint(matrix, arrays["rhs"], arrays["rhs"]),
+            integrality=arrays["integer"],
+            bounds=Bounds(arrays["lower"], arrays["upper"]),
+            options=options,
+        )
+        return result.x, result.message, result.fun, True
+
+    def _solve_highspy(self, arrays):
+        """Solve a window with the HiGHS instance, updating what changed."""
+        import highspy
+
+        rebuilt = (self._model is None
+                   or self._model["length"] != arrays["length"])
+        if rebuilt:
+            self._highs = highspy.Highs()
+            self._highs.setOptionValue("output_flag", False)
+            if self.time_limit is not None:
+                self._highs.setOptionValue("time_limit",
+                                           float(self.time_limit))
+            lp = highspy.HighsLp()
+            lp.num_col_ = len(arrays["cost"])
+            lp.num_row_ = len(arrays["rhs"])
+            lp.col_cost_ = arrays["cost"]
+            lp.col_lower_ = arrays["lower"]
+            lp.col_upper_ = arrays["upper"]
+            lp.row_lower_ = arrays["rhs"]
+            lp.row_upper_ = arrays["rhs"]
+            lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+            lp.a_matrix_.start_ = arrays["start"]
+            lp.a_matrix_.index_ = arrays["index"]
+            lp.a_matrix_.value_ = arrays["values"]
+            if arrays["integer"].any():
+                lp.integrality_ = [
+                    highspy.HighsVarType.kInteger if integer
+                    else highspy.HighsVarType.kContinuous
+                    for integer in arrays["integer"]
+                ]
+            self._highs.passModel(lp)
+        else:
+            model = self._model
+            changed = np.flatnonzero(arrays["cost"] != model["cost"])
+            if len(changed):
+                self._highs.changeColsCost(
+                    len(changed), changed, arrays["cost"][changed])
+            changed = np.flatnonzero((arrays["lower"] != model["lower"])
+                                     | (arrays["upper"] != model["upper"]))
+            if len(changed):
+                self._highs.changeColsBounds(
+                    len(changed), changed, arrays["lower"][changed],
+                    arrays["upper"][changed])
+            changed = np.flatnonzero(arrays["rhs"] != model["rhs"])
+            if len(changed):
+                self._highs.changeRowsBounds(
+                    len(changed), changed, arrays["rhs"][changed],
+                    arrays["rhs"][changed])
+            changed = np.flatnonzero(arrays["values"] != model["values"])
+            if len(changed):
+                column = (np.searchsorted(arrays["start"], changed,
+                                          side="right") - 1)
+                for entry, col in zip(changed, column):
+                    self._highs.changeCoeff(int(arrays["index"][entry]),
+                                            int(col),
+                                            arrays["values"][entry])
+        self._model = arrays
+
+        self._highs.run()
+        status = self._highs.getModelStatus()
+        message = self._highs.modelStatusToString(status)
+        if status != highspy.HighsModelStatus.kOptimal and not (
+            arrays["integer"].any()
+            and self._highs.getInfo().primal_solution_status
+            == highspy.SolutionStatus.kSolutionStatusFeasible
+        ):
+            return None, message, np.nan, rebuilt
+        x = np.array(self._highs.getSolution().col_value)
+        return (x, message, self._highs.getInfo().objective_function_value,
+                rebuilt)
+
+    # %% operation
+    def operate_at_timestamp(self, timestamp):
+        """
+        Re-optimize the next steps and apply the first one.
+
+        Parameters
+        ----------
+        timestamp : str or int
+            Timestamp of the target data ('YYYY-MM-DD hh:mm:ss') or its
+            position.
+
+        Raises
+        ------
+        ValueError
+            If the window cannot be solved.
+        """
+        start_time = time.perf_counter()
+        if self._problem is None:
+            self._prepare()
+        index = self.dispatch.target.index
+        if isinstance(timestamp, (int, np.integer)):
+            start = int(timestamp)
+        else:
+            start = index.get_loc(pd.Timestamp(timestamp))
+        length = min(self.steps, len(index) - start)
+        arrays = self._problem.window(start, length, self._current_state())
+        build_time = time.perf_counter()
+
+        if self.solver == "highspy":
+            x, message, objective, rebuilt = self._solve_highspy(arrays)
+        else:
+            x, message, objective, rebuilt = self._solve_scipy(arrays)
+        solve_time = time.perf_counter()
+
+        self.statistics.append({
+            "timestamp": index[start],
+            "build_seconds": build_time - start_time,
+            "solve_seconds": solve_time - build_time,
+            "status": message,
+            "objective": objective,
+            "rebuilt": rebuilt,
+        })
+        if x is None:
+            raise ValueError(
+                "The window starting at " + str(index[start])
+                + " failed: " + message
+            )
+
+        self.plan = self.dispatch._extract(
+            index[start:start + length], x,
+            self._window_layout(start, length),
+        )
+        self._apply(self.plan.iloc[0], index[start])
+
+    def _apply(self, step, timestamp):
+        """Apply the first step of the plan to the components."""
+        for name, component in self.virtual_power_plant.components.items():
+            if isinstance(component, (Photovoltaic, WindPower)):
+                if name + "_limit" in step:
+                    component.limit_power_to(
+                        float(np.clip(step[name + "_limit"], 0.0, 1.0)))
+
+            elif isinstance(component, ElectricalEnergyStorage):
+                component.state_of_charge = step[name + "_state_of_charge"]
+                if isinstance(component.timeseries, pd.DataFrame):
+                    component.set_timeseries_value(
+                        timestamp, "state_of_charge",
+                        component.state_of_charge)
+                    component.set_timeseries_value(
+                        timestamp, "residual_load", -step[name])
+
+            elif isinstance(component, BatteryElectricVehicle):
+                self._vehicle_level[name] = step[name + "_battery"]
+                component.set_timeseries_value(
+                    timestamp, "car_charger", -step[name])
+                component.set_timeseries_value(
+                    timestamp, "car_capacity", self._vehicle_level[name])
+
+            elif isinstance(component, ThermalEnergyStorage):
+                if name + "_temperature" in step:
+                    component.current_temperature = (
+                        step[name + "_temperature"])
+                    component.state_of_charge = (
+                        component.mass * component.cp
+                        * (component.current_temperature + 273.15))
+                    component.set_timeseries_value(
+                        timestamp, "temperature",
+                        component.current_temperature)
+
+            elif isinstance(component, HeatPump):
+                load = step[name + "_load"]
+                cop = component.get_current_cop(
+                    component.environment.mean_temp_quarter_hours
+                    .temperature.asof(timestamp))
+                component.is_running = load > 0
+                component.log_observation({
+                    "thermal_energy_output": load * component.el_power * cop,
+                    "cop": cop,
+                    "el_demand": load * component.el_power,
+                }, timestamp)
+
+            elif isinstance(component, CombinedHeatAndPower):
+                load = step[name + "_load"]
+                component.is_running = load > 0
+                component.log_observation({
+                    "thermal_energy_output": load * component.th_power,
+                    "el_demand": -load * component.el_power,
+                }, timestamp)
+
+            elif isinstance(component, HeatingRod):
+                load = step[name + "_load"]
+                component.isRunning = load > 0
+                component.log_observation({
+                    "heat_output": (
+                        load * component.el_power * component.efficiency),
+                    "el_demand": load * component.el_power,
+                }, timestamp)
+
+    def statistics_frame(self):
+        """
+        Return the statistics of the operated timestamps.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per operated timestamp with build_seconds,
+            solve_seconds, status, objective and rebuilt.
+        """
+        return pd.DataFrame(self.statistics).set_index("timestamp")
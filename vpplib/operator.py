@@ -16,12 +16,16 @@ power plant components.
 TODO: Setup data type for target data and alter the referencing accordingly!
 """
 
+import copy
 import math
+import numpy as np
 import pandas as pd
-import pandapower as pp
-import matplotlib.pyplot as plt
 from tqdm import tqdm
 
+from vpplib import instrumentation
+
+# pandapower and matplotlib are imported inside the methods using them.
+
 
 class Operator(object):
     """
@@ -46,6 +50,10 @@ class Operator(object):
         Pandapower network model for power flow calculations
     environment : Environment, optional
         Environment object containing weather data and simulation parameters
+    measurements : dict or None
+        Latest measurement by component name (nan if the read failed), set
+        by ControlLoop before every call of operate_at_timestamp. None
+        outside of a control loop.
     
     Notes
     -----
@@ -86,68 +94,155 @@ class Operator(object):
         self.target_data = target_data
         self.net = net  # pandapower net object
         self.environment = environment
+        self.measurements = None
 
-    def operate_virtual_power_plant(self):
+    score_metrics = ("match", "mae", "rmse", "energy_deviation")
+
+    def operate_virtual_power_plant(self, metric="match", threshold=None,
+                                    check_every=96, vectorized=False):
         """
         Operate the virtual power plant according to the target data.
         
         This method is the key function for the operation of the virtual power plant.
         It iterates through all timestamps in the target data, calls the
-        operate_at_timestamp method for each timestamp, and calculates how well
-        the operation of the virtual power plant matches the target data.
-        
-        The match is calculated as:
-        match = 1 - (abs(target) - abs(balance)) / abs(target)
+        operate_at_timestamp method for each timestamp, and scores how well
+        the balance of the virtual power plant matches the target data with
+        score_horizon.
         
-        A value of 1 indicates a perfect match, while a value of 0 indicates
-        no match at all. Negative values can occur if the balance is far from
-        the target.
+        Parameters
+        ----------
+        metric : str, optional
+            Score metric, see score_horizon (default: "match").
+        threshold : float, optional
+            Stop early once the score can no longer fall below threshold.
+            Only available for the error metrics "mae" and "rmse", whose
+            running sum of errors can only grow.
+        check_every : int, optional
+            Number of timestamps between two early exit checks
+            (default: 96).
+        vectorized : bool, optional
+            If False (default), the balance of every timestamp is read
+            right after it has been operated, as before. If True, the
+            balance of all timestamps of a check interval is calculated at
+            once with VirtualPowerPlant.balance_for_timestamps after they
+            have been operated.
         
         Returns
         -------
         float
-            Average match between the virtual power plant operation and the target data.
-            A value of 1 indicates a perfect match, while a value of 0 indicates
-            no match at all.
+            The score of the operation. After an early exit the lower bound
+            of the score, which is greater than threshold.
             
         Notes
         -----
         This method relies on the operate_at_timestamp method, which must be
         implemented by subclasses to define the specific operation strategy.
         
-        The match calculation assumes that the target values are non-zero.
-        If a target value is zero, the match calculation may result in a
-        division by zero error.
+        With vectorized=True the balance is read after the timestamps have
+        been operated, so the strategy must not change the values of already
+        operated timestamps. Strategies that change the limit of a component
+        (e.g. limit_power_to) change the values of all timestamps and need
+        vectorized=False.
         """
-        # Create result variables
-        power_sum = 0
-        count = 0
-
-        # Iterate through timestamps
-        for i in range(0, len(self.target_data)):
-            # Operate at timestamp
-            self.operate_at_timestamp(self.target_data[i][0])
-
-            # Get balance of virtual power plant
-            balance = self.virtual_power_plant.balance_at_timestamp(
-                self.target_data[i][0]
+        if threshold is not None and metric not in ("mae", "rmse"):
+            raise ValueError(
+                "An early exit is only possible for the metrics 'mae' and "
+                "'rmse', not " + repr(metric)
             )
 
-            # Get target balance
-            target = self.target_data[i][1]
-
-            # Calculate match
-            match = 1 - (abs(target) - abs(balance)) / abs(target)
-
-            # Add to sum and count
-            power_sum += match
-            count += 1
+        timestamps = [target[0] for target in self.target_data]
+        target = np.array([target[1] for target in self.target_data],
+                          dtype=float)
+        balance = np.empty(len(timestamps))
+        if threshold is None:
+            check_every = max(len(timestamps), 1)
+
+        # running sum of the errors, checked every check_every timestamps
+        error_sum = 0.0
+        for start in range(0, len(timestamps), check_every):
+            chunk = slice(start, start + check_every)
+            for position, timestamp in enumerate(timestamps[chunk], start):
+                with instrumentation.timer("Operator.operate_at_timestamp"):
+                    self.operate_at_timestamp(timestamp)
+                if not vectorized:
+                    with instrumentation.timer("Operator.balance"):
+                        balance[position] = (
+                            self.virtual_power_plant.balance_at_timestamp(
+                                timestamp))
+            if vectorized:
+                with instrumentation.timer("Operator.balance"):
+                    balance[chunk] = (
+                        self.virtual_power_plant.balance_for_timestamps(
+                            timestamps[chunk]))
+            if threshold is None:
+                continue
+
+            error = balance[chunk] - target[chunk]
+            if metric == "mae":
+                error_sum += np.abs(error).sum()
+                bound = error_sum / len(target)
+            else:
+                error_sum += np.square(error).sum()
+                bound = np.sqrt(error_sum / len(target))
+            if bound > threshold:
+                return bound
+
+        return self.score_horizon(balance, target, metric)
+
+    @staticmethod
+    def score_horizon(balance, target, metric="match"):
+        """
+        Score a balance against a target over the whole horizon.
 
-        # Calculate average of match
-        average = power_sum / count
+        Parameters
+        ----------
+        balance : array-like
+            Balance of the virtual power plant per timestep.
+        target : array-like
+            Target balance per timestep.
+        metric : str, optional
+            - "match" (default): mean of 1 - (abs(target) - abs(balance))
+              / abs(target). Timesteps with a target of zero are skipped.
+            - "mae": mean absolute error.
+            - "rmse": root mean squared error.
+            - "energy_deviation": abs(sum(balance) - sum(target)) divided by
+              sum(abs(target)).
 
-        # Return average
-        return average
+        Returns
+        -------
+        float
+            The score. nan if it is undefined, e.g. all targets are zero.
+        """
+        balance = np.asarray(balance, dtype=float)
+        target = np.asarray(target, dtype=float)
+        if balance.shape != target.shape:
+            raise ValueError("balance and target must have the same shape")
+        if len(target) == 0:
+            return np.nan
+
+        if metric == "match":
+            magnitude = np.abs(target)
+            nonzero = magnitude > 0
+            if not nonzero.any():
+                return np.nan
+            return float(np.mean(
+                1 - (magnitude[nonzero] - np.abs(balance[nonzero]))
+                / magnitude[nonzero]
+            ))
+        if metric == "mae":
+            return float(np.mean(np.abs(balance - target)))
+        if metric == "rmse":
+            return float(np.sqrt(np.mean(np.square(balance - target))))
+        if metric == "energy_deviation":
+            total = np.abs(target).sum()
+            if total == 0:
+                return np.nan
+            return float(abs(balance.sum() - target.sum()) / total)
+
+        raise ValueError(
+            "metric must be one of " + str(Operator.score_metrics)
+            + ", not " + repr(metric)
+        )
 
     def operate_at_timestamp(self, timestamp):
         """
@@ -177,13 +272,55 @@ class Operator(object):
         - Adjusting power output of controllable generators
         - Charging or discharging storage systems
         - Controlling flexible loads
+
+        In a ControlLoop the measurements read at the timestamp are
+        available in self.measurements.
         """
         raise NotImplementedError(
             "operate_at_timestamp needs to be implemented by child classes!"
         )
 
+    def operate_stream(self, rows, target_key="target"):
+        """
+        Operate the virtual power plant on a stream of new data.
+
+        For every row the components are advanced by one timestep (see
+        VirtualPowerPlant.advance), operate_at_timestamp is called with the
+        new timestamp and the balance is read. The work per row does not
+        depend on the length of the stream and the components only keep
+        the recent history of their ring buffers.
+
+        Parameters
+        ----------
+        rows : iterable
+            (timestamp, data) tuples, e.g. from vpplib.streaming.read_queue
+            or vpplib.streaming.tail_csv.
+        target_key : str, optional
+            Key of the target value in data (default: "target"). Rows
+            without it use the target_data of the operator.
+
+        Yields
+        ------
+        tuple
+            (timestamp, balance, target) of every row. timestamp is a str
+            in the format 'YYYY-MM-DD hh:mm:ss', target is nan if it is
+            unknown.
+        """
+        targets = dict(self.target_data or ())
+        for timestamp, data in rows:
+            timestamp = str(pd.Timestamp(timestamp))
+            self.virtual_power_plant.advance(timestamp, data)
+            self.operate_at_timestamp(timestamp)
+            balance = self.virtual_power_plant.balance_at_timestamp(timestamp)
+            if target_key in data:
+                target = float(data[target_key])
+            else:
+                target = float(targets.get(timestamp, np.nan))
+
+            yield timestamp, balance, target
+
     # %% assign values of generation/demand over time and run powerflow
-    def run_base_scenario(self, baseload):
+    def run_base_scenario(self, baseload, timesteps=None):
         """
         Run a base scenario simulation with power flow calculations.
         
@@ -198,6 +335,10 @@ class Operator(object):
             Dictionary containing baseload profiles for each bus in the network.
             The keys should be bus IDs as strings, and the values should be
             pandas Series with timestamps as index and load values in W.
+        timesteps : iterable of timestamps, optional
+            Only run the power flow for these timestamps, e.g. the flagged
+            timesteps of run_screening. Storages are then only operated at
+            these timestamps. By default all timestamps are calculated.
             
         Returns
         -------
@@ -220,163 +361,767 @@ class Operator(object):
         (positive values) components, as well as storage components that can
         both consume and generate power depending on the residual load.
         """
+        import pandapower as pp
+        from pandapower.toolbox import get_connected_elements
 
         net_dict = {}
         index = self.virtual_power_plant.components[
             next(iter(self.virtual_power_plant.components))
         ].timeseries.index
+        if timesteps is not None:
+            index = index[index.isin(pd.DatetimeIndex(timesteps))]
         res_loads = pd.DataFrame(
             columns=[self.net.bus.index[self.net.bus.type == "b"]], index=index
         )  # maybe only take buses with storage
 
         for idx in tqdm(index):
-            for component in self.virtual_power_plant.components.keys():
+            instrumentation.count("Operator.timesteps")
+            with instrumentation.timer("Operator.assign_components"):
+                for component in self.virtual_power_plant.components.keys():
 
-                if "storage" not in component:
+                    if "storage" not in component:
 
-                    value_for_timestamp = self.virtual_power_plant.components[
-                        component
-                    ].value_for_timestamp(str(idx))
+                        value_for_timestamp = self.virtual_power_plant.components[
+                            component
+                        ].value_for_timestamp(str(idx))
 
-                    if math.isnan(value_for_timestamp):
-                        raise ValueError(
-                            (
-                                "The value of ",
-                                component,
-                                "at timestep ",
-                                idx,
-                                "is NaN!",
+                        if math.isnan(value_for_timestamp):
+                            raise ValueError(
+                                (
+                                    "The value of ",
+                                    component,
+                                    "at timestep ",
+                                    idx,
+                                    "is NaN!",
+                                )
                             )
-                        )
 
-                if component in list(self.net.sgen.name):
+                    if component in list(self.net.sgen.name):
 
-                    self.net.sgen.loc[self.net.sgen.name == component, 'p_mw'] = (
-                        value_for_timestamp / -1000
-                    )  # kW to MW; negative due to generation
+                        self.net.sgen.loc[self.net.sgen.name == component, 'p_mw'] = (
+                            value_for_timestamp / -1000
+                        )  # kW to MW; negative due to generation
 
-                    if math.isnan(
-                        self.net.sgen.loc[self.net.sgen.name == component, 'p_mw'].iloc[0]
-                    ):
-                        raise ValueError(
-                            (
-                                "The value of ",
-                                component,
-                                "at timestep ",
-                                idx,
-                                "is NaN!",
+                        if math.isnan(
+                            self.net.sgen.loc[self.net.sgen.name == component, 'p_mw'].iloc[0]
+                        ):
+                            raise ValueError(
+                                (
+                                    "The value of ",
+                                    component,
+                                    "at timestep ",
+                                    idx,
+                                    "is NaN!",
+                                )
                             )
+
+                    if component in list(self.net.load.name):
+
+                        self.net.load.loc[self.net.load.name == component, 'p_mw'] = (
+                            value_for_timestamp / 1000
+                        )  # kW to MW
+
+            with instrumentation.timer("Operator.assign_baseload"):
+                for name in self.net.load.name:
+
+                    if (
+                        self.net.load.loc[self.net.load.name == name, 'type'].item()
+                        == "baseload"
+                    ):
+
+                        self.net.load.loc[self.net.load.name == name, 'p_mw'] = (
+                            baseload[
+                                str(
+                                    self.net.load.loc[
+                                        self.net.load.name == name, 'bus'
+                                    ].item()
+                                )
+                            ][str(idx)]
+                            / 1000000
+                        )
+                        self.net.load.loc[self.net.load.name == name, 'q_mvar'] = 0
+
+            with instrumentation.timer("Operator.storage_dispatch"):
+                if len(self.virtual_power_plant.buses_with_storage) > 0:
+                    for bus in self.net.bus.index[self.net.bus.type == "b"]:
+
+                        storage_at_bus = get_connected_elements(
+                            self.net, "storage", bus
+                        )
+                        sgen_at_bus = get_connected_elements(
+                            self.net, "sgen", bus
+                        )
+                        load_at_bus = get_connected_elements(
+                            self.net, "load", bus
                         )
 
-                if component in list(self.net.load.name):
+                        if len(storage_at_bus) > 0:
 
-                    self.net.load.loc[self.net.load.name == component, 'p_mw'] = (
-                        value_for_timestamp / 1000
-                    )  # kW to MW
+                            res_loads.loc[(idx, bus)] = sum(
+                                [self.net.load.loc[load, 'p_mw'] for load in load_at_bus]
+                                ) + sum([self.net.sgen.loc[sgen, 'p_mw'] for sgen in sgen_at_bus])
 
-            for name in self.net.load.name:
+                            # set loads and sgen to 0 since they are in res_loads now
+                            # reassign values after operate_storage has been executed
+                            for l in list(load_at_bus):
+                                self.net.load.loc[self.net.load.index == l, 'p_mw'] = 0
 
-                if (
-                    self.net.load.loc[self.net.load.name == name, 'type'].item()
-                    == "baseload"
-                ):
+                            for l in list(sgen_at_bus):
+                                self.net.sgen.loc[self.net.sgen.index == l, 'p_mw'] = 0
 
-                    self.net.load.loc[self.net.load.name == name, 'p_mw'] = (
-                        baseload[
-                            str(
-                                self.net.load.loc[
-                                    self.net.load.name == name, 'bus'
-                                ].item()
+                            # run storage operation with residual load
+                            state_of_charge, res_load = self.virtual_power_plant.components[
+                                self.net.storage.loc[list(storage_at_bus), 'name'].item()
+                            ].operate_storage(
+                                res_loads.loc[(idx, bus)].item()
                             )
-                        ][str(idx)]
-                        / 1000000
-                    )
-                    self.net.load.loc[self.net.load.name == name, 'q_mvar'] = 0
 
-            if len(self.virtual_power_plant.buses_with_storage) > 0:
-                for bus in self.net.bus.index[self.net.bus.type == "b"]:
+                            # save state of charge and residual load in timeseries
+                            component_name = self.net.storage.loc[list(storage_at_bus), 'name'].item()
+                            self.virtual_power_plant.components[component_name].set_timeseries_value(idx, "state_of_charge", state_of_charge)
+                            self.virtual_power_plant.components[component_name].set_timeseries_value(idx, "residual_load", res_load)
 
-                    storage_at_bus = pp.get_connected_elements(
-                        self.net, "storage", bus
-                    )
-                    sgen_at_bus = pp.get_connected_elements(
-                        self.net, "sgen", bus
-                    )
-                    load_at_bus = pp.get_connected_elements(
-                        self.net, "load", bus
-                    )
+                            # assign new residual load to loads and sgen depending on positive/negative values
+                            if res_load > 0:
 
-                    if len(storage_at_bus) > 0:
+                                if len(load_at_bus) > 0:
+                                    # TODO: load according to origin of demand (baseload, hp or bev)
+                                    load_bus = load_at_bus.pop()
+                                    self.net.load.loc[
+                                        self.net.load.index == load_bus, 'p_mw'
+                                    ] = res_load
 
-                        res_loads.loc[(idx, bus)] = sum(
-                            [self.net.load.loc[load, 'p_mw'] for load in load_at_bus]
-                            ) + sum([self.net.sgen.loc[sgen, 'p_mw'] for sgen in sgen_at_bus])
+                                else:
+                                    # assign new residual load to storage
+                                    storage_bus = storage_at_bus.pop()
+                                    self.net.storage.loc[
+                                        self.net.storage.index == storage_bus, 'p_mw'
+                                    ] = res_load
 
-                        # set loads and sgen to 0 since they are in res_loads now
-                        # reassign values after operate_storage has been executed
-                        for l in list(load_at_bus):
-                            self.net.load.loc[self.net.load.index == l, 'p_mw'] = 0
+                            else:
 
-                        for l in list(sgen_at_bus):
-                            self.net.sgen.loc[self.net.sgen.index == l, 'p_mw'] = 0
+                                if len(sgen_at_bus) > 0:
+                                    # TODO: assign generation according to origin of energy (PV, wind oder CHP)
+                                    gen_bus = sgen_at_bus.pop()
+                                    self.net.sgen.loc[
+                                        self.net.sgen.index == gen_bus, 'p_mw'
+                                    ] = res_load
+
+                                else:
+                                    # assign new residual load to storage
+                                    storage_bus = storage_at_bus.pop()
+                                    self.net.storage.loc[
+                                        self.net.storage.index == storage_bus, 'p_mw'
+                                    ] = res_load
+
+            with instrumentation.timer("Operator.runpp"):
+                pp.runpp(self.net)
+
+            with instrumentation.timer("Operator.copy_results"):
+                net_dict[idx] = {}
+                net_dict[idx]["res_bus"] = self.net.res_bus
+                net_dict[idx]["res_line"] = self.net.res_line
+                net_dict[idx]["res_trafo"] = self.net.res_trafo
+                net_dict[idx]["res_load"] = self.net.res_load
+                net_dict[idx]["res_sgen"] = self.net.res_sgen
+                net_dict[idx]["res_ext_grid"] = self.net.res_ext_grid
+                net_dict[idx]["res_storage"] = self.net.res_storage
 
-                        # run storage operation with residual load
-                        state_of_charge, res_load = self.virtual_power_plant.components[
-                            self.net.storage.loc[list(storage_at_bus), 'name'].item()
-                        ].operate_storage(
-                            res_loads.loc[(idx, bus)].item()
-                        )
+        return net_dict  # , res_loads #res_loads can be returned for analyses
+
+    # %% linearized screening of many timesteps without full power flows
+    def build_sensitivities(self):
+        """
+        Build the linear sensitivities of the grid for run_screening.
 
-                        # save state of charge and residual load in timeseries
-                        component_name = self.net.storage.loc[list(storage_at_bus), 'name'].item()
-                        self.virtual_power_plant.components[component_name].timeseries.loc[idx, "state_of_charge"] = state_of_charge
-                        self.virtual_power_plant.components[component_name].timeseries.loc[idx, "residual_load"] = res_load
+        The grid is linearized around its no-load operating point: all
+        loads, static generators and storages are set to zero and one AC
+        power flow is run on a copy of the net. From this point
 
-                        # assign new residual load to loads and sgen depending on positive/negative values
-                        if res_load > 0:
+        - the active and reactive branch flows follow from the DC power
+          transfer distribution factors (PTDF) of the grid, which give the
+          exact flows of radial grids if losses are neglected,
+        - the voltage magnitudes follow from the inverse bus admittance
+          matrix (Z-matrix) with dVm/dP and dVm/dQ linearized at the
+          no-load voltages.
 
-                            if len(load_at_bus) > 0:
-                                # TODO: load according to origin of demand (baseload, hp or bev)
-                                load_bus = load_at_bus.pop()
-                                self.net.load.loc[
-                                    self.net.load.index == load_bus, 'p_mw'
-                                ] = res_load
+        Every ext_grid bus is a slack, so grids with several feeders or
+        islands are supported.
 
-                            else:
-                                # assign new residual load to storage
-                                storage_bus = storage_at_bus.pop()
-                                self.net.storage.loc[
-                                    self.net.storage.index == storage_bus, 'p_mw'
-                                ] = res_load
+        Returns
+        -------
+        dict
+            The sensitivities, also stored as self.sensitivities.
+        """
+        import pandapower as pp
+        from scipy.sparse.linalg import splu
+
+        net = copy.deepcopy(self.net)
+        for element in ("load", "sgen", "storage"):
+            net[element]["p_mw"] = 0.0
+            net[element]["q_mvar"] = 0.0
+        pp.runpp(net)
+
+        ppci = net._ppc["internal"]
+        base_mva = ppci["baseMVA"]
+        n_bus = ppci["bus"].shape[0]
+        slack = np.asarray(ppci["ref"], dtype=np.int64)
+        other = np.setdiff1d(np.arange(n_bus), slack)
+
+        # PTDF of all in-service branches, in p.u. flow per p.u. injection
+        b_bus = ppci["Bbus"].tocsc()[other][:, other].tocsc()
+        # the last row stays zero for out-of-service branches (position -1)
+        ptdf = np.zeros((ppci["branch"].shape[0] + 1, n_bus))
+        ptdf[:-1, other] = (ppci["Bf"].tocsc()[:, other]
+                          @ splu(b_bus).solve(np.eye(len(other))))
+
+        # Voltage magnitude sensitivities in p.u. per p.u. injection
+        y_bus = ppci["Ybus"].tocsc()[other][:, other].tocsc()
+        z_bus = splu(y_bus).solve(np.eye(len(other), dtype=complex))
+        v_0 = ppci["V"][other]
+        rotation = np.conj(v_0)[:, None] / np.abs(v_0)[:, None]
+        dvm_dp = np.zeros((n_bus, n_bus))
+        dvm_dq = np.zeros((n_bus, n_bus))
+        dvm_dp[np.ix_(other, other)] = np.real(
+            rotation * z_bus / np.conj(v_0)[None, :])
+        dvm_dq[np.ix_(other, other)] = np.real(
+            rotation * z_bus * -1j / np.conj(v_0)[None, :])
+
+        # map pandapower elements to the internal (ppci) buses and branches
+        bus_lookup = net._pd2ppc_lookups["bus"]
+        in_service = np.flatnonzero(ppci["branch_is"])
+        branch_position = np.full(len(ppci["branch_is"]), -1, dtype=np.int64)
+        branch_position[in_service] = np.arange(len(in_service))
+
+        def branches(element):
+            start, end = net._pd2ppc_lookups["branch"].get(element, (0, 0))
+            return branch_position[start:end]
+
+        line_vn_kv = net.bus.vn_kv.loc[net.line.from_bus].to_numpy()
+        self.sensitivities = {
+            "base_mva": base_mva,
+            "n_bus": n_bus,
+            "bus_lookup": bus_lookup,
+            "ptdf": ptdf,
+            "dvm_dp": dvm_dp,
+            "dvm_dq": dvm_dq,
+            "vm_0": np.abs(ppci["V"]),
+            "bus": net.bus.index,
+            "bus_position": bus_lookup[net.bus.index.to_numpy()],
+            "line": net.line.index,
+            "line_position": branches("line"),
+            "line_p_0": net.res_line.p_from_mw.to_numpy(),
+            "line_q_0": net.res_line.q_from_mvar.to_numpy(),
+            "line_rating_mva": (
+                math.sqrt(3) * line_vn_kv * net.line.max_i_ka.to_numpy()
+                * net.line.df.to_numpy() * net.line.parallel.to_numpy()
+            ),
+            "trafo": net.trafo.index,
+            "trafo_position": branches("trafo"),
+            "trafo_p_0": net.res_trafo.p_hv_mw.to_numpy(),
+            "trafo_q_0": net.res_trafo.q_hv_mvar.to_numpy(),
+            "trafo_rating_mva": (
+                net.trafo.sn_mva.to_numpy() * net.trafo.parallel.to_numpy()
+            ),
+        }
 
-                        else:
+        return self.sensitivities
 
-                            if len(sgen_at_bus) > 0:
-                                # TODO: assign generation according to origin of energy (PV, wind oder CHP)
-                                gen_bus = sgen_at_bus.pop()
-                                self.net.sgen.loc[
-                                    self.net.sgen.index == gen_bus, 'p_mw'
-                                ] = res_load
+    def _nodal_injection_matrix(self, baseload, index, bus_lookup=None,
+                                n_bus=None):
+        """
+        Return the nodal injections of the whole timeseries.
 
-                            else:
-                                # assign new residual load to storage
-                                storage_bus = storage_at_bus.pop()
-                                self.net.storage.loc[
-                                    self.net.storage.index == storage_bus, 'p_mw'
-                                ] = res_load
-
-            pp.runpp(self.net)
-
-            net_dict[idx] = {}
-            net_dict[idx]["res_bus"] = self.net.res_bus
-            net_dict[idx]["res_line"] = self.net.res_line
-            net_dict[idx]["res_trafo"] = self.net.res_trafo
-            net_dict[idx]["res_load"] = self.net.res_load
-            net_dict[idx]["res_sgen"] = self.net.res_sgen
-            net_dict[idx]["res_ext_grid"] = self.net.res_ext_grid
-            net_dict[idx]["res_storage"] = self.net.res_storage
+        The values are assigned as in run_base_scenario: VPP components by
+        name to net.sgen (generation) and net.load (demand), baseloads to
+        the loads of type "baseload" and the remaining elements keep their
+        static values. Storages are not operated.
 
-        return net_dict  # , res_loads #res_loads can be returned for analyses
+        Parameters
+        ----------
+        baseload : pandas.DataFrame
+            Baseload in W, see run_base_scenario.
+        index : pandas.DatetimeIndex
+            Timesteps.
+        bus_lookup : array-like, optional
+            Row of every pandapower bus, e.g. the internal buses of the
+            sensitivities. Defaults to the position in net.bus.
+        n_bus : int, optional
+            Number of rows. Buses mapped to a row >= n_bus are skipped.
+
+        Returns
+        -------
+        tuple of numpy.ndarray
+            Active and reactive injections in MW and Mvar with the shape
+            (buses, timesteps).
+        """
+        if bus_lookup is None:
+            bus_lookup = pd.Series(np.arange(len(self.net.bus)),
+                                   index=self.net.bus.index)
+            n_bus = len(self.net.bus)
+        p = np.zeros((n_bus, len(index)))
+        q = np.zeros((n_bus, len(index)))
+        components = self.virtual_power_plant.components
+
+        for element, sign in (("sgen", 1.0), ("load", -1.0)):
+            table = self.net[element]
+            for i in table.index[table.in_service.to_numpy(dtype=bool)]:
+                position = bus_lookup[table.at[i, "bus"]]
+                if position >= n_bus:
+                    continue  # bus out of service
+                name = table.at[i, "name"]
+                scaling = table.at[i, "scaling"]
+                if element == "load" and table.at[i, "type"] == "baseload":
+                    values = (baseload[str(table.at[i, "bus"])]
+                              .reindex(index).to_numpy(dtype=float) / 1000000)
+                    p[position] += sign * scaling * values
+                    continue
+                if name in components and "storage" not in name:
+                    values = components[name].values_for_timestamps(index)
+                    if np.isnan(values).any():
+                        raise ValueError(
+                            "The timeseries of " + name + " contains NaN!")
+                    # kW to MW; sgen values are negative as in run_base_scenario
+                    if element == "sgen":
+                        values = values / -1000
+                    else:
+                        values = values / 1000
+                    p[position] += sign * scaling * values
+                else:
+                    p[position] += sign * scaling * table.at[i, "p_mw"]
+                q[position] += sign * scaling * table.at[i, "q_mvar"]
+
+        return p, q
+
+    def run_screening(self, baseload, index=None, max_loading_percent=100,
+                      vm_min_pu=0.95, vm_max_pu=1.05, loading_margin=10,
+                      vm_margin=0.01):
+        """
+        Estimate line loadings and voltages of the whole timeseries at once.
+
+        Instead of a Newton-Raphson power flow per timestep, the branch
+        flows and voltages are calculated with the linear sensitivities of
+        build_sensitivities as one matrix multiplication with the nodal
+        injection matrix. Timesteps whose estimate comes close to a limit
+        are flagged for a verification with run_base_scenario.
+
+        Parameters
+        ----------
+        baseload : pandas.DataFrame
+            Baseload in W, see run_base_scenario.
+        index : pandas.DatetimeIndex, optional
+            Timesteps to screen. Defaults to the index of the first VPP
+            component as in run_base_scenario.
+        max_loading_percent : float, optional
+            Loading limit of lines and trafos (default: 100).
+        vm_min_pu, vm_max_pu : float, optional
+            Voltage band (default: 0.95 to 1.05).
+        loading_margin : float, optional
+            Timesteps with a loading above max_loading_percent minus this
+            margin (percentage points) are flagged (default: 10).
+        vm_margin : float, optional
+            Timesteps with a voltage closer than this margin (p.u.) to the
+            band are flagged (default: 0.01).
+
+        Returns
+        -------
+        dict
+            "line_loading_percent", "trafo_loading_percent" and "vm_pu" as
+            DataFrames (timesteps x elements) and "flagged", the
+            DatetimeIndex of the timesteps to verify.
+
+        Notes
+        -----
+        Storages are not operated in the screening, so their balancing
+        effect is neglected and the screening errs on the side of flagging.
+        """
+        if getattr(self, "sensitivities", None) is None:
+            self.build_sensitivities()
+        s = self.sensitivities
+
+        if index is None:
+            index = self.virtual_power_plant.components[
+                next(iter(self.virtual_power_plant.components))
+            ].timeseries.index
+
+        p, q = self._nodal_injection_matrix(
+            baseload, index, s["bus_lookup"], s["n_bus"])
+        p_pu = p / s["base_mva"]
+        q_pu = q / s["base_mva"]
+
+        flow_p = s["ptdf"] @ p
+        flow_q = s["ptdf"] @ q
+
+        def loading(element):
+            position = s[element + "_position"]
+            flow = np.hypot(
+                flow_p[position] + s[element + "_p_0"][:, None],
+                flow_q[position] + s[element + "_q_0"][:, None],
+            )
+            return pd.DataFrame(
+                (flow / s[element + "_rating_mva"][:, None] * 100).T,
+                index=index, columns=s[element],
+            )
+
+        line_loading = loading("line")
+        trafo_loading = loading("trafo")
+
+        vm = (s["vm_0"][:, None] + s["dvm_dp"] @ p_pu + s["dvm_dq"] @ q_pu)
+        vm = pd.DataFrame(vm[s["bus_position"]].T, index=index,
+                          columns=s["bus"])
+
+        max_loading = pd.concat(
+            [line_loading.max(axis=1), trafo_loading.max(axis=1)], axis=1
+        ).max(axis=1)
+        flagged = (
+            (max_loading > max_loading_percent - loading_margin)
+            | (vm.min(axis=1) < vm_min_pu + vm_margin)
+            | (vm.max(axis=1) > vm_max_pu - vm_margin)
+        )
+
+        return {
+            "line_loading_percent": line_loading,
+            "trafo_loading_percent": trafo_loading,
+            "vm_pu": vm,
+            "flagged": index[flagged.to_numpy()],
+        }
+
+    # %% representative periods instead of the full timeseries
+    def aggregate_time_series(self, baseload, n_periods, period="1D",
+                              method="hierarchical", seed=0, index=None):
+        """
+        Cluster the periods of the scenario into representative periods.
+
+        The periods are compared by the aggregated generation and demand of
+        the VPP components and the aggregated baseload of the grid.
+
+        Parameters
+        ----------
+        baseload : pandas.DataFrame
+            Baseload in W, see run_base_scenario.
+        n_periods : int
+            Number of representative periods.
+        period : str, optional
+            Length of a period, e.g. "1D" (default) or "12h".
+        method : str, optional
+            "hierarchical" (default) or "kmedoids", see
+            TimeseriesAggregation.
+        seed : int, optional
+            Seed of the k-medoids initialization (default: 0).
+        index : pandas.DatetimeIndex, optional
+            Timesteps to aggregate. Defaults to the index of the first VPP
+            component as in run_base_scenario.
+
+        Returns
+        -------
+        TimeseriesAggregation
+            The fitted aggregation.
+        """
+        from vpplib.timeseries_aggregation import TimeseriesAggregation
+
+        if index is None:
+            index = self.virtual_power_plant.components[
+                next(iter(self.virtual_power_plant.components))
+            ].timeseries.index
+
+        profiles = pd.DataFrame(0.0, index=index,
+                                columns=["generation", "demand", "baseload"])
+        for name, component in self.virtual_power_plant.components.items():
+            if "storage" in name:
+                continue
+            if name in set(self.net.sgen.name):
+                profiles["generation"] += component.values_for_timestamps(index)
+            elif name in set(self.net.load.name):
+                profiles["demand"] += component.values_for_timestamps(index)
+        buses = self.net.load.bus[self.net.load.type == "baseload"]
+        profiles["baseload"] = (
+            baseload[buses.astype(str).unique()].reindex(index).sum(axis=1)
+        )
+
+        return TimeseriesAggregation(
+            n_periods, period=period, method=method, seed=seed
+        ).fit(profiles)
+
+    def run_aggregated_scenario(self, baseload, n_periods, period="1D",
+                                method="hierarchical", seed=0):
+        """
+        Run run_base_scenario for representative periods only.
+
+        Parameters
+        ----------
+        baseload : pandas.DataFrame
+            Baseload in W, see run_base_scenario.
+        n_periods, period, method, seed
+            See aggregate_time_series.
+
+        Returns
+        -------
+        tuple
+            (net_dict, aggregation): the power flow results of the
+            representative timesteps and the TimeseriesAggregation. Use
+            aggregation.expand(self.result_frame(net_dict, ...)) to expand
+            the results to the full index and aggregation.weights to weight
+            the representative periods.
+
+        Notes
+        -----
+        Storages are operated over the representative timesteps only, so
+        their state of charge is not continuous between the periods.
+        """
+        aggregation = self.aggregate_time_series(
+            baseload, n_periods, period=period, method=method, seed=seed
+        )
+        net_dict = self.run_base_scenario(
+            baseload, timesteps=aggregation.representatives
+        )
+
+        return net_dict, aggregation
+
+    @staticmethod
+    def result_frame(net_dict, table="res_line", column="loading_percent"):
+        """
+        Return one result of all timesteps of net_dict as DataFrame.
+
+        Parameters
+        ----------
+        net_dict : dict
+            Result of run_base_scenario.
+        table : str, optional
+            Result table (default: "res_line").
+        column : str, optional
+            Column of the result table (default: "loading_percent").
+
+        Returns
+        -------
+        pandas.DataFrame
+            Timesteps x element indices.
+        """
+        if len(net_dict) == 0:
+            return pd.DataFrame()
+        timesteps = list(net_dict)
+        return pd.DataFrame(
+            np.array([net_dict[idx][table][column].to_numpy(dtype=float)
+                      for idx in timesteps]),
+            index=pd.DatetimeIndex(timesteps),
+            columns=net_dict[timesteps[0]][table].index,
+        )
+
+    def aggregation_error(self, net_dict, aggregated_net_dict, aggregation):
+        """
+        Compare an aggregated run with a full run.
+
+        Parameters
+        ----------
+        net_dict : dict
+            Result of run_base_scenario for the full timeseries.
+        aggregated_net_dict : dict
+            Result of run_aggregated_scenario.
+        aggregation : TimeseriesAggregation
+            The aggregation of the aggregated run.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Error report per quantity (line and trafo loading, bus voltage,
+            ext_grid power), see TimeseriesAggregation.error_report.
+        """
+        quantities = {
+            "line_loading_percent": ("res_line", "loading_percent"),
+            "trafo_loading_percent": ("res_trafo", "loading_percent"),
+            "bus_vm_pu": ("res_bus", "vm_pu"),
+            "ext_grid_p_mw": ("res_ext_grid", "p_mw"),
+        }
+        full = {}
+        expanded = {}
+        for name, (table, column) in quantities.items():
+            frame = self.result_frame(net_dict, table, column)
+            if frame.size == 0:
+                continue
+            full[name] = frame
+            expanded[name] = aggregation.expand(
+                self.result_frame(aggregated_net_dict, table, column))
+
+        return aggregation.error_report(full, expanded)
+
+    # %% worst-case timesteps per feeder
+    def get_feeders(self):
+        """
+        Assign every bus of the grid to a feeder.
+
+        A feeder is a part of the grid connected by lines (and closed bus
+        switches) behind a substation. Substation buses, i.e. the buses of
+        trafos and ext_grids, do not belong to a feeder.
+
+        Returns
+        -------
+        pandas.Series
+            Feeder number of every bus, -1 for substation buses.
+        """
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.csgraph import connected_components
+
+        net = self.net
+        position = pd.Series(np.arange(len(net.bus)), index=net.bus.index)
+
+        open_lines = net.switch.element[
+            (net.switch.et == "l") & ~net.switch.closed.astype(bool)
+        ]
+        lines = net.line[
+            net.line.in_service.astype(bool)
+            & ~net.line.index.isin(open_lines)
+        ]
+        bus_switches = net.switch[
+            (net.switch.et == "b") & net.switch.closed.astype(bool)
+        ]
+        from_bus = np.concatenate((lines.from_bus.to_numpy(),
+                                   bus_switches.bus.to_numpy()))
+        to_bus = np.concatenate((lines.to_bus.to_numpy(),
+                                 bus_switches.element.to_numpy()))
+
+        substation = np.unique(np.concatenate((
+            net.trafo.hv_bus.to_numpy(), net.trafo.lv_bus.to_numpy(),
+            net.trafo3w.hv_bus.to_numpy(), net.trafo3w.mv_bus.to_numpy(),
+            net.trafo3w.lv_bus.to_numpy(), net.ext_grid.bus.to_numpy(),
+        )))
+        keep = ~(np.isin(from_bus, substation) | np.isin(to_bus, substation))
+        rows = position[from_bus[keep]].to_numpy()
+        cols = position[to_bus[keep]].to_numpy()
+        adjacency = coo_matrix(
+            (np.ones(len(rows)), (rows, cols)),
+            shape=(len(net.bus), len(net.bus)),
+        )
+        _, labels = connected_components(adjacency, directed=False)
+
+        feeders = pd.Series(labels, index=net.bus.index, name="feeder")
+        feeders[feeders.index.isin(substation)] = -1
+        in_feeder = feeders >= 0
+        feeders[in_feeder] = pd.factorize(feeders[in_feeder])[0]
+
+        return feeders
+
+    def rank_critical_timesteps(self, baseload, top_k=10, index=None):
+        """
+        Rank the timesteps by the net injection extremes of every feeder.
+
+        The net injection of a feeder is the sum of the active power
+        injections of its buses, assigned as in run_base_scenario (storages
+        are not operated). The top_k timesteps with the highest injection
+        (generation peaks) and the top_k with the lowest injection (demand
+        peaks) of every feeder are critical.
+
+        Parameters
+        ----------
+        baseload : pandas.DataFrame
+            Baseload in W, see run_base_scenario.
+        top_k : int, optional
+            Number of timesteps per feeder and direction (default: 10).
+        index : pandas.DatetimeIndex, optional
+            Timesteps to rank. Defaults to the index of the first VPP
+            component as in run_base_scenario.
+
+        Returns
+        -------
+        dict
+            "feeders" (see get_feeders), "injection" (net injection in MW,
+            timesteps x feeders, positive for generation) and "critical",
+            the DatetimeIndex of the critical timesteps.
+        """
+        if index is None:
+            index = self.virtual_power_plant.components[
+                next(iter(self.virtual_power_plant.components))
+            ].timeseries.index
+
+        feeders = self.get_feeders()
+        p, _ = self._nodal_injection_matrix(baseload, index)
+        injection = (
+            pd.DataFrame(p, index=feeders.to_numpy())
+            .groupby(level=0).sum()
+            .drop(index=-1, errors="ignore")
+        )
+        injection = pd.DataFrame(injection.to_numpy().T, index=index,
+                                 columns=injection.index)
+        injection.columns.name = "feeder"
+
+        values = injection.to_numpy()
+        k = min(top_k, len(index))
+        critical = np.zeros(len(index), dtype=bool)
+        for i in range(values.shape[1]):
+            if not values[:, i].any():
+                continue
+            critical[np.argpartition(values[:, i], -k)[-k:]] = True
+            critical[np.argpartition(values[:, i], k - 1)[:k]] = True
+
+        return {
+            "feeders": feeders,
+            "injection": injection,
+            "critical": index[critical],
+        }
+
+    def run_critical_scenario(self, baseload, top_k=10, estimate=False):
+        """
+        Run run_base_scenario for the critical timesteps only.
+
+        Parameters
+        ----------
+        baseload : pandas.DataFrame
+            Baseload in W, see run_base_scenario.
+        top_k : int, optional
+            Number of timesteps per feeder and direction, see
+            rank_critical_timesteps (default: 10).
+        estimate : bool, optional
+            If True, the other timesteps are estimated with run_screening,
+            otherwise they are skipped (default: False).
+
+        Returns
+        -------
+        tuple
+            (net_dict, report): the power flow results of the critical
+            timesteps and a DataFrame of all timesteps with their "status"
+            ("simulated", "estimated" or "skipped") and the maximum line and
+            trafo loading and the voltage extremes.
+
+        Notes
+        -----
+        Storages are operated over the critical timesteps only, so their
+        state of charge is not continuous.
+        """
+        ranking = self.rank_critical_timesteps(baseload, top_k=top_k)
+        index = ranking["injection"].index
+        critical = ranking["critical"]
+        net_dict = self.run_base_scenario(baseload, timesteps=critical)
+
+        columns = ["max_line_loading_percent", "max_trafo_loading_percent",
+                   "min_vm_pu", "max_vm_pu"]
+        report = pd.DataFrame(np.nan, index=index, columns=columns)
+        report.insert(0, "status", "skipped")
+
+        if estimate:
+            screening = self.run_screening(baseload, index=index)
+            report["status"] = "estimated"
+            report["max_line_loading_percent"] = (
+                screening["line_loading_percent"].max(axis=1))
+            report["max_trafo_loading_percent"] = (
+                screening["trafo_loading_percent"].max(axis=1))
+            report["min_vm_pu"] = screening["vm_pu"].min(axis=1)
+            report["max_vm_pu"] = screening["vm_pu"].max(axis=1)
+
+        if len(net_dict) > 0:
+            simulated = pd.DatetimeIndex(list(net_dict))
+            report.loc[simulated, "status"] = "simulated"
+            for column, table, value, function in (
+                ("max_line_loading_percent", "res_line", "loading_percent",
+                 "max"),
+                ("max_trafo_loading_percent", "res_trafo", "loading_percent",
+                 "max"),
+                ("min_vm_pu", "res_bus", "vm_pu", "min"),
+                ("max_vm_pu", "res_bus", "vm_pu", "max"),
+            ):
+                frame = self.result_frame(net_dict, table, value)
+                if frame.shape[1] > 0:
+                    report.loc[simulated, column] = getattr(
+                        frame, function)(axis=1)
+
+        return net_dict, report
 
     # %% define a function to apply absolute values from SimBench profiles
     def apply_absolute_simbench_values(self, absolute_values_dict, case_or_time_step):
@@ -460,6 +1205,8 @@ class Operator(object):
         ----------
         SimBench: https://simbench.de/en/
         """
+        import pandapower as pp
+        from pandapower.toolbox import get_connected_elements
 
         net_dict = {}
         index = self.virtual_power_plant.components[
@@ -486,20 +1233,44 @@ class Operator(object):
                 ].environment.time_freq)
 
         for idx in tqdm(index):
+            instrumentation.count("Operator.timesteps")
 
             # assign loadprofiles to simbench components
-            self.apply_absolute_simbench_values(profiles, idx)
+            with instrumentation.timer("Operator.apply_simbench_values"):
+                self.apply_absolute_simbench_values(profiles, idx)
+
+            with instrumentation.timer("Operator.assign_components"):
+                for component in self.virtual_power_plant.components.keys():
+
+                    if "ees" not in component:
+                        if "tes" not in component:
+
+                            value_for_timestamp = self.virtual_power_plant.components[
+                                component
+                            ].value_for_timestamp(str(idx))
+
+                            if math.isnan(value_for_timestamp):
+                                raise ValueError(
+                                    (
+                                        "The value of ",
+                                        component,
+                                        "at timestep ",
+                                        idx,
+                                        "is NaN!",
+                                    )
+                                )
 
-            for component in self.virtual_power_plant.components.keys():
+                    if component in list(self.net.sgen.name):
 
-                if "ees" not in component:
-                    if "tes" not in component:
+                        self.net.sgen.loc[self.net.sgen.name == component, 'p_mw'] = (
+                            value_for_timestamp / -1000
+                        )  # kW to MW; negative due to generation
 
-                        value_for_timestamp = self.virtual_power_plant.components[
-                            component
-                        ].value_for_timestamp(str(idx))
+                        self.net.sgen.loc[self.net.sgen.name == component, 'q_mvar'] = 0
 
-                        if math.isnan(value_for_timestamp):
+                        if math.isnan(
+                            self.net.sgen.loc[self.net.sgen.name == component, 'p_mw']
+                        ):
                             raise ValueError(
                                 (
                                     "The value of ",
@@ -510,124 +1281,106 @@ class Operator(object):
                                 )
                             )
 
-                if component in list(self.net.sgen.name):
-
-                    self.net.sgen.loc[self.net.sgen.name == component, 'p_mw'] = (
-                        value_for_timestamp / -1000
-                    )  # kW to MW; negative due to generation
-
-                    self.net.sgen.loc[self.net.sgen.name == component, 'q_mvar'] = 0
-
-                    if math.isnan(
-                        self.net.sgen.loc[self.net.sgen.name == component, 'p_mw']
-                    ):
-                        raise ValueError(
-                            (
-                                "The value of ",
-                                component,
-                                "at timestep ",
-                                idx,
-                                "is NaN!",
-                            )
-                        )
-
-                if component in list(self.net.load.name):
+                    if component in list(self.net.load.name):
 
-                    self.net.load.loc[self.net.load.name == component, 'p_mw'] = (
-                        value_for_timestamp / 1000
-                    )  # kW to MW
+                        self.net.load.loc[self.net.load.name == component, 'p_mw'] = (
+                            value_for_timestamp / 1000
+                        )  # kW to MW
 
-                    self.net.load.loc[self.net.load.name == component, 'q_mvar'] = 0
+                        self.net.load.loc[self.net.load.name == component, 'q_mvar'] = 0
 
-            if len(self.virtual_power_plant.buses_with_storage) > 0:
-                for bus in self.net.bus.index[self.net.bus.type == "b"]:
+            with instrumentation.timer("Operator.storage_dispatch"):
+                if len(self.virtual_power_plant.buses_with_storage) > 0:
+                    for bus in self.net.bus.index[self.net.bus.type == "b"]:
 
-                    storage_at_bus = pp.get_connected_elements(
-                        self.net, "storage", bus
-                    )
-                    sgen_at_bus = pp.get_connected_elements(
-                        self.net, "sgen", bus
-                    )
-                    load_at_bus = pp.get_connected_elements(
-                        self.net, "load", bus
-                    )
+                        storage_at_bus = get_connected_elements(
+                            self.net, "storage", bus
+                        )
+                        sgen_at_bus = get_connected_elements(
+                            self.net, "sgen", bus
+                        )
+                        load_at_bus = get_connected_elements(
+                            self.net, "load", bus
+                        )
 
-                    if len(storage_at_bus) > 0:
+                        if len(storage_at_bus) > 0:
 
-                        res_loads.loc[(idx, bus)] = sum(
-                            self.net.load.loc[load_at_bus].p_mw
-                        ) + sum(self.net.sgen.loc[sgen_at_bus].p_mw)
+                            res_loads.loc[(idx, bus)] = sum(
+                                self.net.load.loc[load_at_bus].p_mw
+                            ) + sum(self.net.sgen.loc[sgen_at_bus].p_mw)
 
-                        # set loads and sgen to 0 since they are in res_loads now
-                        # reassign values after operate_storage has been executed
-                        for l in list(load_at_bus):
-                            self.net.load.loc[self.net.load.index == l, 'p_mw'] = 0
+                            # set loads and sgen to 0 since they are in res_loads now
+                            # reassign values after operate_storage has been executed
+                            for l in list(load_at_bus):
+                                self.net.load.loc[self.net.load.index == l, 'p_mw'] = 0
 
-                        for l in list(sgen_at_bus):
-                            self.net.sgen.loc[self.net.sgen.index == l, 'p_mw'] = 0
+                            for l in list(sgen_at_bus):
+                                self.net.sgen.loc[self.net.sgen.index == l, 'p_mw'] = 0
 
-                        # run storage operation with residual load
-                        state_of_charge, res_load = self.virtual_power_plant.components[
-                            self.net.storage.loc[storage_at_bus, 'name'].item()
-                        ].operate_storage(
-                            res_loads.loc[(idx, bus)]
-                        )
+                            # run storage operation with residual load
+                            state_of_charge, res_load = self.virtual_power_plant.components[
+                                self.net.storage.loc[storage_at_bus, 'name'].item()
+                            ].operate_storage(
+                                res_loads.loc[(idx, bus)]
+                            )
 
-                        # save state of charge and residual load in timeseries
-                        self.virtual_power_plant.components[
-                            self.net.storage.loc[storage_at_bus, 'name'].item()
-                        ].timeseries["state_of_charge"][
-                            idx
-                        ] = (
-                            state_of_charge
-                        )  # state_of_charge_df[idx][bus] = state_of_charge
-                        self.virtual_power_plant.components[
-                            self.net.storage.loc[storage_at_bus, 'name'].item()
-                        ].timeseries["residual_load"][idx] = res_load
-
-                        # assign new residual load to loads and sgen depending on positive/negative values
-                        if res_load > 0:
-
-                            if len(load_at_bus) > 0:
-                                # TODO: load according to origin of demand (baseload, hp or bev)
-                                load_bus = load_at_bus.pop()
-                                self.net.load.loc[
-                                    self.net.load.index == load_bus, 'p_mw'
-                                ] = res_load
+                            # save state of charge and residual load in timeseries
+                            self.virtual_power_plant.components[
+                                self.net.storage.loc[storage_at_bus, 'name'].item()
+                            ].timeseries["state_of_charge"][
+                                idx
+                            ] = (
+                                state_of_charge
+                            )  # state_of_charge_df[idx][bus] = state_of_charge
+                            self.virtual_power_plant.components[
+                                self.net.storage.loc[storage_at_bus, 'name'].item()
+                            ].timeseries["residual_load"][idx] = res_load
+
+                            # assign new residual load to loads and sgen depending on positive/negative values
+                            if res_load > 0:
+
+                                if len(load_at_bus) > 0:
+                                    # TODO: load according to origin of demand (baseload, hp or bev)
+                                    load_bus = load_at_bus.pop()
+                                    self.net.load.loc[
+                                        self.net.load.index == load_bus, 'p_mw'
+                                    ] = res_load
+
+                                else:
+                                    # assign new residual load to storage
+                                    storage_bus = storage_at_bus.pop()
+                                    self.net.storage.loc[
+                                        self.net.storage.index == storage_bus, 'p_mw'
+                                    ] = res_load
 
                             else:
-                                # assign new residual load to storage
-                                storage_bus = storage_at_bus.pop()
-                                self.net.storage.loc[
-                                    self.net.storage.index == storage_bus, 'p_mw'
-                                ] = res_load
-
-                        else:
-
-                            if len(sgen_at_bus) > 0:
-                                # TODO: assign generation according to origin of energy (PV, wind oder CHP)
-                                gen_bus = sgen_at_bus.pop()
-                                self.net.sgen.loc[
-                                    self.net.sgen.index == gen_bus, 'p_mw'
-                                ] = res_load
 
-                            else:
-                                # assign new residual load to storage
-                                storage_bus = storage_at_bus.pop()
-                                self.net.storage.loc[
-                                    self.net.storage.index == storage_bus, 'p_mw'
-                                ] = res_load
-
-            pp.runpp(self.net)
-
-            net_dict[idx] = {}
-            net_dict[idx]["res_bus"] = self.net.res_bus
-            net_dict[idx]["res_line"] = self.net.res_line
-            net_dict[idx]["res_trafo"] = self.net.res_trafo
-            net_dict[idx]["res_load"] = self.net.res_load
-            net_dict[idx]["res_sgen"] = self.net.res_sgen
-            net_dict[idx]["res_ext_grid"] = self.net.res_ext_grid
-            net_dict[idx]["res_storage"] = self.net.res_storage
+                                if len(sgen_at_bus) > 0:
+                                    # TODO: assign generation according to origin of energy (PV, wind oder CHP)
+                                    gen_bus = sgen_at_bus.pop()
+                                    self.net.sgen.loc[
+                                        self.net.sgen.index == gen_bus, 'p_mw'
+                                    ] = res_load
+
+                                else:
+                                    # assign new residual load to storage
+                                    storage_bus = storage_at_bus.pop()
+                                    self.net.storage.loc[
+                                        self.net.storage.index == storage_bus, 'p_mw'
+                                    ] = res_load
+
+            with instrumentation.timer("Operator.runpp"):
+                pp.runpp(self.net)
+
+            with instrumentation.timer("Operator.copy_results"):
+                net_dict[idx] = {}
+                net_dict[idx]["res_bus"] = self.net.res_bus
+                net_dict[idx]["res_line"] = self.net.res_line
+                net_dict[idx]["res_trafo"] = self.net.res_trafo
+                net_dict[idx]["res_load"] = self.net.res_load
+                net_dict[idx]["res_sgen"] = self.net.res_sgen
+                net_dict[idx]["res_ext_grid"] = self.net.res_ext_grid
+                net_dict[idx]["res_storage"] = self.net.res_storage
 
         return net_dict  # , res_loads #res_loads can be returned for analyses
 
@@ -857,6 +1610,7 @@ class Operator(object):
         In such cases, it may be better to use extract_single_result to extract
         specific results and plot them separately.
         """
+        import matplotlib.pyplot as plt
 
         results["ext_grid"].plot(
             figsize=(16, 9), title="ext_grid", legend=legend
@@ -915,6 +1669,8 @@ class Operator(object):
         If there are no buses with PV components in the virtual power plant,
         the method does nothing.
         """
+        import matplotlib.pyplot as plt
+
         if len(self.virtual_power_plant.buses_with_pv) > 0:
             for gen in results["sgen_p_mw"].columns:
                 if "PV" in gen:
@@ -950,6 +1706,8 @@ class Operator(object):
         If there are no buses with wind components in the virtual power plant,
         the method does nothing.
         """
+        import matplotlib.pyplot as plt
+
         if len(self.virtual_power_plant.buses_with_wind) > 0:
             for gen in results["sgen_p_mw"].columns:
                 if "WindPower" in gen:
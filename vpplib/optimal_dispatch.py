@@ -0,0 +1,581 @@
+# -*- coding: utf-8 -*-
+"""
+Optimal Dispatch Module
+-----------------------
+This module contains the OptimalDispatch class, which dispatches the
+flexible components of a virtual power plant with one sparse linear program
+(or mixed-integer linear program) over the horizon instead of the rule-based
+control of the components.
+
+The model covers
+
+- electrical storages (ElectricalEnergyStorage) with their state of charge,
+- battery electric vehicles charging while at home,
+- heat pumps, combined heat and power plants and heating rods coupled to a
+  thermal energy storage (or directly to their thermal demand),
+- curtailment of photovoltaic and wind power (the limit of limit_power_to).
+
+All other components are fixed profiles. The problem is solved with HiGHS
+through scipy.optimize.milp. Long horizons can be decomposed into rolling
+windows.
+
+Power values are in kW, positive for generation and negative for
+consumption. The balance of the VPP is the sum of all power values; it
+follows the target_data in the least absolute deviation sense.
+"""
+
+import numpy as np
+import pandas as pd
+
+from vpplib.battery_electric_vehicle import BatteryElectricVehicle
+from vpplib.combined_heat_and_power import CombinedHeatAndPower
+from vpplib.electrical_energy_storage import ElectricalEnergyStorage
+from vpplib.heat_pump import HeatPump
+from vpplib.heating_rod import HeatingRod
+from vpplib.photovoltaic import Photovoltaic
+from vpplib.thermal_energy_storage import ThermalEnergyStorage
+from vpplib.wind_power import WindPower
+
+
+class _Problem(object):
+    """Sparse (MI)LP assembled block by block."""
+
+    def __init__(self, n_steps):
+        self.n_steps = n_steps
+        self.lower = []
+        self.upper = []
+        self.cost = []
+        self.integer = []
+        self.rows = []
+        self.cols = []
+        self.values = []
+        self.rhs = []
+        # (equation block, variable block, coefficients, shift) per term
+        self.terms = []
+        self._windows = {}
+
+    @property
+    def n_variables(self):
+        return sum(len(lower) for lower in self.lower)
+
+    def add_variables(self, lower, upper, cost=0.0, integer=False):
+        """Add one variable per timestep and return their columns."""
+        start = self.n_variables
+        self.lower.append(np.broadcast_to(lower, self.n_steps).astype(float))
+        self.upper.append(np.broadcast_to(upper, self.n_steps).astype(float))
+        self.cost.append(np.broadcast_to(cost, self.n_steps).astype(float))
+        self.integer.append(np.full(self.n_steps, int(integer)))
+        return np.arange(start, start + self.n_steps)
+
+    def add_equations(self, terms, rhs):
+        """
+        Add one equation per timestep.
+
+        terms is a list of (columns, coefficients, shift): the coefficient
+        applies to the variable of timestep t - shift. Terms of timesteps
+        before the window must be moved to rhs by the caller.
+        """
+        start = sum(len(rhs) for rhs in self.rhs)
+        steps = np.arange(self.n_steps)
+        for columns, coefficients, shift in terms:
+            coefficients = np.broadcast_to(coefficients, self.n_steps)
+            valid = steps >= shift
+            self.rows.append(start + steps[valid])
+            self.cols.append(columns[steps[valid] - shift])
+            self.values.append(coefficients[valid])
+            self.terms.append((len(self.rhs), columns[0] // self.n_steps,
+                               coefficients.astype(float), shift))
+        self.rhs.append(np.broadcast_to(rhs, self.n_steps).astype(float))
+        self._windows = {}
+
+    def window(self, start, length, previous=None):
+        """
+        Return the arrays of the problem restricted to a window.
+
+        The window covers the timesteps start to start + length. Variable
+        block b of the window has the columns b * length to (b + 1) *
+        length, equation block e the rows e * length to (e + 1) * length.
+        previous maps variable blocks to their value before the window;
+        terms referring to it are moved to the right-hand side. The
+        matrix is in compressed sparse column (CSC) format, its pattern
+        only depends on length.
+        """
+        if length not in self._windows:
+            self._windows[length] = self._window_pattern(length)
+        pattern = self._windows[length]
+        stacked = pattern["stacked"]
+        steps = slice(start, start + length)
+
+        rhs = stacked["rhs"][:, steps].copy()
+        for equation, block, coefficients, shift in self.terms:
+            if previous is None or block not in previous:
+                continue
+            for step in range(min(shift, length)):
+                rhs[equation, step] -= (coefficients[start + step]
+                                        * previous[block])
+
+        return {
+            "length": length,
+            "cost": stacked["cost"][:, steps].ravel(),
+            "lower": stacked["lower"][:, steps].ravel(),
+            "upper": stacked["upper"][:, steps].ravel(),
+            "integer": stacked["integer"][:, steps].ravel(),
+            "rhs": rhs.ravel(),
+            "start": pattern["start"],
+            "index": pattern["index"],
+            "values": stacked["coefficients"][
+                pattern["term"], start + pattern["step"]],
+        }
+
+    def _window_pattern(self, length):
+        """Return the CSC pattern of a window with length timesteps."""
+        if self._windows:
+            stacked = next(iter(self._windows.values()))["stacked"]
+        else:
+            stacked = {
+                "cost": np.vstack(self.cost),
+                "lower": np.vstack(self.lower),
+                "upper": np.vstack(self.upper),
+                "integer": np.vstack(self.integer),
+                "rhs": np.vstack(self.rhs),
+                "coefficients": np.vstack(
+                    [coefficients for _, _, coefficients, _ in self.terms]),
+            }
+
+        rows, cols, terms, steps = [], [], [], []
+        for term, (equation, block, _, shift) in enumerate(self.terms):
+            step = np.arange(shift, length)
+            rows.append(equation * length + step)
+            cols.append(block * length + step - shift)
+            terms.append(np.full(len(step), term))
+            steps.append(step)
+        rows = np.concatenate(rows)
+        cols = np.concatenate(cols)
+        order = np.lexsort((rows, cols))
+        n_columns = len(self.lower) * length
+
+        return {
+            "stacked": stacked,
+            "start": np.searchsorted(cols[order], np.arange(n_columns + 1)),
+            "index": rows[order],
+            "term": np.concatenate(terms)[order],
+            "step": np.concatenate(steps)[order],
+        }
+
+    def solve(self, time_limit=None, mip_rel_gap=None):
+        from scipy.optimize import Bounds, LinearConstraint, milp
+        from scipy.sparse import csr_array
+
+        rhs = np.concatenate(self.rhs)
+        matrix = csr_array(
+            (np.concatenate(self.values),
+             (np.concatenate(self.rows), np.concatenate(self.cols))),
+            shape=(len(rhs), self.n_variables),
+        )
+        options = {}
+        if time_limit is not None:
+            options["time_limit"] = time_limit
+        if mip_rel_gap is not None:
+            options["mip_rel_gap"] = mip_rel_gap
+
+        return milp(
+            c=np.concatenate(self.cost),
+            constraints=LinearConstraint(matrix, rhs, rhs),
+            integrality=np.concatenate(self.integer),
+            bounds=Bounds(np.concatenate(self.lower),
+                          np.concatenate(self.upper)),
+            options=options,
+        )
+
+
+class OptimalDispatch(object):
+    """
+    Optimal dispatch of a virtual power plant over a horizon.
+
+    Parameters
+    ----------
+    virtual_power_plant : VirtualPowerPlant
+        The VPP with prepared timeseries of its non-controllable components.
+    target_data : list of tuples or pandas.Series
+        Target balance in kW (positive for generation) by timestamp, see
+        Operator.
+    heat_storage : dict, optional
+        Name of the ThermalEnergyStorage of every heat generator (HeatPump,
+        CombinedHeatAndPower, HeatingRod). If the VPP holds exactly one
+        thermal energy storage, all heat generators are coupled to it by
+        default. Uncoupled heat generators follow their thermal demand.
+    curtailment : bool, optional
+        Whether photovoltaic and wind power may be curtailed (default:
+        True).
+    integer : bool, optional
+        If True, heat pumps and CHP plants are on/off units (MILP).
+        Otherwise they modulate continuously (LP, default). The MILP is
+        much harder; use it with a short horizon, a time_limit or a
+        mip_rel_gap.
+    horizon : int, optional
+        Number of timesteps per rolling window. None solves the whole
+        horizon at once.
+    lookahead : int, optional
+        Additional timesteps optimized with every window but not committed
+        (default: 0).
+    time_limit : float, optional
+        Time limit per window in seconds.
+    mip_rel_gap : float, optional
+        Relative MIP gap of the integer problem.
+
+    Attributes
+    ----------
+    results : pandas.DataFrame
+        Result of the last solve.
+    status : list of str
+        Solver message of every window of the last solve.
+
+    Notes
+    -----
+    The thermal energy storage follows the model of
+    ThermalEnergyStorage.operate_storage: its temperature changes by
+    (heat production - demand) * 1000 * timestep / (mass * cp) and
+    efficiency_per_timestep is applied to the absolute temperature. A
+    storage shared by several heat generators serves the thermal demand of
+    the first one. Thermal demand or vehicle energy that cannot be
+    covered is reported as "unserved" and heavily penalized.
+    """
+
+    deviation_cost = 1.0
+    curtailment_cost = 1e-3
+    throughput_cost = 1e-4
+    unserved_cost = 1e3
+
+    def __init__(
+        self,
+        virtual_power_plant,
+        target_data,
+        heat_storage=None,
+        curtailment=True,
+        integer=False,
+        horizon=None,
+        lookahead=0,
+        time_limit=None,
+        mip_rel_gap=None,
+    ):
+        self.virtual_power_plant = virtual_power_plant
+        if isinstance(target_data, pd.Series):
+            target = target_data.astype(float)
+        else:
+            target = pd.Series(
+                [value for _, value in target_data],
+                index=[timestamp for timestamp, _ in target_data],
+                dtype=float,
+            )
+        target.index = pd.DatetimeIndex(target.index)
+        self.target = target
+        if len(target) > 1:
+            self.timestep = (
+                pd.Series(target.index).diff().median().total_seconds() / 3600
+            )
+        else:
+            self.timestep = 0.25
+
+        components = virtual_power_plant.components
+        storages = [name for name, component in components.items()
+                    if isinstance(component, ThermalEnergyStorage)]
+        generators = [name for name, component in components.items()
+                      if isinstance(component, (HeatPump, CombinedHeatAndPower,
+                                                HeatingRod))]
+        if heat_storage is None:
+            heat_storage = (
+                dict.fromkeys(generators, storages[0])
+                if len(storages) == 1 else {}
+            )
+        for generator, storage in heat_storage.items():
+            if storage not in storages:
+                raise ValueError(
+                    storage + " is not a ThermalEnergyStorage of the VPP"
+                )
+        self.heat_storage = dict(heat_storage)
+
+        self.curtailment = curtailment
+        self.integer = integer
+        if horizon is not None and horizon < 1:
+            raise ValueError("horizon must be at least 1")
+        self.horizon = horizon
+        self.lookahead = lookahead
+        self.time_limit = time_limit
+        self.mip_rel_gap = mip_rel_gap
+
+        self.results = None
+        self.status = []
+
+    # %% model
+    def _initial_state(self):
+        """Return the storage levels at the start of the horizon."""
+        state = {}
+        for name, component in self.virtual_power_plant.components.items():
+            if isinstance(component, ElectricalEnergyStorage):
+                state[name] = float(component.state_of_charge)
+            elif isinstance(component, BatteryElectricVehicle):
+                state[name] = float(component.battery_max)
+            elif isinstance(component, ThermalEnergyStorage):
+                state[name] = float(component.current_temperature) + 273.15
+        return state
+
+    def _build(self, index, state):
+        """Build the problem of one window."""
+        n = len(index)
+        dt = self.timestep
+        problem = _Problem(n)
+        components = self.virtual_power_plant.components
+        balance = []  # (columns, coefficient) of the power balance
+        fixed = np.zeros(n)
+        layout = {}
+        heat = {}  # heat terms by storage / uncoupled generator
+
+        for name, component in components.items():
+            if isinstance(component, (Photovoltaic, WindPower)):
+                available = component.values_for_timestamps(index)
+                if np.isnan(available).any():
+                    raise ValueError(
+                        "The timeseries of " + name + " contains NaN!")
+                if self.curtailment:
+                    # negative values (e.g. inverter night consumption)
+                    # cannot be curtailed
+                    power = problem.add_variables(
+                        np.minimum(available, 0.0), available,
+                        cost=-self.curtailment_cost * dt)
+                    balance.append((power, 1.0))
+                    layout[name] = ("curtailable", power, available)
+                else:
+                    fixed += available
+                    layout[name] = ("fixed", available)
+
+            elif isinstance(component, ElectricalEnergyStorage):
+                charge = problem.add_variables(
+                    0.0, component.max_power, cost=self.throughput_cost * dt)
+                discharge = problem.add_variables(
+                    0.0, component.max_power, cost=self.throughput_cost * dt)
+                level = problem.add_variables(0.0, component.capacity)
+                rhs = np.zeros(n)
+                rhs[0] = state[name]
+                problem.add_equations(
+                    [(level, 1.0, 0), (level, -1.0, 1),
+                     (charge, -component.charge_efficiency * dt, 0),
+                     (discharge, dt / component.discharge_efficiency, 0)],
+                    rhs,
+                )
+                balance += [(discharge, 1.0), (charge, -1.0)]
+                layout[name] = ("storage", charge, discharge, level)
+
+            elif isinstance(component, BatteryElectricVehicle):
+                at_home = component.timeseries["at_home"].reindex(index)
+                at_home = at_home.fillna(0).to_numpy(dtype=float)
+                power = problem.add_variables(
+                    0.0, component.charging_power * at_home)
+                level = problem.add_variables(
+                    component.battery_min, component.battery_max)
+                unserved = problem.add_variables(
+                    0.0, np.inf, cost=self.unserved_cost)
+                rhs = -component.battery_usage * dt * (1 - at_home)
+                rhs[0] += state[name]
+                problem.add_equations(
+                    [(level, 1.0, 0), (level, -1.0, 1),
+                     (power, -component.charge_efficiency * dt, 0),
+                     (unserved, -1.0, 0)],
+                    rhs,
+                )
+                balance.append((power, -1.0))
+                layout[name] = ("vehicle", power, level, unserved)
+
+            elif isinstance(component, (HeatPump, CombinedHeatAndPower,
+                                        HeatingRod)):
+                if isinstance(component, HeatPump):
+                    temperature = (
+                        component.environment.mean_temp_quarter_hours
+                        .temperature.reindex(index).interpolate()
+                        .bfill().ffill().to_numpy(dtype=float)
+                    )
+                    heat_per_unit = (component.el_power
+                                     * component.get_current_cop(temperature))
+                    el_per_unit = -component.el_power
+                elif isinstance(component, CombinedHeatAndPower):
+                    heat_per_unit = component.th_power
+                    el_per_unit = component.el_power
+                else:
+                    heat_per_unit = component.el_power * component.efficiency
+                    el_per_unit = -component.el_power
+                integer = self.integer and not isinstance(component,
+                                                          HeatingRod)
+                limit = getattr(component, "limit", 1.0)
+                # share of the rated power the unit is operated with
+                unit = problem.add_variables(
+                    0.0, 1.0 if integer else limit, integer=integer)
+                balance.append((unit, el_per_unit))
+                layout[name] = ("heat", unit, el_per_unit)
+                heat.setdefault(self.heat_storage.get(name, name), []).append(
+                    (name, unit, heat_per_unit))
+
+        # thermal balance of every storage and uncoupled generator
+        for key, generators in heat.items():
+            first = components[generators[0][0]]
+            demand = (
+                first.thermal_energy_demand["thermal_energy_demand"]
+                .reindex(index).to_numpy(dtype=float)
+            )
+            if np.isnan(demand).any():
+                raise ValueError(
+                    "The thermal energy demand of " + generators[0][0]
+                    + " contains NaN!")
+            unserved = problem.add_variables(
+                0.0, np.inf, cost=self.unserved_cost * dt)
+
+            if key in components and isinstance(components[key],
+                                                ThermalEnergyStorage):
+                storage = components[key]
+                efficiency = storage.efficiency_per_timestep
+                factor = efficiency * 1000 * dt / (storage.mass * storage.cp)
+                level = problem.add_variables(
+                    storage.min_temperature + 273.15,
+                    storage.target_temperature + storage.hysteresis + 273.15,
+                )
+                rhs = -factor * demand
+                rhs[0] += efficiency * state[key]
+                terms = [(level, 1.0, 0), (level, -efficiency, 1),
+                         (unserved, -factor, 0)]
+                terms += [(unit, -factor * np.asarray(heat_per_unit), 0)
+                          for _, unit, heat_per_unit in generators]
+                problem.add_equations(terms, rhs)
+                layout[key] = ("thermal_storage", level, unserved)
+            else:
+                terms = [(unserved, 1.0, 0)]
+                terms += [(unit, np.asarray(heat_per_unit), 0)
+                          for _, unit, heat_per_unit in generators]
+                problem.add_equations(terms, demand)
+                layout[key + "_heat"] = ("heat_demand", unserved)
+
+        # remaining components are fixed consumption profiles
+        for name, component in components.items():
+            if name in layout or isinstance(component, ThermalEnergyStorage):
+                continue
+            values = component.values_for_timestamps(index)
+            fixed -= values
+            layout[name] = ("fixed", -values)
+
+        # balance - target = surplus - deficit
+        surplus = problem.add_variables(0.0, np.inf,
+                                        cost=self.deviation_cost * dt)
+        deficit = problem.add_variables(0.0, np.inf,
+                                        cost=self.deviation_cost * dt)
+        problem.add_equations(
+            [(columns, coefficient, 0) for columns, coefficient in balance]
+            + [(surplus, -1.0, 0), (deficit, 1.0, 0)],
+            self.target.reindex(index).to_numpy(dtype=float) - fixed,
+        )
+        layout["_fixed"] = fixed
+
+        return problem, layout
+
+    def _extract(self, index, solution, layout):
+        """Return the results of one window as DataFrame."""
+        results = {}
+        balance = layout["_fixed"].copy()
+        for name, entry in layout.items():
+            kind = entry[0] if isinstance(entry, tuple) else None
+            if kind == "curtailable":
+                power = solution[entry[1]]
+                results[name] = power
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    results[name + "_limit"] = np.where(
+                        entry[2] > 0, power / entry[2], 1.0)
+                balance += power
+            elif kind == "fixed":
+                results[name] = entry[1]
+            elif kind == "storage":
+                power = solution[entry[2]] - solution[entry[1]]
+                results[name] = power
+                results[name + "_state_of_charge"] = solution[entry[3]]
+                balance += power
+            elif kind == "vehicle":
+                results[name] = -solution[entry[1]]
+                results[name + "_battery"] = solution[entry[2]]
+                results[name + "_unserved"] = solution[entry[3]]
+                balance -= solution[entry[1]]
+            elif kind == "heat":
+                power = solution[entry[1]] * entry[2]
+                results[name] = power
+                results[name + "_load"] = solution[entry[1]]
+                balance += power
+            elif kind == "thermal_storage":
+                results[name + "_temperature"] = solution[entry[1]] - 273.15
+                results[name + "_unserved"] = solution[entry[2]]
+            elif kind == "heat_demand":
+                results[name + "_unserved"] = solution[entry[1]]
+
+        target = self.target.reindex(index).to_numpy(dtype=float)
+        results["balance"] = balance
+        results["target"] = target
+        results["deviation"] = balance - target
+
+        return pd.DataFrame(results, index=index)
+
+    def _window_state(self, frame, state):
+        """Return the storage levels at the end of a window."""
+        state = dict(state)
+        last = frame.iloc[-1]
+        for name in state:
+            component = self.virtual_power_plant.components[name]
+            if isinstance(component, ElectricalEnergyStorage):
+                state[name] = last[name + "_state_of_charge"]
+            elif isinstance(component, BatteryElectricVehicle):
+                state[name] = last[name + "_battery"]
+            elif isinstance(component, ThermalEnergyStorage) and (
+                name + "_temperature" in frame
+            ):
+                state[name] = last[name + "_temperature"] + 273.15
+        return state
+
+    # %% solve
+    def solve(self):
+        """
+        Solve the dispatch problem.
+
+        With a horizon, the problem is solved window by window: every
+        window optimizes horizon + lookahead timesteps, commits the first
+        horizon timesteps and passes the storage levels at their end to the
+        next window.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per timestep with the power of every component (kW,
+            positive for generation), "<pv/wind>_limit", storage levels
+            ("<name>_state_of_charge" in kWh, "<bev>_battery" in kWh,
+            "<tes>_temperature" in degree Celsius), unserved energy,
+            "balance", "target" and "deviation".
+
+        Raises
+        ------
+        ValueError
+            If a window cannot be solved.
+        """
+        index = self.target.index
+        horizon = len(index) if self.horizon is None else self.horizon
+        state = self._initial_state()
+        frames = []
+        self.status = []
+
+        for start in range(0, len(index), horizon):
+            window = index[start:start + horizon + self.lookahead]
+            problem, layout = self._build(window, state)
+            result = problem.solve(self.time_limit, self.mip_rel_gap)
+            self.status.append(result.message)
+            if result.x is None:
+                raise ValueError(
+                    "The dispatch of the window starting at "
+                    + str(window[0]) + " failed: " + result.message
+                )
+            frame = self._extract(window, result.x, layout)
+            frame = frame.iloc[:horizon]
+            state = self._window_state(frame, state)
+            frames.append(frame)
+
+        self.results = pd.concat(frames)
+        return self.results
@@ -11,16 +11,11 @@ for preparing time series data, limiting power output, and retrieving observatio
 
 from vpplib.component import Component
 
+import numpy as np
 import pandas as pd
 import random
 
-# pvlib imports
-import pvlib
-
-from pvlib.pvsystem import PVSystem
-from pvlib.location import Location
-from pvlib.modelchain import ModelChain
-from pvlib.temperature import TEMPERATURE_MODEL_PARAMETERS
+# pvlib is imported on first use inside the methods
 
 
 class Photovoltaic(Component):
@@ -45,6 +40,10 @@ class Photovoltaic(Component):
         Selected module specifications.
     inverter : pandas.Series
         Selected inverter specifications.
+    latitude : float
+        Latitude of the PV system.
+    longitude : float
+        Longitude of the PV system.
     location : pvlib.location.Location
         Geographic location of the PV system.
     surface_azimuth : float
@@ -57,8 +56,12 @@ class Photovoltaic(Component):
         Number of strings per inverter.
     system : pvlib.pvsystem.PVSystem
         PV system object from pvlib.
-    modelchain : pvlib.modelchain.ModelChain
-        ModelChain object for simulating the PV system.
+    modelchain : pvlib.modelchain.ModelChain or None
+        ModelChain object for simulating the PV system. None after
+        release_model_results, see get_modelchain.
+    lean : bool
+        Whether the pvlib intermediates are released after the preparation
+        of the timeseries, see release_model_results.
     peak_power : float
         Peak power of the PV system in kW.
     modules_area : float
@@ -66,7 +69,14 @@ class Photovoltaic(Component):
     timeseries : pandas.DataFrame
         Time series of power generation.
     """
-    
+
+    environment_data = ("pv_data",)
+    cache_excluded_attributes = Component.cache_excluded_attributes + (
+        "module_lib", "inverter_lib", "modelchain", "lean",
+    )
+    state_attributes = ("limit",)
+    model_attributes = ("location", "system", "modelchain")
+
     def __init__(
         self,
         unit,
@@ -84,6 +94,7 @@ class Photovoltaic(Component):
         temp_model=None,
         identifier=None,
         environment=None,
+        lean=False,
     ):
         """Initialize a Photovoltaic object.
         
@@ -119,7 +130,17 @@ class Photovoltaic(Component):
             Unique identifier for the PV system.
         environment : Environment, optional
             Environment object providing weather data.
+        lean : bool, optional
+            If True, the module and inverter libraries are released once the
+            module and inverter are chosen and the ModelChain with its
+            results once the timeseries is prepared, see
+            release_model_results (default: False).
         """
+        import pvlib
+        from pvlib.location import Location
+        from pvlib.temperature import TEMPERATURE_MODEL_PARAMETERS
+        from pvlib.pvsystem import PVSystem
+        from pvlib.modelchain import ModelChain
 
         # Call to super class
         super(Photovoltaic, self).__init__(
@@ -130,6 +151,8 @@ class Photovoltaic(Component):
         self.identifier = identifier
 
         self.limit = 1.0
+        self.lean = lean
+        self.modelchain = None
 
         # load some module and inverter specifications
         self.module_lib = pvlib.pvsystem.retrieve_sam(module_lib)
@@ -143,6 +166,8 @@ class Photovoltaic(Component):
         if inverter:
             self.inverter = self.inverter_lib[inverter]
 
+        self.latitude = latitude
+        self.longitude = longitude
         self.location = Location(
             latitude=latitude,
             longitude=longitude,
@@ -182,6 +207,9 @@ class Photovoltaic(Component):
                                  * self.modules_per_string
                                  * self.strings_per_inverter)
 
+            if self.lean:
+                self.release_model_results()
+
         self.timeseries = None
 
     def prepare_time_series(self):
@@ -202,33 +230,121 @@ class Photovoltaic(Component):
         ValueError
             If the environment's PV data is empty.
         """
+        results = self.__run_modelchain()
+
+        timeseries = pd.DataFrame(results.ac / 1000)  # convert to kW
+        timeseries.rename(columns={0: self.identifier}, inplace=True)
+        timeseries.set_index(timeseries.index, inplace=True)
+        timeseries.index = pd.to_datetime(timeseries.index)
+
+        self.timeseries = timeseries
+        self.timeseries = self.timeseries.fillna(0)
+
+        if self.lean:
+            self.release_model_results()
+
+        return timeseries
+
+    def __run_modelchain(self):
+        """Run the ModelChain on the weather of the simulation period."""
         if len(self.environment.pv_data) == 0:
             raise ValueError("self.environment.pv_data is empty.")
 
+        modelchain = self.get_modelchain()
         if 'poa_global' in self.environment.pv_data.columns:
             
-            self.modelchain.run_model_from_poa(
+            modelchain.run_model_from_poa(
                 data=self.environment.pv_data.loc[
                     self.environment.start: self.environment.end
                 ],
             )
         else:
-            self.modelchain.run_model(
+            modelchain.run_model(
                 weather=self.environment.pv_data.loc[
                     self.environment.start: self.environment.end
                 ],
             )
 
-        timeseries = pd.DataFrame(
-            self.modelchain.results.ac / 1000)  # convert to kW
-        timeseries.rename(columns={0: self.identifier}, inplace=True)
-        timeseries.set_index(timeseries.index, inplace=True)
-        timeseries.index = pd.to_datetime(timeseries.index)
+        return modelchain.results
 
-        self.timeseries = timeseries
-        self.timeseries = self.timeseries.fillna(0)
+    def get_modelchain(self):
+        """Return the pvlib ModelChain of the PV system.
 
-        return timeseries
+        A new ModelChain is created if it has been released.
+
+        Returns
+        -------
+        pvlib.modelchain.ModelChain
+        """
+        if self.modelchain is None:
+            from pvlib.modelchain import ModelChain
+
+            self.modelchain = ModelChain(
+                self.system, self.location, name=self.identifier
+            )
+
+        return self.modelchain
+
+    def rebuild_model(self):
+        """Rebuild the pvlib Location, PVSystem and ModelChain.
+
+        They are created from latitude, longitude, module, inverter and the
+        array parameters like in __init__. In lean mode the ModelChain is
+        left released.
+        """
+        from pvlib.location import Location
+        from pvlib.pvsystem import PVSystem
+
+        self.location = Location(
+            latitude=self.latitude,
+            longitude=self.longitude,
+        )
+
+        if "system" in self.__dict__:
+            self.system = PVSystem(
+                surface_tilt=self.surface_tilt,
+                surface_azimuth=self.surface_azimuth,
+                module_parameters=self.module,
+                inverter_parameters=self.inverter,
+                temperature_model_parameters=self.temperature_model_parameters,
+                modules_per_string=self.modules_per_string,
+                strings_per_inverter=self.strings_per_inverter,
+            )
+
+            self.modelchain = None
+            if not self.lean:
+                self.get_modelchain()
+
+    def release_model_results(self):
+        """Release the pvlib intermediates of the PV system.
+
+        The ModelChain with its results (irradiance, cell temperature, DC
+        and AC power) and the module and inverter libraries are dropped.
+        module, inverter, peak_power, modules_area and the timeseries are
+        kept, which is all the operation and the exports need. The results
+        can be recomputed with model_results.
+        """
+        self.modelchain = None
+        self.module_lib = None
+        self.inverter_lib = None
+
+    def model_results(self):
+        """Recompute the pvlib results of the simulation period.
+
+        The timeseries is not changed. In lean mode the ModelChain is
+        released again afterwards.
+
+        Returns
+        -------
+        pvlib.modelchain.ModelChainResult
+            Results of the ModelChain, e.g. total_irrad, cell_temperature,
+            dc and ac.
+        """
+        results = self.__run_modelchain()
+        if self.lean:
+            self.modelchain = None
+
+        return results
 
     def reset_time_series(self):
         """Reset the time series data for the photovoltaic system.
@@ -302,6 +418,8 @@ class Photovoltaic(Component):
         ValueError
             If the timestamp is not of type int or str.
         """
+        if self.stream is not None:
+            return self.stream.value(timestamp, self.identifier) * self.limit
         if type(timestamp) == int:
             return (
                 self.timeseries[self.identifier].iloc[timestamp] * self.limit
@@ -314,6 +432,65 @@ class Photovoltaic(Component):
                 + "Stringformat: YYYY-MM-DD hh:mm:ss"
             )
 
+    def values_for_timestamps(self, timestamps):
+        """
+        Returns the values for several timestamps at once.
+
+        Vectorized equivalent of value_for_timestamp.
+
+        Parameters
+        ----------
+        timestamps : pandas.DatetimeIndex
+            Timestamps of the timeseries.
+
+        Returns
+        -------
+        numpy.ndarray
+            Power output in kW.
+        """
+        if self.stream is not None:
+            return self.stream.values(timestamps, self.identifier) * self.limit
+        values = self.timeseries[self.identifier].reindex(timestamps)
+        return values.to_numpy(dtype=float) * self.limit
+
+    def step(self, timestamp, data):
+        """Calculate the power output of one timestep in streaming operation.
+
+        Parameters
+        ----------
+        timestamp : str or datetime
+            The timestamp of the timestep.
+        data : dict or pandas.Series
+            A measured power output in kW under the identifier or the
+            weather of the timestep with the columns of
+            environment.pv_data (e.g. ghi, dni, dhi, temp_air, wind_speed
+            or poa_global).
+
+        Returns
+        -------
+        dict or None
+            The power output in kW under the identifier, None if data holds
+            neither a measurement nor weather data.
+        """
+        if self.identifier in data:
+            return {self.identifier: float(data[self.identifier])}
+
+        index = pd.DatetimeIndex([pd.Timestamp(timestamp)])
+        tz = getattr(self.environment.pv_data.index, "tz", None)
+        if tz is not None and index.tz is None:
+            index = index.tz_localize(tz)
+        weather = pd.DataFrame([dict(data)], index=index)
+        modelchain = self.get_modelchain()
+        if "poa_global" in weather.columns:
+            modelchain.run_model_from_poa(data=weather)
+        elif "ghi" in weather.columns:
+            modelchain.run_model(weather=weather)
+        else:
+            return None
+
+        ac = float(np.asarray(modelchain.results.ac)[0]) / 1000
+        return {self.identifier: 0.0 if np.isnan(ac) else ac}
+
     def observations_for_timestamp(self, timestamp):
         """Get observations for the photovoltaic system at a specific timestamp.
         
@@ -385,6 +562,15 @@ class Photovoltaic(Component):
             - module (pandas.Series): Selected module specifications
             - inverter (pandas.Series): Selected inverter specifications
         """
+        from pvlib.pvsystem import PVSystem
+        from pvlib.modelchain import ModelChain
+
+        if self.module_lib is None or self.inverter_lib is None:
+            raise ValueError(
+                "The module and inverter libraries have been released, "
+                "see release_model_results"
+            )
+
         power_lst = []
         # choose modules depending on module power
         for module in self.module_lib.columns:
@@ -469,6 +655,9 @@ class Photovoltaic(Component):
                              * self.modules_per_string
                              * self.strings_per_inverter)
 
+        if self.lean:
+            self.release_model_results()
+
         return (self.modules_per_string,
                 self.strings_per_inverter,
                 self.module,
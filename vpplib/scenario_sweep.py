@@ -0,0 +1,454 @@
+# -*- coding: utf-8 -*-
+"""
+Scenario Sweep Module
+---------------------
+This module contains the ScenarioSweep class, which runs Monte-Carlo sweeps
+over the penetration levels of pv, storage, electric vehicles, heat pumps
+and wind in a pandapower grid.
+
+Every scenario places the components randomly (see
+VirtualPowerPlant.get_buses_with_components), runs
+Operator.run_base_scenario and reduces the power flow results to a few
+summary statistics. The components are copies of prepared template
+components, so their timeseries are calculated once for the whole sweep.
+Scenarios run in a process pool and their summaries are appended to a JSON
+lines file, from which an interrupted sweep resumes. The results are tagged
+with a fingerprint of the sweep configuration, so sweeps on other grids or
+with other templates sharing the file do not resume from them.
+"""
+
+import copy
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import time
+import traceback
+
+import numpy as np
+import pandas as pd
+
+from vpplib.operator import Operator
+from vpplib.virtual_power_plant import VirtualPowerPlant
+
+_worker_sweep = None
+
+
+def _init_worker(sweep):
+    global _worker_sweep
+    _worker_sweep = sweep
+
+
+def _run_worker(scenario):
+    return _worker_sweep.run_scenario_safe(scenario)
+
+
+class ScenarioSweep(object):
+    """
+    Monte-Carlo sweep over VPP penetration levels.
+
+    Parameters
+    ----------
+    net : pandapower.pandapowerNet
+        The grid. Its loads are used as baseloads and named
+        "<bus name>_baseload" like in test_base_scenario.py.
+    templates : dict
+        Prepared template components per technology. Keys are "pv", "hp",
+        "bev", "wind" and "storage", values a component or a list of
+        components to choose from randomly. Placed components are shallow
+        copies sharing the timeseries of their template; storages get an
+        empty timeseries of their own.
+    baseload : pandas.DataFrame
+        Baseload in W with one column per bus index (as str), see
+        Operator.run_base_scenario.
+    parameter_grid : dict
+        Lists of values for pv_percentage, hp_percentage, bev_percentage,
+        wind_percentage and storage_percentage. Every combination is one
+        scenario per seed; missing percentages are 0.
+    seeds : iterable of int, optional
+        Seeds of the random placement (default: (0,)).
+    method : str, optional
+        Placement method, see get_buses_with_components
+        (default: "random_loadbus").
+    store : str, optional
+        JSON lines file of the results, which may be shared by several
+        sweeps, see sweep_id (default: "./Results/sweep.jsonl").
+    processes : int, optional
+        Number of worker processes. None uses all cores, 1 runs the
+        scenarios in the calling process.
+
+    Attributes
+    ----------
+    scenarios : list of dict
+        All scenarios of the sweep.
+    sweep_id : str
+        Fingerprint of the grid, the templates (their parameters and
+        timeseries), the baseload and the method. Stored with every result;
+        only results with the same sweep_id are resumed from.
+    """
+
+    percentages = (
+        "pv_percentage",
+        "hp_percentage",
+        "bev_percentage",
+        "wind_percentage",
+        "storage_percentage",
+    )
+
+    def __init__(
+        self,
+        net,
+        templates,
+        baseload,
+        parameter_grid,
+        seeds=(0,),
+        method="random_loadbus",
+        store="./Results/sweep.jsonl",
+        processes=None,
+    ):
+        unknown = set(parameter_grid) - set(self.percentages)
+        if unknown:
+            raise ValueError(
+                "Unknown parameters in parameter_grid: " + str(sorted(unknown))
+            )
+        unknown = set(templates) - {"pv", "hp", "bev", "wind", "storage"}
+        if unknown:
+            raise ValueError("Unknown technologies in templates: "
+                             + str(sorted(unknown)))
+
+        self.net = copy.deepcopy(net)
+        for bus in self.net.bus.index:
+            self.net.load.loc[self.net.load.bus == bus, "name"] = (
+                self.net.bus.loc[bus, "name"] + "_baseload"
+            )
+            self.net.load.loc[self.net.load.bus == bus, "type"] = "baseload"
+
+        self.templates = {
+            technology: list(template)
+            if isinstance(template, (list, tuple)) else [template]
+            for technology, template in templates.items()
+        }
+        self.baseload = baseload
+        self.method = method
+        self.store = store
+        self.processes = processes
+        self.sweep_id = self.fingerprint()
+
+        names = [name for name in self.percentages if name in parameter_grid]
+        self.scenarios = []
+        for values in itertools.product(
+            *(parameter_grid[name] for name in names)
+        ):
+            for seed in seeds:
+                scenario = dict.fromkeys(self.percentages, 0)
+                scenario.update(zip(names, values))
+                scenario["seed"] = int(seed)
+                scenario["scenario_id"] = self.scenario_id(scenario)
+                scenario["sweep_id"] = self.sweep_id
+                self.scenarios.append(scenario)
+
+    @classmethod
+    def scenario_id(cls, scenario):
+        """Return the key of a scenario in the result store."""
+        return json.dumps(
+            [scenario[name] for name in cls.percentages + ("seed",)]
+        )
+
+    def fingerprint(self):
+        """Return the fingerprint of the sweep configuration (sweep_id)."""
+        from vpplib.timeseries_cache import fingerprint
+
+        templates = {
+            technology: [
+                (component.fingerprint(),
+                 getattr(component, "timeseries", None))
+                for component in components
+            ]
+            for technology, components in self.templates.items()
+        }
+        return fingerprint(self.net, templates, self.baseload, self.method)
+
+    # %% building and running one scenario
+    def build_scenario(self, scenario):
+        """
+        Build the virtual power plant and the grid of a scenario.
+
+        Parameters
+        ----------
+        scenario : dict
+            Percentages and seed of the scenario.
+
+        Returns
+        -------
+        tuple
+            (VirtualPowerPlant, pandapower.pandapowerNet)
+        """
+        import pandapower as pp
+
+        net = copy.deepcopy(self.net)
+        vpp = VirtualPowerPlant("sweep")
+        vpp.get_buses_with_components(
+            net,
+            method=self.method,
+            seed=scenario["seed"],
+            **{name: scenario[name] for name in self.percentages},
+        )
+        rng = np.random.default_rng(
+            np.random.SeedSequence(scenario["seed"], spawn_key=(1,))
+        )
+        bus_index = pd.Series(net.bus.index, index=net.bus.name)
+        bus_index = bus_index[~bus_index.index.duplicated()]
+
+        for technology, buses, suffix in (
+            ("pv", vpp.buses_with_pv, "_PV"),
+            ("storage", vpp.buses_with_storage, "_storage"),
+            ("bev", vpp.buses_with_bev, "_BEV"),
+            ("hp", vpp.buses_with_hp, "_HP"),
+            ("wind", vpp.buses_with_wind, "_Wind"),
+        ):
+            if len(buses) == 0:
+                continue
+            if technology not in self.templates:
+                raise ValueError("No template for " + technology)
+            templates = self.templates[technology]
+            choice = rng.integers(len(templates), size=len(buses))
+
+            for bus, i in zip(buses, choice):
+                name = bus + suffix
+                component = self._copy_component(
+                    templates[i], technology, name)
+                component.bus = bus
+                vpp.add_component(component)
+                self._create_element(
+                    pp, net, technology, component, name, bus_index[bus])
+
+        return vpp, net
+
+    @staticmethod
+    def _copy_component(template, technology, name):
+        """Return a shallow copy of template named name."""
+        component = copy.copy(template)
+        component.identifier = name
+        if technology == "pv":
+            component.timeseries = template.timeseries.rename(
+                columns={template.identifier: name}, copy=False)
+        elif technology == "storage":
+            environment = template.environment
+            component.timeseries = pd.DataFrame(
+                columns=["state_of_charge", "residual_load"],
+                index=pd.date_range(
+                    start=environment.start,
+                    end=environment.end,
+                    freq=environment.time_freq,
+                ),
+                dtype="float64",
+            )
+
+        return component
+
+    @staticmethod
+    def _create_element(pp, net, technology, component, name, bus):
+        """Create the pandapower element of a component."""
+        if technology == "pv":
+            pp.create_sgen(
+                net, bus=bus, name=name, type="PV",
+                p_mw=component.module.Impo * component.module.Vmpo / 1000000,
+            )
+        elif technology == "storage":
+            pp.create_storage(
+                net, bus=bus, name=name, type="LiIon", p_mw=0,
+                max_e_mwh=component.capacity / 1000,
+            )
+        elif technology == "bev":
+            pp.create_load(
+                net, bus=bus, name=name, type="BEV",
+                p_mw=component.charging_power / 1000,
+            )
+        elif technology == "hp":
+            pp.create_load(
+                net, bus=bus, name=name, type="HP",
+                p_mw=component.el_power / 1000,
+            )
+        elif technology == "wind":
+            pp.create_sgen(
+                net, bus=bus, name=name, type="WindPower",
+                p_mw=component.peak_power / 1000,
+            )
+
+    @staticmethod
+    def summarize(net_dict):
+        """
+        Reduce the results of run_base_scenario to summary statistics.
+
+        Parameters
+        ----------
+        net_dict : dict
+            Result of Operator.run_base_scenario.
+
+        Returns
+        -------
+        dict
+            max_line_loading_percent, min_vm_pu, max_vm_pu,
+            max_trafo_loading_percent, max_ext_grid_p_mw,
+            min_ext_grid_p_mw and the number of timesteps.
+        """
+        def extreme(table, column, function):
+            values = [
+                function(result[table][column].to_numpy(dtype=float))
+                for result in net_dict.values()
+                if result[table] is not None and len(result[table]) > 0
+            ]
+            values = [value for value in values if not math.isnan(value)]
+            if len(values) == 0:
+                return None
+            return float(function(np.asarray(values)))
+
+        return {
+            "max_line_loading_percent": extreme(
+                "res_line", "loading_percent", np.nanmax),
+            "min_vm_pu": extreme("res_bus", "vm_pu", np.nanmin),
+            "max_vm_pu": extreme("res_bus", "vm_pu", np.nanmax),
+            "max_trafo_loading_percent": extreme(
+                "res_trafo", "loading_percent", np.nanmax),
+            "max_ext_grid_p_mw": extreme("res_ext_grid", "p_mw", np.nanmax),
+            "min_ext_grid_p_mw": extreme("res_ext_grid", "p_mw", np.nanmin),
+            "timesteps": len(net_dict),
+        }
+
+    def run_scenario(self, scenario):
+        """
+        Run one scenario and return its summary.
+
+        Parameters
+        ----------
+        scenario : dict
+            Percentages and seed of the scenario.
+
+        Returns
+        -------
+        dict
+            The scenario with its summary statistics (see summarize), the
+            number of placed components and the runtime in seconds.
+        """
+        start = time.perf_counter()
+        vpp, net = self.build_scenario(scenario)
+        operator = Operator(virtual_power_plant=vpp, net=net,
+                            target_data=None)
+        net_dict = operator.run_base_scenario(self.baseload)
+
+        result = dict(scenario)
+        result.update(self.summarize(net_dict))
+        result["components"] = len(vpp.components)
+        result["seconds"] = time.perf_counter() - start
+
+        return result
+
+    def run_scenario_safe(self, scenario):
+        """Run a scenario and return the error instead of raising it."""
+        try:
+            return self.run_scenario(scenario)
+        except Exception:
+            result = dict(scenario)
+            result["error"] = traceback.format_exc(limit=5)
+            return result
+
+    # %% result store
+    def load_results(self):
+        """
+        Read the result store.
+
+        Results of other sweeps (with another sweep_id) are skipped.
+
+        Returns
+        -------
+        dict
+            Results by scenario_id. Later lines win over earlier ones.
+        """
+        results = {}
+        if not os.path.isfile(self.store):
+            return results
+        with open(self.store) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    # incomplete last line of an interrupted sweep
+                    continue
+                if result.get("sweep_id") != self.sweep_id:
+                    continue
+                results[result["scenario_id"]] = result
+
+        return results
+
+    def pending(self):
+        """Return the scenarios without successful result in the store."""
+        results = self.load_results()
+        return [
+            scenario for scenario in self.scenarios
+            if scenario["scenario_id"] not in results
+            or "error" in results[scenario["scenario_id"]]
+        ]
+
+    def run(self):
+        """
+        Run all pending scenarios and return the summaries of the sweep.
+
+        Finished scenarios are appended to the store immediately, so a
+        new run after an interruption only runs the missing scenarios.
+        Failed scenarios are stored with their traceback in the column
+        "error" and retried by the next run.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per scenario of the sweep.
+        """
+        pending = self.pending()
+        directory = os.path.dirname(self.store)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(self.store, "a+b") as store:
+            # terminate an incomplete last line of an interrupted sweep
+            if store.tell() > 0:
+                store.seek(-1, os.SEEK_END)
+                if store.read(1) != b"\n":
+                    store.write(b"\n")
+
+        with open(self.store, "a") as store:
+            if self.processes == 1 or len(pending) <= 1:
+                results = map(self.run_scenario_safe, pending)
+                self._write_results(store, results)
+            else:
+                with multiprocessing.Pool(
+                    processes=self.processes,
+                    initializer=_init_worker,
+                    initargs=(self,),
+                ) as pool:
+                    results = pool.imap_unordered(_run_worker, pending)
+                    self._write_results(store, results)
+
+        return self.results()
+
+    @staticmethod
+    def _write_results(store, results):
+        for result in results:
+            store.write(json.dumps(result) + "\n")
+            store.flush()
+
+    def results(self):
+        """Return the stored summaries of the sweep as DataFrame."""
+        results = self.load_results()
+        rows = [
+            results[scenario["scenario_id"]] for scenario in self.scenarios
+            if scenario["scenario_id"] in results
+        ]
+        df = pd.DataFrame(rows)
+        if len(df) > 0:
+            df = df.set_index("scenario_id")
+
+        return df
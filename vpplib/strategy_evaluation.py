@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Strategy Evaluation Module
+--------------------------
+This module contains the StrategyEvaluation class, which compares several
+operation strategies (subclasses of Operator) on one prepared virtual power
+plant.
+
+Every strategy starts from the same snapshot of the component states (see
+VirtualPowerPlant.get_state), so the VPP is prepared once and neither the
+weather data nor the timeseries are loaded again. In parallel runs the
+worker processes are forked where the platform allows it and share the
+prepared VPP copy-on-write.
+"""
+
+import multiprocessing
+import time
+import traceback
+
+import pandas as pd
+
+_worker_evaluation = None
+
+
+def _init_worker(evaluation):
+    global _worker_evaluation
+    _worker_evaluation = evaluation
+
+
+def _run_worker(name):
+    return _worker_evaluation.run_strategy_safe(name)
+
+
+class StrategyEvaluation(object):
+    """
+    Batch evaluation of operation strategies against one prepared VPP.
+
+    Parameters
+    ----------
+    virtual_power_plant : VirtualPowerPlant
+        The prepared virtual power plant.
+    strategies : dict
+        Operator subclasses (implementing operate_at_timestamp) by name.
+    target_data : list of tuples
+        Target data of the operators, see Operator.
+    net : pandapower.pandapowerNet, optional
+        Grid passed to the operators.
+    environment : Environment, optional
+        Environment passed to the operators.
+    metric : str, optional
+        Score metric, see Operator.score_horizon (default: "match").
+    threshold : float, optional
+        Early exit threshold for "mae" and "rmse", see
+        Operator.operate_virtual_power_plant.
+    processes : int, optional
+        Number of worker processes. None uses all cores, 1 runs the
+        strategies one after another in the calling process.
+
+    Attributes
+    ----------
+    state : dict
+        The snapshot of the component states every strategy starts from.
+    """
+
+    def __init__(
+        self,
+        virtual_power_plant,
+        strategies,
+        target_data,
+        net=None,
+        environment=None,
+        metric="match",
+        threshold=None,
+        processes=None,
+    ):
+        self.virtual_power_plant = virtual_power_plant
+        self.strategies = dict(strategies)
+        self.target_data = target_data
+        self.net = net
+        self.environment = environment
+        self.metric = metric
+        self.threshold = threshold
+        self.processes = processes
+        self.state = virtual_power_plant.get_state()
+
+    def run_strategy(self, name):
+        """
+        Run one strategy from the snapshot and return its score.
+
+        The component states are restored afterwards.
+
+        Parameters
+        ----------
+        name : str
+            Name of the strategy.
+
+        Returns
+        -------
+        dict
+            The name, the score and the runtime in seconds of the strategy.
+        """
+        start = time.perf_counter()
+        self.virtual_power_plant.set_state(self.state)
+        try:
+            operator = self.strategies[name](
+                virtual_power_plant=self.virtual_power_plant,
+                net=self.net,
+                target_data=self.target_data,
+                environment=self.environment,
+            )
+            score = operator.operate_virtual_power_plant(
+                metric=self.metric, threshold=self.threshold
+            )
+        finally:
+            self.virtual_power_plant.set_state(self.state)
+
+        return {
+            "strategy": name,
+            "score": score,
+            "seconds": time.perf_counter() - start,
+        }
+
+    def run_strategy_safe(self, name):
+        """Run a strategy and return the error instead of raising it."""
+        try:
+            return self.run_strategy(name)
+        except Exception:
+            return {
+                "strategy": name,
+                "error": traceback.format_exc(limit=5),
+            }
+
+    def run(self):
+        """
+        Run all strategies.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per strategy with its score and runtime, in the order
+            of strategies. Failed strategies have their traceback in the
+            column "error".
+        """
+        names = list(self.strategies)
+        if self.processes == 1 or len(names) <= 1:
+            results = [self.run_strategy_safe(name) for name in names]
+        else:
+            if "fork" in multiprocessing.get_all_start_methods():
+                # the workers share the prepared VPP copy-on-write
+                context = multiprocessing.get_context("fork")
+            else:
+                context = multiprocessing.get_context()
+            with context.Pool(
+                processes=self.processes,
+                initializer=_init_worker,
+                initargs=(self,),
+            ) as pool:
+                results = pool.map(_run_worker, names)
+
+        return pd.DataFrame(results).set_index("strategy")
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming Module
+----------------
+This module contains the RingBuffer class, which keeps a fixed number of
+the most recent rows of a component in streaming operation, and the
+sources read_queue and tail_csv, which provide new rows one at a time.
+
+In streaming operation (see Component.advance) the components do not hold
+a precomputed timeseries over environment.start to environment.end.
+Every new row of weather or measurement data advances each component by
+one timestep with constant work, and only the recent history is kept, so
+the memory does not grow with the operating time.
+"""
+
+import csv
+import queue
+import time
+
+import numpy as np
+import pandas as pd
+
+
+class RingBuffer(object):
+    """
+    Fixed-size history of timestamped rows.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of rows kept. Appending to a full buffer overwrites the
+        oldest row.
+    columns : list of str, optional
+        Names of the columns. By default they are taken from the keys of
+        the first appended row.
+    dtype : str or numpy.dtype, optional
+        Dtype of the values (default: "float64").
+
+    Notes
+    -----
+    append, value and latest take constant time. Timestamps are compared as
+    pandas.Timestamp, so str and datetime timestamps address the same row.
+    """
+
+    def __init__(self, capacity, columns=None, dtype="float64"):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        self.columns = None
+        self._data = None
+        self._times = np.zeros(self.capacity, dtype=np.int64)
+        self._slots = {}
+        self._size = 0
+        self._next = 0
+        if columns is not None:
+            self._allocate(columns)
+
+    def _allocate(self, columns):
+        self.columns = list(columns)
+        self._column_positions = {
+            column: position for position, column in enumerate(self.columns)
+        }
+        self._data = np.full((self.capacity, len(self.columns)), np.nan,
+                             dtype=self.dtype)
+
+    def __len__(self):
+        return self._size
+
+    def append(self, timestamp, values):
+        """
+        Append a row, overwriting the oldest row of a full buffer.
+
+        Parameters
+        ----------
+        timestamp : str or datetime
+            Timestamp of the row.
+        values : dict or sequence
+            Values by column name, or in the order of columns.
+        """
+        if self._data is None:
+            if not isinstance(values, dict):
+                raise ValueError(
+                    "The columns of the RingBuffer are unknown; append the "
+                    "first row as dict"
+                )
+            self._allocate(values)
+
+        slot = self._next
+        full = self._size == self.capacity
+        key = pd.Timestamp(timestamp).value
+        if key in self._slots and not (full and self._times[slot] == key):
+            raise ValueError(
+                "The timestamp " + str(timestamp) + " is already in the "
+                "RingBuffer"
+            )
+        if full:
+            del self._slots[self._times[slot]]
+        else:
+            self._size += 1
+
+        if isinstance(values, dict):
+            row = self._data[slot]
+            row[:] = np.nan
+            for column, value in values.items():
+                row[self._column_positions[column]] = value
+        else:
+            self._data[slot] = values
+        self._times[slot] = key
+        self._slots[key] = slot
+        self._next = (slot + 1) % self.capacity
+
+    def _slot(self, timestamp):
+        if isinstance(timestamp, (int, np.integer)):
+            # position in the history, 0 is the oldest row
+            if not -self._size <= timestamp < self._size:
+                raise IndexError("RingBuffer position out of range")
+            return (self._next - self._size + timestamp % self._size
+                    ) % self.capacity
+        return self._slots[pd.Timestamp(timestamp).value]
+
+    def value(self, timestamp, column=None):
+        """
+        Return the value of a row.
+
+        Parameters
+        ----------
+        timestamp : str, datetime or int
+            Timestamp of the row or its position in the history (0 is the
+            oldest, -1 the latest row).
+        column : str, optional
+            Name of the column. May be omitted for a single column.
+
+        Returns
+        -------
+        float
+
+        Raises
+        ------
+        KeyError
+            If the timestamp is not (or no longer) in the buffer.
+        """
+        row = self._data[self._slot(timestamp)]
+        if column is None:
+            return row.item()
+        return row[self._column_positions[column]].item()
+
+    def values(self, timestamps, column=None):
+        """Return the values of several rows as numpy.ndarray."""
+        return np.array(
+            [self.value(timestamp, column) for timestamp in timestamps],
+            dtype=float,
+        )
+
+    def latest(self, column=None):
+        """Return the value of the latest row."""
+        return self.value(-1, column)
+
+    @property
+    def last_timestamp(self):
+        """Timestamp of the latest row, None if the buffer is empty."""
+        if self._size == 0:
+            return None
+        return pd.Timestamp(self._times[(self._next - 1) % self.capacity])
+
+    def to_pandas(self):
+        """
+        Return the history as DataFrame, oldest row first.
+
+        Returns
+        -------
+        pandas.DataFrame
+        """
+        order = (np.arange(self._size) + self._next - self._size
+                 ) % self.capacity
+        if self._data is None:
+            return pd.DataFrame(index=pd.DatetimeIndex([]))
+        return pd.DataFrame(
+            self._data[order],
+            index=pd.DatetimeIndex(self._times[order]),
+            columns=self.columns,
+        )
+
+
+def read_queue(source, sentinel=None, timeout=None):
+    """
+    Yield rows from a queue until the sentinel is received.
+
+    Parameters
+    ----------
+    source : queue.Queue or multiprocessing.Queue
+        Queue of (timestamp, data) tuples, data being a dict or
+        pandas.Series of the weather and measurement values of one
+        timestep.
+    sentinel : object, optional
+        Item ending the stream (default: None).
+    timeout : float, optional
+        Seconds to wait for a row before the stream ends. None waits
+        forever.
+
+    Yields
+    ------
+    tuple
+        (timestamp, data)
+    """
+    while True:
+        try:
+            item = source.get(timeout=timeout)
+        except queue.Empty:
+            return
+        if item is sentinel:
+            return
+        yield item
+
+
+def tail_csv(path, timestamp_column=0, poll_interval=1.0, follow=True,
+             sep=","):
+    """
+    Yield the rows of a csv file, waiting for rows appended to it.
+
+    Parameters
+    ----------
+    path : str
+        Path of the csv file. The first line holds the column names.
+    timestamp_column : int or str, optional
+        Position or name of the timestamp column (default: 0).
+    poll_interval : float, optional
+        Seconds between two checks for new rows (default: 1.0).
+    follow : bool, optional
+        If False, the stream ends at the end of the file instead of
+        waiting for new rows (default: True).
+    sep : str, optional
+        Delimiter of the file (default: ",").
+
+    Yields
+    ------
+    tuple
+        (timestamp, data) with data a dict of the other columns. Values are
+        converted to float where possible.
+    """
+    with open(path, newline="") as file:
+        header = None
+        pending = ""
+        while True:
+            line = file.readline()
+            if not line or not line.endswith("\n"):
+                # incomplete last line: wait until it has been written
+                pending += line
+                if not follow:
+                    if not pending:
+                        return
+                    line, pending = pending, ""
+                else:
+                    time.sleep(poll_interval)
+                    continue
+            else:
+                line, pending = pending + line, ""
+            if not line.strip():
+                continue
+
+            fields = next(csv.reader([line], delimiter=sep))
+            if header is None:
+                header = fields
+                if not isinstance(timestamp_column, int):
+                    timestamp_column = header.index(timestamp_column)
+                continue
+
+            data = {}
+            for position, (name, field) in enumerate(zip(header, fields)):
+                if position == timestamp_column:
+                    continue
+                try:
+                    data[name] = float(field)
+                except ValueError:
+                    data[name] = field
+            yield fields[timestamp_column], data
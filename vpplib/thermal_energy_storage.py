@@ -49,6 +49,11 @@ class ThermalEnergyStorage(Component):
     timeseries : pandas.DataFrame
         Time series of storage temperature for the simulation period
     """
+
+    state_attributes = (
+        "current_temperature", "state_of_charge", "needs_loading",
+        "timeseries",
+    )
     
     def __init__(
         self,
@@ -105,6 +110,7 @@ class ThermalEnergyStorage(Component):
         self.min_temperature = min_temperature
         self.timeseries = pd.DataFrame(
             columns=["temperature"],
+            dtype="float64",
             index=pd.date_range(
                 start=self.environment.start,
                 end=self.environment.end,
@@ -156,7 +162,11 @@ class ThermalEnergyStorage(Component):
         4. Calculate the new temperature
         5. Log the temperature in the timeseries
         6. Log the generator's operation
+
+        A compact or spilled timeseries is expanded first, see
+        Component.expand_time_series.
         """
+        self.expand_time_series()
         if self.get_needs_loading():
             thermal_energy_generator.ramp_up(timestamp)
         else:
@@ -189,7 +199,9 @@ class ThermalEnergyStorage(Component):
         else:
             el_load = 0
 
-        self.timeseries.loc[timestamp, "temperature"] = self.current_temperature
+        self.set_timeseries_value(
+            timestamp, "temperature", self.current_temperature
+        )
 
         # log timeseries of thermal_energy_generator_class:
         thermal_energy_generator.log_observation(observation, timestamp)
@@ -318,6 +330,7 @@ class ThermalEnergyStorage(Component):
         """
         self.timeseries = pd.DataFrame(
             columns=["temperature"],
+            dtype="float64",
             index=pd.date_range(
                 start=self.environment.start,
                 end=self.environment.end,
@@ -341,6 +354,7 @@ class ThermalEnergyStorage(Component):
         """
         self.timeseries = pd.DataFrame(
             columns=["temperature"],
+            dtype="float64",
             index=pd.date_range(
                 start=self.environment.start,
                 end=self.environment.end,
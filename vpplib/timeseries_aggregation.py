@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Timeseries Aggregation Module
+-----------------------------
+This module contains the TimeseriesAggregation class, which clusters the
+periods (e.g. days) of a timeseries into a few representative periods.
+
+Long studies often contain many near-identical days. Simulating only the
+representative periods and expanding the results back to the full index
+with the period mapping reduces the number of power flows by the ratio of
+periods to representatives.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class TimeseriesAggregation(object):
+    """
+    Representative periods of a timeseries.
+
+    Parameters
+    ----------
+    n_periods : int
+        Number of representative periods.
+    period : str, optional
+        Length of a period as fixed pandas frequency, e.g. "1D" or "12h"
+        (default: "1D").
+    method : str, optional
+        "hierarchical" (Ward linkage) or "kmedoids" (default:
+        "hierarchical"). Both use the medoid, an actual period of the
+        timeseries, as representative.
+    seed : int, optional
+        Seed of the k-medoids initialization (default: 0).
+    max_iter : int, optional
+        Maximum number of k-medoids iterations (default: 100).
+
+    Attributes
+    ----------
+    labels : pandas.Series
+        Start of the representative period of every period, indexed by the
+        start of the period.
+    weights : pandas.Series
+        Number of periods represented by every representative period,
+        indexed by its start.
+    mapping : pandas.Series
+        Representative timestep of every timestep of the timeseries.
+    representatives : pandas.DatetimeIndex
+        All timesteps of the representative periods.
+
+    Notes
+    -----
+    Periods with a different number of timesteps than the majority (e.g. a
+    partial last day or a day with a DST change) are not clustered; they
+    are kept as representatives of themselves.
+    """
+
+    def __init__(self, n_periods, period="1D", method="hierarchical", seed=0,
+                 max_iter=100):
+        if method not in ("hierarchical", "kmedoids"):
+            raise ValueError(
+                "method must be 'hierarchical' or 'kmedoids', not "
+                + repr(method)
+            )
+        if n_periods < 1:
+            raise ValueError("n_periods must be at least 1")
+        self.n_periods = int(n_periods)
+        self.period = period
+        self.method = method
+        self.seed = seed
+        self.max_iter = max_iter
+
+        self.labels = None
+        self.weights = None
+        self.mapping = None
+        self.representatives = None
+
+    def fit(self, profiles):
+        """
+        Cluster the periods of profiles.
+
+        Parameters
+        ----------
+        profiles : pandas.DataFrame or pandas.Series
+            Profiles with a DatetimeIndex, e.g. the aggregated generation,
+            demand and baseload. Every column is standardized, so the
+            profiles are weighted equally.
+
+        Returns
+        -------
+        TimeseriesAggregation
+            self
+        """
+        if isinstance(profiles, pd.Series):
+            profiles = profiles.to_frame()
+        values = profiles.to_numpy(dtype=float)
+        if np.isnan(values).any():
+            raise ValueError("The profiles contain NaN!")
+        std = values.std(axis=0)
+        values = (values - values.mean(axis=0)) / np.where(std > 0, std, 1.0)
+
+        index = profiles.index
+        starts = index.floor(self.period)
+        period_of_step, period_starts = pd.factorize(starts, sort=True)
+        lengths = np.bincount(period_of_step)
+        length = np.bincount(lengths).argmax()
+        complete = np.flatnonzero(lengths == length)
+
+        # one row of features per complete period
+        order = np.argsort(period_of_step, kind="stable")
+        first = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        offsets = np.empty(len(index), dtype=np.int64)
+        offsets[order] = np.arange(len(index)) - np.repeat(first, lengths)
+        rows = np.full(len(period_starts), -1, dtype=np.int64)
+        rows[complete] = np.arange(len(complete))
+        features = np.empty((len(complete), length, values.shape[1]))
+        in_complete = rows[period_of_step] >= 0
+        features[rows[period_of_step[in_complete]],
+                 offsets[in_complete]] = values[in_complete]
+        features = features.reshape(len(complete), -1)
+
+        medoid_of_row = self._cluster(features)
+
+        representative = np.arange(len(period_starts))
+        representative[complete] = complete[medoid_of_row]
+        self.labels = pd.Series(period_starts[representative],
+                                index=period_starts, name="representative")
+        self.weights = self.labels.value_counts().sort_index().astype(float)
+        self.weights.index.name = None
+        self.weights.name = "weight"
+
+        # timestep with the same offset in the representative period
+        steps = order[first[representative[period_of_step]] + offsets]
+        self.mapping = pd.Series(index[steps], index=index,
+                                 name="representative")
+        self.representatives = index[np.unique(steps)]
+
+        return self
+
+    def _cluster(self, features):
+        """Return the row of the medoid of every row of features."""
+        n = len(features)
+        if n == 0:
+            return np.empty(0, dtype=np.int64)
+        if self.n_periods >= n:
+            return np.arange(n)
+
+        squared = (features ** 2).sum(axis=1)
+        distance = np.sqrt(np.maximum(
+            squared[:, None] + squared[None, :] - 2 * features @ features.T,
+            0.0,
+        ))
+
+        if self.method == "hierarchical":
+            from scipy.cluster.hierarchy import fcluster, linkage
+
+            labels = fcluster(linkage(features, method="ward"),
+                              t=self.n_periods, criterion="maxclust")
+            medoids = np.array([
+                self._medoid(distance, np.flatnonzero(labels == label))
+                for label in np.unique(labels)
+            ])
+        else:
+            medoids = self._kmedoids(distance)
+
+        return medoids[distance[:, medoids].argmin(axis=1)]
+
+    @staticmethod
+    def _medoid(distance, members):
+        """Return the member with the least distance to all members."""
+        return members[distance[np.ix_(members, members)].sum(axis=1).argmin()]
+
+    def _kmedoids(self, distance):
+        """k-medoids (alternating) with a k-means++ initialization."""
+        rng = np.random.default_rng(self.seed)
+        n = len(distance)
+        medoids = [rng.integers(n)]
+        for _ in range(1, self.n_periods):
+            nearest = distance[:, medoids].min(axis=1) ** 2
+            if nearest.sum() == 0:
+                candidates = np.setdiff1d(np.arange(n), medoids)
+                medoids.append(rng.choice(candidates))
+            else:
+                medoids.append(rng.choice(n, p=nearest / nearest.sum()))
+        medoids = np.array(medoids)
+
+        for _ in range(self.max_iter):
+            labels = distance[:, medoids].argmin(axis=1)
+            updated = np.array([
+                self._medoid(distance, np.flatnonzero(labels == label))
+                if (labels == label).any() else medoids[label]
+                for label in range(len(medoids))
+            ])
+            if np.array_equal(updated, medoids):
+                break
+            medoids = updated
+
+        return medoids
+
+    def expand(self, results):
+        """
+        Expand results of the representative timesteps to the full index.
+
+        Parameters
+        ----------
+        results : pandas.DataFrame or pandas.Series
+            Results indexed by (at least) the representative timesteps.
+
+        Returns
+        -------
+        pandas.DataFrame or pandas.Series
+            The results of the representative timestep of every timestep,
+            indexed by the full index.
+        """
+        if self.mapping is None:
+            raise ValueError("The aggregation has not been fitted yet")
+        expanded = results.reindex(self.mapping.to_numpy())
+        expanded.index = self.mapping.index
+        return expanded
+
+    @staticmethod
+    def error_report(full, expanded):
+        """
+        Compare expanded results with the results of a full run.
+
+        Parameters
+        ----------
+        full : dict
+            DataFrames of a full run by quantity name.
+        expanded : dict
+            Expanded DataFrames of the aggregated run by quantity name.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Per quantity the mean and maximum absolute error over all
+            timesteps and elements and the extreme values of both runs.
+        """
+        report = {}
+        for name, frame in full.items():
+            approximation = expanded[name].reindex(
+                index=frame.index, columns=frame.columns)
+            error = (approximation - frame).abs().to_numpy(dtype=float)
+            report[name] = {
+                "mean_abs_error": np.nanmean(error),
+                "max_abs_error": np.nanmax(error),
+                "full_max": np.nanmax(frame.to_numpy(dtype=float)),
+                "aggregated_max": np.nanmax(
+                    approximation.to_numpy(dtype=float)),
+                "full_min": np.nanmin(frame.to_numpy(dtype=float)),
+                "aggregated_min": np.nanmin(
+                    approximation.to_numpy(dtype=float)),
+            }
+
+        return pd.DataFrame.from_dict(report, orient="index")
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Timeseries Cache Module
+-----------------------
+This module contains the TimeseriesCache class, a local disk cache for the
+results of Component.prepare_time_series.
+
+Entries are addressed by a content hash (see fingerprint) of the component
+parameters and the environment data the component reads. A cache entry is
+therefore only reused if every input of the calculation is identical. The
+cache is bounded in size; the least recently used entries are evicted first.
+"""
+
+import datetime
+import hashlib
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+def _update_hash(hash_object, value, seen):
+    """Feed a canonical representation of value into hash_object."""
+    update = hash_object.update
+
+    if value is None or isinstance(value, (bool, int, float, complex, str)):
+        update(repr((type(value).__name__, value)).encode())
+
+    elif isinstance(value, bytes):
+        update(b"bytes")
+        update(value)
+
+    elif isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        update(type(value).__name__.encode())
+        update(repr(value.shape).encode())
+        if isinstance(value, pd.DataFrame):
+            update(repr(list(value.columns)).encode())
+            update(repr(list(value.dtypes)).encode())
+        else:
+            update(repr((value.name, value.dtype)).encode())
+        if not isinstance(value, pd.Index):
+            update(repr(list(value.index.names)).encode())
+        try:
+            hashed = pd.util.hash_pandas_object(
+                value, index=not isinstance(value, pd.Index))
+            update(hashed.to_numpy().tobytes())
+        except TypeError:
+            # unhashable cells, e.g. lists in an object column
+            update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    elif isinstance(value, np.ndarray):
+        update(repr((value.dtype.str, value.shape)).encode())
+        if value.dtype.hasobject:
+            for item in value.ravel():
+                _update_hash(hash_object, item, seen)
+        else:
+            update(np.ascontiguousarray(value).tobytes())
+
+    elif isinstance(value, np.generic):
+        update(repr((value.dtype.str, value.item())).encode())
+
+    elif isinstance(value, (datetime.datetime, datetime.date,
+                            datetime.time, datetime.timedelta,
+                            datetime.tzinfo)):
+        update(repr(value).encode())
+
+    elif isinstance(value, dict):
+        update(b"dict")
+        for key in sorted(value, key=repr):
+            _update_hash(hash_object, key, seen)
+            _update_hash(hash_object, value[key], seen)
+
+    elif isinstance(value, (list, tuple)):
+        update(type(value).__name__.encode())
+        update(repr(len(value)).encode())
+        for item in value:
+            _update_hash(hash_object, item, seen)
+
+    elif isinstance(value, (set, frozenset)):
+        update(b"set")
+        for item in sorted(value, key=repr):
+            _update_hash(hash_object, item, seen)
+
+    elif isinstance(value, type) or callable(value) and not hasattr(value, "__dict__"):
+        update(repr((getattr(value, "__module__", None),
+                     getattr(value, "__qualname__", repr(value)))).encode())
+
+    elif hasattr(value, "__dict__"):
+        cls = type(value)
+        update((cls.__module__ + "." + cls.__qualname__).encode())
+        if id(value) in seen:
+            update(b"<cycle>")
+            return
+        seen.add(id(value))
+        if callable(value) and hasattr(value, "__qualname__"):
+            update(value.__qualname__.encode())
+        else:
+            _update_hash(hash_object, vars(value), seen)
+
+    else:
+        update(repr(value).encode())
+
+
+def fingerprint(*values):
+    """
+    Calculates a deterministic content hash of the given values.
+
+    Scalars, containers, numpy arrays and pandas objects are hashed by
+    content. Other objects are hashed by their class and their attributes.
+    The hash does not depend on the process, so it can be used as a key of
+    a cache shared between runs.
+
+    Parameters
+    ----------
+    *values
+        Objects to hash.
+
+    Returns
+    -------
+    str
+        Hexadecimal sha256 digest.
+    """
+    hash_object = hashlib.sha256()
+    _update_hash(hash_object, values, set())
+    return hash_object.hexdigest()
+
+
+class TimeseriesCache(object):
+    """
+    A size-bounded disk cache for prepared component timeseries.
+
+    Every entry is one pickle file named after its key. The modification
+    time of a file is refreshed on every hit, so it records the last use of
+    the entry; eviction removes the least recently used files until the
+    cache fits into max_size. Files are written to a temporary file first
+    and then renamed, so several processes may share one cache directory.
+
+    Parameters
+    ----------
+    path : str, optional
+        Directory of the cache (default: './Cache/timeseries').
+    max_size : int, optional
+        Maximum total size of the cache in bytes (default: 1 GiB).
+
+    Attributes
+    ----------
+    hits : int
+        Number of successful lookups of this instance.
+    misses : int
+        Number of failed lookups of this instance.
+    """
+
+    suffix = ".pkl"
+
+    def __init__(self, path="./Cache/timeseries", max_size=2**30):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def __file(self, key):
+        return os.path.join(self.path, key + self.suffix)
+
+    def __entries(self):
+        """Return (mtime, size, file) of every entry."""
+        if not os.path.isdir(self.path):
+            return []
+        entries = []
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if entry.name.endswith(self.suffix) and entry.is_file():
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    def __contains__(self, key):
+        return os.path.isfile(self.__file(key))
+
+    def __len__(self):
+        return len(self.__entries())
+
+    @property
+    def size(self):
+        """Total size of the cache in bytes."""
+        return sum(entry[1] for entry in self.__entries())
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored under key.
+
+        Parameters
+        ----------
+        key : str
+            Key of the entry, e.g. Component.fingerprint().
+        default : object, optional
+            Returned if there is no entry for key.
+
+        Returns
+        -------
+        object
+            The cached value or default.
+        """
+        file = self.__file(key)
+        try:
+            with open(file, "rb") as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return default
+        try:
+            os.utime(file)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Stores value under key and evicts old entries if necessary.
+
+        Parameters
+        ----------
+        key : str
+            Key of the entry.
+        value : object
+            Picklable value.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.__file(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    def evict(self, max_size=None):
+        """
+        Removes least recently used entries until the cache fits max_size.
+
+        Parameters
+        ----------
+        max_size : int, optional
+            Size limit in bytes. Defaults to self.max_size.
+
+        Returns
+        -------
+        int
+            Number of removed entries.
+        """
+        if max_size is None:
+            max_size = self.max_size
+        entries = sorted(self.__entries())
+        total = sum(entry[1] for entry in entries)
+        removed = 0
+        for _, size, file in entries:
+            if total <= max_size:
+                break
+            try:
+                os.remove(file)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+    def delete(self, key):
+        """Removes the entry stored under key, if any."""
+        try:
+            os.remove(self.__file(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """Removes all entries from the cache."""
+        return self.evict(max_size=-1)
@@ -9,7 +9,13 @@ for adding and removing components, and offers functionality for exporting compo
 data and time series for analysis and visualization.
 """
 
+import itertools
+import json
+import os
+import pickle
 import random
+import re
+import numpy as np
 import pandas as pd
 import sqlite3
 from tqdm import tqdm
@@ -21,6 +27,46 @@ from vpplib.electrical_energy_storage import ElectricalEnergyStorage
 from vpplib.wind_power import WindPower
 from vpplib.combined_heat_and_power import CombinedHeatAndPower
 from vpplib.thermal_energy_storage import ThermalEnergyStorage
+from vpplib.heating_rod import HeatingRod
+
+# Columns of the component values exports
+component_value_columns = (
+    "name",
+    "technology",
+    "bus",
+    "arrival_soc",
+    "capacity_kWh",
+    "power_kW",
+    "th_power_kW",
+    "efficiency_el",
+    "efficiency_th",
+)
+
+
+
+def _series_from_json(text):
+    """Decode an object Series stored by _parquet_state_encode."""
+    data = json.loads(text)
+    return pd.Series(data["data"], index=pd.Index(data["index"],
+                                                  name=data["index_name"]),
+                     name=data["name"], dtype=object)
+
+
+def _pandas_from_parquet(blob):
+    """Decode a DataFrame, Series or Index stored by _parquet_state_encode."""
+    import io
+
+    frame = pd.read_parquet(io.BytesIO(blob))
+    kind = frame.attrs.pop("kind")
+    freq = frame.attrs.pop("freq", None)
+    if freq is not None:
+        frame.index.freq = freq
+    if kind == "series":
+        return frame.iloc[:, 0].rename(frame.attrs.pop("name"))
+    if kind == "index":
+        return frame.index
+    return frame
+
 
 class VirtualPowerPlant(object):
     """Virtual Power Plant class for managing components and their interactions.
@@ -45,6 +91,8 @@ class VirtualPowerPlant(object):
         List of buses with wind power components.
     buses_with_storage : list
         List of buses with storage components.
+    memory_budget : dict or None
+        The memory budget set with set_memory_budget.
     """
     
     def __init__(self, name):
@@ -67,6 +115,11 @@ class VirtualPowerPlant(object):
         self.buses_with_wind = []
         self.buses_with_storage = []
 
+        self.memory_budget = None
+
+    # Technology registry of the exports, see register_technology
+    technology_registry = {}
+
     def add_component(self, component):
         """Add a component to the virtual power plant.
         
@@ -84,6 +137,11 @@ class VirtualPowerPlant(object):
         # self.components.append(component)
         self.components[component.identifier] = component
 
+        if self.memory_budget is not None:
+            self.memory_budget["added"] += 1
+            if self.memory_budget["added"] >= self.memory_budget["check_every"]:
+                self.check_memory_budget()
+
     def remove_component(self, component):
         """Remove a component from the virtual power plant.
         
@@ -98,6 +156,343 @@ class VirtualPowerPlant(object):
         # Remove component
         self.components.pop(component)
 
+    def compact_time_series(self, dtype="float32"):
+        """Store the timeseries of all components as compact arrays.
+
+        See Component.compact_time_series. Components with equal time
+        index share one index object.
+
+        Parameters
+        ----------
+        dtype : str or numpy.dtype, optional
+            Dtype of the stored values (default: "float32").
+
+        Returns
+        -------
+        int
+            Memory of all compact timeseries values in bytes.
+        """
+        nbytes = 0
+        for component in self.components.values():
+            compact = component.compact_time_series(dtype=dtype)
+            if compact is not None:
+                nbytes += compact.nbytes
+
+        return nbytes
+
+    def expand_time_series(self):
+        """Store the timeseries of all components as float64 pandas objects again."""
+        for component in self.components.values():
+            component.expand_time_series()
+
+    def memory_usage(self):
+        """Estimate the memory held by every component.
+
+        The attributes of the components are walked and the buffers of
+        NumPy and pandas data are counted once, see vpplib.memory. The
+        environment is not counted, see memory_report.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Indexed by component name with the columns technology (see
+            register_technology, else the class name) and the bytes of the
+            timeseries (incl. timeseries_year and the streaming history),
+            of the pvlib/windpowerlib ModelChain and its results, of the
+            other attributes, in total and spilled to disk (see
+            spill_time_series, not part of total).
+        """
+        from vpplib.memory import object_memory
+
+        seen = {
+            id(component.environment)
+            for component in self.components.values()
+            if component.environment is not None
+        }
+        records = []
+        for name, component in self.components.items():
+            entry = self.get_technology_entry(component)
+            record = {
+                "name": name,
+                "technology": (entry["technology"] if entry is not None
+                               else type(component).__name__),
+                "timeseries": 0,
+                "modelchain": 0,
+                "other": 0,
+                "spilled": 0,
+            }
+            for attribute, value in vars(component).items():
+                resident, spilled = object_memory(value, seen)
+                if "timeseries" in attribute or attribute == "stream":
+                    record["timeseries"] += resident
+                elif "modelchain" in attribute.lower():
+                    record["modelchain"] += resident
+                else:
+                    record["other"] += resident
+                record["spilled"] += spilled
+            records.append(record)
+
+        usage = pd.DataFrame.from_records(
+            records,
+            columns=["name", "technology", "timeseries", "modelchain",
+                     "other", "spilled"],
+        ).set_index("name")
+        usage.insert(
+            4, "total",
+            usage[["timeseries", "modelchain", "other"]].sum(axis=1),
+        )
+
+        return usage
+
+    def memory_report(self):
+        """Report the memory of the virtual power plant and the process.
+
+        Returns
+        -------
+        dict
+            "components": memory_usage, "technologies": its sum per
+            technology, "weather": bytes of the weather data by
+            Environment attribute (e.g. pv_data), "tracked_bytes": bytes of
+            components and weather data, "spilled_bytes": bytes spilled to
+            disk, and the resident set size of the process, see
+            vpplib.memory.process_memory.
+        """
+        from vpplib.memory import object_memory, process_memory
+
+        usage = self.memory_usage()
+        technologies = usage.groupby("technology").sum(numeric_only=True)
+
+        weather = {}
+        seen = set()
+        environments = {
+            id(component.environment): component.environment
+            for component in self.components.values()
+            if component.environment is not None
+        }
+        for environment in environments.values():
+            for attribute, value in vars(environment).items():
+                if isinstance(value, (pd.DataFrame, pd.Series)):
+                    resident, _ = object_memory(value, seen)
+                    weather[attribute] = weather.get(attribute, 0) + resident
+
+        report = {
+            "components": usage,
+            "technologies": technologies,
+            "weather": weather,
+            "tracked_bytes": int(usage["total"].sum()) + sum(weather.values()),
+            "spilled_bytes": int(usage["spilled"].sum()),
+        }
+        report.update(process_memory())
+
+        return report
+
+    def set_memory_budget(self, max_bytes, action="raise", measure="rss",
+                          spill_path="./Cache/spill", check_every=100):
+        """Set a memory budget, which is checked while the VPP is built and exported.
+
+        The budget is checked by check_memory_budget every check_every
+        calls of add_component and before every export.
+
+        Parameters
+        ----------
+        max_bytes : int or None
+            The budget in bytes. None removes the budget.
+        action : str, optional
+            What happens if the budget is exceeded: "raise" (default)
+            raises MemoryBudgetError, "spill" moves the timeseries of the
+            components to disk, largest first, until the budget is met, and
+            raises MemoryBudgetError if that is not enough.
+            timeseries_year and the other spill_attributes of the
+            components are moved with the timeseries.
+        measure : str, optional
+            "rss" (default) compares the resident memory of the process not
+            backed by files (the total resident memory where that is not
+            available), which is what the operating system kills the
+            process for. "tracked" compares the tracked_bytes of
+            memory_report.
+        spill_path : str, optional
+            Directory of the spilled timeseries (default:
+            './Cache/spill').
+        check_every : int, optional
+            Number of added components between two checks (default: 100).
+        """
+        if max_bytes is None:
+            self.memory_budget = None
+            return
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        if action not in ("raise", "spill"):
+            raise ValueError(
+                "action must be 'raise' or 'spill', not " + repr(action)
+            )
+        if measure not in ("rss", "tracked"):
+            raise ValueError(
+                "measure must be 'rss' or 'tracked', not " + repr(measure)
+            )
+        if check_every < 1:
+            raise ValueError("check_every must be at least 1")
+
+        self.memory_budget = {
+            "max_bytes": max_bytes,
+            "action": action,
+            "measure": measure,
+            "spill_path": spill_path,
+            "check_every": check_every,
+            "added": 0,
+        }
+
+    def __used_memory(self):
+        if self.memory_budget["measure"] == "tracked":
+            return self.memory_report()["tracked_bytes"]
+
+        from vpplib.memory import process_memory
+
+        memory = process_memory()
+        if memory["anonymous_rss_bytes"] is not None:
+            return memory["anonymous_rss_bytes"]
+        if memory["rss_bytes"] is None:
+            raise ValueError(
+                "The resident memory of the process is not available on "
+                "this platform; use measure='tracked'"
+            )
+        return memory["rss_bytes"]
+
+    def check_memory_budget(self):
+        """Check the memory budget set with set_memory_budget.
+
+        Returns
+        -------
+        int or None
+            The used memory in bytes, None without budget.
+
+        Raises
+        ------
+        MemoryBudgetError
+            If the budget is exceeded (after spilling with action "spill").
+        """
+        if self.memory_budget is None:
+            return None
+        from vpplib.memory import MemoryBudgetError
+
+        budget = self.memory_budget
+        budget["added"] = 0
+        used = self.__used_memory()
+        if used <= budget["max_bytes"] or budget["action"] != "spill":
+            if used > budget["max_bytes"]:
+                raise MemoryBudgetError(
+                    "The virtual power plant " + str(self.name) + " uses "
+                    + str(used) + " bytes, which exceeds its memory budget "
+                    "of " + str(budget["max_bytes"]) + " bytes"
+                )
+            return used
+
+        # timeseries in memory (incl. spill_attributes), largest first
+        from vpplib.memory import resident_data_bytes
+
+        candidates = []
+        for position, (name, component) in enumerate(
+                self.components.items()):
+            nbytes = 0
+            for attribute in (("timeseries", "_compact_timeseries")
+                              + tuple(component.spill_attributes)):
+                value = component.__dict__.get(attribute)
+                if value is not None:
+                    nbytes += resident_data_bytes(value)
+            if nbytes > 0:
+                candidates.append((nbytes, position, name))
+        candidates.sort(key=lambda candidate: -candidate[0])
+
+        for nbytes, position, name in candidates:
+            file_name = "{:06d}_{}.npy".format(
+                position, re.sub(r"[^\w.-]", "_", str(name)))
+            self.components[name].spill_time_series(
+                os.path.join(budget["spill_path"], str(self.name), file_name))
+            if budget["measure"] == "tracked":
+                # measure again only once the estimate meets the budget
+                used -= nbytes
+                if used <= budget["max_bytes"]:
+                    used = self.__used_memory()
+            else:
+                used = self.__used_memory()
+            if used <= budget["max_bytes"]:
+                return used
+
+        if budget["measure"] == "tracked":
+            used = self.__used_memory()
+        raise MemoryBudgetError(
+            "The virtual power plant " + str(self.name) + " uses "
+            + str(used) + " bytes after spilling all timeseries to disk, "
+            "which exceeds its memory budget of "
+            + str(budget["max_bytes"]) + " bytes"
+        )
+
+    def get_state(self):
+        """
+        Return a snapshot of the operating state of all components.
+
+        Only the attributes in the state_attributes of the components are
+        copied (e.g. limit, is_running, state_of_charge), not the prepared
+        timeseries of non-controllable components.
+
+        Returns
+        -------
+        dict
+            Component state by component name, see Component.get_state.
+        """
+        return {
+            name: component.get_state()
+            for name, component in self.components.items()
+        }
+
+    def set_state(self, state):
+        """
+        Restore a snapshot of get_state.
+
+        Parameters
+        ----------
+        state : dict
+            Component state by component name.
+        """
+        for name, component_state in state.items():
+            self.components[name].set_state(component_state)
+
+    def start_stream(self, capacity=672):
+        """
+        Start the streaming operation of all components.
+
+        Parameters
+        ----------
+        capacity : int, optional
+            Number of timesteps kept in the history of every component
+            (default: 672), see Component.start_stream.
+        """
+        for component in self.components.values():
+            component.start_stream(capacity)
+
+    def advance(self, timestamp, data):
+        """
+        Advance all components by one timestep in streaming operation.
+
+        Parameters
+        ----------
+        timestamp : str or datetime
+            The timestamp of the new timestep.
+        data : dict or pandas.Series
+            Weather and measurement values of the timestep, see the step
+            methods of the components.
+
+        Returns
+        -------
+        dict
+            The values of the timestep by component name, None for
+            components without data (e.g. storages operated by the
+            operator), see Component.advance.
+        """
+        return {
+            name: component.advance(timestamp, data)
+            for name, component in self.components.items()
+        }
+
     def export_components(self, environment):
         """Export component values and time series data.
         
@@ -117,6 +512,8 @@ class VirtualPowerPlant(object):
             - df_timeseries: DataFrame with time series data for all components
         """
 
+        self.check_memory_budget()
+
         # dataframes for exporting timeseries and component values
         df_timeseries = pd.DataFrame(
             index=pd.date_range(start=environment.start,
@@ -131,11 +528,7 @@ class VirtualPowerPlant(object):
         for component in tqdm(self.components.keys()):
             if '_pv' in component:
                 df_component_values[self.components[component].identifier + "_kWp"] = (
-                    self.components[component].module.Impo
-                    * self.components[component].module.Vmpo
-                    / 1000
-                    * self.components[component].system.modules_per_string
-                    * self.components[component].system.strings_per_inverter
+                    self.components[component].peak_power
                 )
                 df_timeseries[self.components[component].identifier] = self.components[component].timeseries * -1
 
@@ -162,8 +555,7 @@ class VirtualPowerPlant(object):
                         component].timeseries * -1
 
                 df_component_values[self.components[component].identifier + "_kW"] = (
-                    self.components[component].ModelChain.power_plant.nominal_power
-                    / 1000
+                    self.components[component].peak_power
                 )
 
             elif '_bev' in component:
@@ -261,6 +653,11 @@ class VirtualPowerPlant(object):
         This method returns a DataFrame with detailed information about all components
         in the virtual power plant, including technology type, bus, capacity, power,
         and efficiency values.
+
+        The technology of each component is looked up by its type in the
+        technology registry (see register_technology). Components of
+        unregistered types are skipped. The records are collected in a list
+        and the DataFrame is built once.
         
         Returns
         -------
@@ -270,115 +667,78 @@ class VirtualPowerPlant(object):
             power_kW, th_power_kW, efficiency_el, efficiency_th
         """
 
-        # dataframe for exporting component values
-
-        df_component_values = pd.DataFrame(
-            columns=("name",
-                     "technology",
-                     "bus",
-                     "arrival_soc",
-                     "capacity_kWh",
-                     "power_kW",
-                     "th_power_kW",
-                     "efficiency_el",
-                     "efficiency_th"))
+        records = []
 
         print("Exporting component values:")
         
-        for component in tqdm(self.components.keys()):
-            if '_pv' in component:
-                df_component_values = df_component_values.append(
-                    {"name": component,
-                     "technology": "pv",
-                     "bus": self.components[component].bus,
-                     "power_kW": (self.components[component].module.Impo
-                     * self.components[component].module.Vmpo
-                     / 1000
-                     * self.components[component].system.modules_per_string
-                     * self.components[component].system.strings_per_inverter)},
-                    ignore_index=True)
+        for name, component in tqdm(self.components.items()):
+            entry = self.get_technology_entry(component)
+            if entry is None:
+                continue
 
-            elif '_ees' in component:
-                df_component_values = df_component_values.append(
-                    {"name": component,
-                     "technology": "ees",
-                     "bus": self.components[component].bus,
-                     "capacity_kWh": self.components[component].capacity,
-                     "power_kW": self.components[component].max_power,
-                     "efficiency_el": self.components[component].charge_efficiency},
-                    ignore_index=True)
+            record = {"name": name,
+                      "technology": entry["technology"],
+                      "bus": getattr(component, "bus", None)}
+            record.update(entry["values"](component))
+            records.append(record)
 
+        return pd.DataFrame.from_records(records, columns=component_value_columns)
 
-            elif '_wea' in component:
-                df_component_values = df_component_values.append(
-                    {"name": component,
-                     "technology": "wea",
-                     "bus": self.components[component].bus,
-                     "power_kW": self.components[component].ModelChain.power_plant.nominal_power
-                    / 1000},
-                    ignore_index=True)
+    @classmethod
+    def register_technology(cls, component_class, technology, values,
+                            timeseries=None):
+        """Register a component type for the exports of the virtual power plant.
 
+        Parameters
+        ----------
+        component_class : type
+            Component class. Subclasses use the entry of their closest
+            registered base class.
+        technology : str
+            Technology name used in the exports, e.g. 'pv'.
+        values : callable
+            Function taking a component and returning a dict with (a subset
+            of) the columns arrival_soc, capacity_kWh, power_kW, th_power_kW,
+            efficiency_el and efficiency_th.
+        timeseries : callable, optional
+            Function taking a prepared component and returning a dict with
+            (a subset of) the timeseries cop, feed_in and th_energy as
+            pandas.Series. Components without it are exported without
+            timeseries.
+        """
 
-            elif '_bev' in component:
-                df_component_values = df_component_values.append(
-                    {"name": component,
-                     "technology": "bev",
-                     "bus": self.components[component].bus,
-                     "arrival_soc": random.uniform(
-                         self.components[component].battery_min,
-                         self.components[component].battery_max
-                         ),
-                     "capacity_kWh": self.components[component].battery_max,
-                     "power_kW": self.components[component].charging_power,
-                     "efficiency_el": self.components[component].charge_efficiency},
-                    ignore_index=True)
+        cls.technology_registry[component_class] = {
+            "technology": technology,
+            "values": values,
+            "timeseries": timeseries,
+        }
 
-            elif '_hp' in component:
-                df_component_values = df_component_values.append(
-                    {"name": component,
-                     "technology": "hp",
-                     "bus": self.components[component].bus,
-                     "power_kW": self.components[component].el_power},
-                    ignore_index=True)
-
-            elif '_tes' in component:
-                # Formula: E = m * cp * dT
-                df_component_values = df_component_values.append(
-                    {"name": component,
-                     "technology": "tes",
-                     "bus": self.components[component].bus,
-                     "capacity_kWh": (self.components[component].mass
-                            * self.components[component].cp
-                            * (self.components[component].hysteresis * 2)  #dT
-                            / 3600),  # convert KJ to kW,
-                     "efficiency_th": self.components[component].efficiency_th},
-                    ignore_index=True)
+    @classmethod
+    def get_technology_entry(cls, component):
+        """Return the technology registry entry for a component.
 
-            elif '_chp' in component:
-                df_component_values = df_component_values.append(
-                    {"name": component,
-                     "technology": "chp",
-                     "bus": self.components[component].bus,
-                     "power_kW": self.components[component].el_power,
-                     "th_power_kW": self.components[component].th_power,
-                     "efficiency_el": self.components[component].efficiency_el,
-                     "efficiency_th": self.components[component].efficiency_th},
-                    ignore_index=True)
-
-            elif '_hr' in component:
-                df_component_values = df_component_values.append(
-                    {"name": component,
-                     "technology": "hr",
-                     "bus": self.components[component].bus,
-                     "th_power_kW": self.components[component].el_power, #TODO: change to power_kW after the Project
-                     "efficiency_th": self.components[component].efficiency}, #TODO: Change to el_efficiency after the Project
-                    ignore_index=True)
-
-
-        return df_component_values
+        Parameters
+        ----------
+        component : Component
+            Component to look up.
+
+        Returns
+        -------
+        dict or None
+            Registry entry of the component type or its closest registered
+            base class, None if the type is not registered.
+        """
+
+        for component_class in type(component).__mro__:
+            entry = cls.technology_registry.get(component_class)
+            if entry is not None:
+                return entry
+        return None
 
     def export_component_timeseries(self):
 
+        self.check_memory_budget()
+
         ts_dict = dict()
 
         #List to catch components without timeseries. Usually only tes
@@ -424,341 +784,593 @@ class VirtualPowerPlant(object):
         return df_timeseries, no_timeseries_lst
 
 
-    def export_components_to_sql(self, name = "export"):
+    def export_components_to_sql(self, name = "export", replace = False):
 
         """
         Info
         ----
         This function exports the component values and the timeseries of the
         components of the virtual power plant to a sql database.
+
+        All rows are written in one transaction with executemany. The
+        database uses WAL journaling, typed columns and indexes on
+        (name, time) and time of the timeseries table, which are created
+        after the bulk insert.
         
         Parameters
         ----------
         
-        ...
-        	
-        Attributes
-        ----------
-        
-        ...
+        name : str, optional
+            Name of the database file in ./Results (default: "export").
+
+        replace : bool, optional
+            Drop existing tables of a previous export (default: False).
         
         Notes
         -----
         
-        ...
-        
-        References
-        ----------
-        
-        ...
+        The timeseries of a component are taken from the "timeseries"
+        function of its entry in the technology registry
+        (see register_technology). Components without one are returned.
+        Times are stored as text like str(pandas.Timestamp).
         
         Returns
         -------
         
-        ...
+        no_timeseries_lst : list
+            Names of the components without timeseries.
         
         """
 
-        # create connection
-        conn = sqlite3.connect((r'./Results/' + name + '.sqlite'))
-
-        # create curser object
-        c = conn.cursor()
-
-        # Create table
-        c.execute("CREATE TABLE component_values ("
-                  +"name, "
-                  +"technology, "
-                  +"bus, "
-                  +"arrival_soc, "
-                  +"capacity_kWh, "
-                  +"power_kW, "
-                  +"th_power_kW, "
-                  +"efficiency_el ,"
-                  +"efficiency_th)")
-
-        # Create table
-        c.execute("CREATE TABLE timeseries ("
-                  +"time, "
-                  +"name, "
-                  +"cop, "
-                  +"feed_in, "
-                  +"th_energy)")
-
-        # Insert data of the components into the component_values table
-        print("Exporting components to sql:")
-        for component in tqdm(self.components.keys()):
+        self.check_memory_budget()
 
-            if '_pv' in component:
-                c.execute("INSERT INTO component_values "
-                          +"(name, "
-                          +"technology, "
-                          +"bus, "
-                          +"power_kW) "
-                          +"VALUES (?, ?, ?, ?)",
-                          (component,
-                           "pv",
-                           self.components[component].bus,
-                           (self.components[component].module.Impo
-                            * self.components[component].module.Vmpo
-                            / 1000
-                            * self.components[component].system.modules_per_string
-                            * self.components[component].system.strings_per_inverter
-                            )
-                           )
-                          )
-
-                conn.commit()
+        # create connection, transactions are handled explicitly
+        conn = sqlite3.connect((r'./Results/' + name + '.sqlite'),
+                               isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
 
-            elif '_ees' in component:
-                c.execute("INSERT INTO component_values "
-                          +"(name, "
-                          +"technology, "
-                          +"bus, "
-                          +"capacity_kWh, "
-                          +"power_kW, "
-                          +"efficiency_el) "
-                          +"VALUES (?, ?, ?, ?, ?, ?)",
-                          (component,
-                           "ees",
-                           self.components[component].bus,
-                           self.components[component].capacity,
-                           self.components[component].max_power,
-                           self.components[component].charge_efficiency)
-                          )
-
-                conn.commit()
+        # Save timeseries of each component for each timestep to the table timeseries
+        # Log components which do not have a timeseries
+        no_timeseries_lst = list()
 
-            elif '_wea' in component:
-                c.execute("INSERT INTO component_values "
-                          +"(name, "
-                          +"technology, "
-                          +"bus, "
-                          +"power_kW) "
-                          +"VALUES (?, ?, ?, ?)",
-                          (component,
-                           "wea",
-                           self.components[component].bus, # used to be: component[:-4],
-                           (self.components[
-                               component].ModelChain.power_plant.nominal_power
-                               / 1000)
-                           )
-                          )
-
-                conn.commit()
+        # time strings are created once per time index
+        time_strings = dict()
+
+        try:
+            conn.execute("BEGIN")
+
+            if replace:
+                conn.execute("DROP TABLE IF EXISTS component_values")
+                conn.execute("DROP TABLE IF EXISTS timeseries")
+
+            # Create tables
+            conn.execute("CREATE TABLE component_values ("
+                         + "name TEXT PRIMARY KEY, "
+                         + "technology TEXT NOT NULL, "
+                         + "bus TEXT, "
+                         + "arrival_soc REAL, "
+                         + "capacity_kWh REAL, "
+                         + "power_kW REAL, "
+                         + "th_power_kW REAL, "
+                         + "efficiency_el REAL, "
+                         + "efficiency_th REAL)")
+
+            conn.execute("CREATE TABLE timeseries ("
+                         + "time TEXT NOT NULL, "
+                         + "name TEXT NOT NULL, "
+                         + "cop REAL, "
+                         + "feed_in REAL, "
+                         + "th_energy REAL)")
+
+            # Insert data of the components into the component_values table
+            df_component_values = self.export_component_values()
+            conn.executemany(
+                "INSERT INTO component_values ("
+                + ", ".join(component_value_columns)
+                + ") VALUES (" + ", ".join("?" * len(component_value_columns)) + ")",
+                df_component_values.astype(object).where(
+                    df_component_values.notna(), None).itertuples(index=False, name=None))
+
+            print("Exporting component timeseries to sql:")
+            for component_name, component in tqdm(self.components.items()):
+                entry = self.get_technology_entry(component)
+                if entry is None or entry["timeseries"] is None:
+                    no_timeseries_lst.append(component_name)
+                    continue
+
+                columns = entry["timeseries"](component)
+                index = next(iter(columns.values())).index
+                if id(index) not in time_strings:
+                    time_strings[id(index)] = (index, index.astype(str).tolist())
+                times = time_strings[id(index)][1]
+
+                values = [
+                    pd.to_numeric(columns[column], errors="coerce").to_numpy(dtype=float).tolist()
+                    if column in columns else itertools.repeat(None)
+                    for column in ("cop", "feed_in", "th_energy")
+                ]
+                conn.executemany(
+                    "INSERT INTO timeseries (time, name, cop, feed_in, th_energy) "
+                    + "VALUES (?, ?, ?, ?, ?)",
+                    zip(times, itertools.repeat(component_name), *values))
+
+            conn.execute("CREATE INDEX IF NOT EXISTS timeseries_name_time "
+                         + "ON timeseries (name, time)")
+            conn.execute("CREATE INDEX IF NOT EXISTS timeseries_time "
+                         + "ON timeseries (time)")
+            conn.execute("COMMIT")
+
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        finally:
+            # Close the connection
+            conn.close()
 
-            elif '_bev' in component:
-                c.execute("INSERT INTO component_values "
-                          +"(name, "
-                          +"technology, "
-                          +"bus, "
-                          +"power_kW, "
-                          +"capacity_kWh, "
-                          +"efficiency_el, "
-                          +"arrival_soc) "
-                          +"VALUES (?, ?, ?, ?, ?, ?, ?)",
-                          (component,
-                           "bev",
-                           self.components[component].bus,
-                           self.components[component].charging_power,
-                           self.components[component].battery_max,
-                           self.components[component].charge_efficiency,
-                           random.uniform(self.components[component].battery_min,
-                                        self.components[component].battery_max)
-                           )
-                          )
-
-                conn.commit()
+        return no_timeseries_lst
 
-            elif '_hp' in component:
-                c.execute("INSERT INTO component_values "
-                          +"(name, "
-                          +"technology, "
-                          +"bus, "
-                          +"power_kW) "
-                          +"VALUES (?, ?, ?, ?)",
-                          (component,
-                           "hp",
-                           self.components[component].bus,
-                           self.components[component].el_power
-                           )
-                          )
-
-                conn.commit()
 
-            elif '_chp' in component:
-                c.execute("INSERT INTO component_values "
-                          +"(name, "
-                          +"technology, "
-                          +"bus, "
-                          +"power_kW, "
-                          +"th_power_kW, "
-                          +"efficiency_el, "
-                          +"efficiency_th) "
-                          +"VALUES (?, ?, ?, ?, ?, ?, ?)",
-                          (component,
-                           "chp",
-                           self.components[component].bus,
-                           self.components[component].el_power,
-                           self.components[component].th_power,
-                           self.components[component].efficiency_el,
-                           self.components[component].efficiency_th
-                           )
-                          )
-
-                conn.commit()
-
-            elif '_hr' in component:
-                c.execute("INSERT INTO component_values "
-                          +"(name, "
-                          +"technology, "
-                          +"bus, "
-                          +"th_power_kW, "
-                          +"efficiency_th) "
-                          +"VALUES (?, ?, ?, ?, ?)",
-                          (component,
-                           "hr",
-                           self.components[component].bus,
-                           self.components[component].el_power,
-                           self.components[component].efficiency
-                           )
-                          )
-    
-                conn.commit()
-
-            elif '_tes' in component:
-                # Formula: E = m * cp * dT
-                c.execute("INSERT INTO component_values "
-                          +"(name, "
-                          +"technology, "
-                          +"bus, "
-                          +"capacity_kWh, "
-                          +"efficiency_th) "
-                          +"VALUES (?, ?, ?, ?, ?)",
-                          (component,
-                           "tes",
-                           self.components[component].bus,
-                           (self.components[component].mass
-                            * self.components[component].cp
-                            * (self.components[component].hysteresis * 2)  #dT
-                            / 3600),  # convert KJ to kW
-                           self.components[component].efficiency_th
-                           )
-                          )
-
-                conn.commit()
-
-        # Save (commit) the changes
-        conn.commit()
+    # Attributes, which are not stored in the component state of a parquet
+    # export. The environment is passed to the loader and the pvlib
+    # libraries are only needed to pick a pv system. The model_attributes of
+    # the components are rebuilt by Component.rebuild_model.
+    parquet_excluded_attributes = ("timeseries", "_compact_timeseries",
+                                   "environment", "module_lib", "inverter_lib")
+
+    # Types of the attributes stored in typed columns
+    # "state.<attribute>.<type>" of a parquet export: the decoder and the
+    # dtype of the column.
+    _parquet_state_types = {
+        "bool": (bool, "boolean"),
+        "int": (int, "Int64"),
+        "float": (float, "float64"),
+        "str": (str, "string"),
+        "timestamp": (pd.Timestamp, "datetime64[ns]"),
+        "json": (json.loads, "string"),
+        "series": (_series_from_json, "string"),
+        "pandas": (_pandas_from_parquet, object),
+    }
+
+    @staticmethod
+    def _parquet_state_type(value):
+        """Return the type name of a scalar stored in a typed column."""
+        if isinstance(value, (bool, np.bool_)):
+            return "bool"
+        if isinstance(value, (int, np.integer)):
+            if -2 ** 63 <= value < 2 ** 63:
+                return "int"
+        elif isinstance(value, (float, np.floating)):
+            return "float"
+        elif isinstance(value, str):
+            return "str"
+        elif isinstance(value, pd.Timestamp) and value.tz is None:
+            return "timestamp"
+        return None
+
+    @classmethod
+    def _parquet_state_encode(cls, value):
+        """Return the type name and the stored value of an attribute.
+
+        Scalars are stored as they are, None, lists and dicts which survive
+        a JSON round trip as JSON, pandas data as parquet and Series of
+        mixed types (e.g. the module parameters of pvlib) as JSON.
+        (None, None) if the value has no typed representation.
+        """
+        kind = cls._parquet_state_type(value)
+        if kind is not None:
+            return kind, value
+        if value is None or isinstance(value, (list, dict)):
+            try:
+                text = json.dumps(value)
+            except (TypeError, ValueError):
+                return None, None
+            if json.loads(text) == value:
+                return "json", text
+            return None, None
+        if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+            if isinstance(value, pd.Series):
+                frame = value.to_frame("series")
+                frame.attrs = {"kind": "series", "name": value.name}
+            elif isinstance(value, pd.Index):
+                frame = pd.DataFrame(index=value)
+                frame.attrs = {"kind": "index"}
+            else:
+                frame = value.copy(deep=False)
+                frame.attrs = {"kind": "frame"}
+            frame.attrs["freq"] = getattr(frame.index, "freqstr", None)
+            try:
+                return "pandas", frame.to_parquet()
+            except (TypeError, ValueError, NotImplementedError):
+                pass
+        if isinstance(value, pd.Series) and value.dtype == object:
+            # mixed types, which parquet can't store in one column
+            try:
+                text = json.dumps({"name": value.name,
+                                   "index_name": value.index.name,
+                                   "index": value.index.tolist(),
+                                   "data": value.tolist()},
+                                  default=lambda item: item.item())
+            except (AttributeError, TypeError, ValueError):
+                return None, None
+            return "series", text
+        return None, None
+
+    def export_to_parquet(self, path):
+        """Export the prepared virtual power plant to a Parquet dataset.
+
+        The export consists of
+        - components.parquet: the component values (see
+          export_component_values) and the state of each component without
+          its timeseries, environment and model_attributes (rebuilt by
+          Component.rebuild_model on loading): scalars, JSON data and
+          pandas data in typed columns "state.<attribute>.<type>", only
+          the attributes without such a representation (e.g. objects of
+          other libraries) pickled in the column "state",
+        - timeseries/: the timeseries of all components in long format
+          (time, name, variable, value), partitioned by technology and
+          month (hive partitioning),
+        - virtual_power_plant.json: name and bus lists of the virtual power
+          plant.
 
-        # Save timeseries of each component for each timestep to the table timeseries
-        # Log components which do not have a timeseries
-        no_timeseries_lst = list()
+        Parameters
+        ----------
+        path : str
+            Directory of the dataset. Existing files are overwritten.
 
-        for idx in self.components[next(iter(self.components.keys()))].timeseries.index:
-            for component in self.components.keys():
-
-                if '_pv' in component:
-
-                    c.execute("INSERT INTO timeseries "
-                              +"(time, "
-                              +"name, "
-                              +"feed_in) "
-                              +"VALUES (?, ?, ?)",
-                              (str(idx),
-                               component,
-                               (self.components[component].value_for_timestamp(str(idx)) * -1)
-                               )
-                              )
-
-                    conn.commit()
-
-                elif '_wea' in component:
-                    c.execute("INSERT INTO timeseries "
-                              +"(time, "
-                              +"name, "
-                              +"feed_in) "
-                              +"VALUES (?, ?, ?)",
-                              (str(idx),
-                               component,
-                               (self.components[component].value_for_timestamp(str(idx)) * -1)
-                               )
-                              )
-
-                    conn.commit()
-
-
-                elif '_bev' in component:
-                    c.execute("INSERT INTO timeseries "
-                              +"(time, "
-                              +"name, "
-                              +"feed_in) "
-                              +"VALUES (?, ?, ?)",
-                              (str(idx),
-                               component,
-                               float(self.components[component].timeseries.iloc[str(idx), "at_home"])
-                               )
-                              )
-
-                    conn.commit()
-
-
-                elif '_hp' in component:
-
-                    # Check if the variable cop exists.
-                    # COP is the same for all heat pumps!
-                    if 'cop' not in locals():
-                        cop = pd.DataFrame(
-                            index = self.components[
-                                next(iter(self.components.keys()))
-                                ].timeseries.index,
-                            columns=["cop"])
-
-                        cop.cop = self.components[component].get_cop().cop
-                        cop.interpolate(inplace=True)
-
-                    c.execute("INSERT INTO timeseries "
-                              +"(time, "
-                              +"name, "
-                              +"cop, "
-                              +"th_energy) "
-                              +"VALUES (?, ?, ?, ?)",
-                              (str(idx),
-                               component,
-                               cop.cop[str(idx)],
-                               self.components[component].thermal_energy_demand.Heat_load_kWh.loc[str(idx)].item() #TODO: used to be HeatDemand
-                               )
-                              )
-
-                    conn.commit()
-
-                elif '_chp' in component:
-                    c.execute("INSERT INTO timeseries "
-                              +"(time, "
-                              +"name, "
-                              +"th_energy) "
-                              +"VALUES (?, ?, ?)",
-                              (str(idx),
-                               component,
-                               self.components[component].thermal_energy_demand.Heat_load_kWh.loc[str(idx)].item() #TODO: used to be HeatDemand
-                               )
-                              )
-
-                    conn.commit()
-
-                elif '_tes' in component:
-                    # Thermal energy storage has no timeseries
-                    no_timeseries_lst.append(component)
+        Returns
+        -------
+        path : str
+            Directory of the dataset.
 
+        Notes
+        -----
+        Requires pyarrow. Reopen the export with load_from_parquet or read
+        parts of the timeseries with read_parquet_timeseries.
+        """
+
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        self.check_memory_budget()
+        os.makedirs(path, exist_ok=True)
+
+        df_component_values = self.export_component_values()
+        # components of unregistered types are stored as technology "other"
+        unregistered = [name for name in self.components
+                        if name not in set(df_component_values.name)]
+        df_component_values = pd.concat(
+            [df_component_values,
+             pd.DataFrame({"name": unregistered, "technology": "other",
+                           "bus": [getattr(self.components[name], "bus", None)
+                                   for name in unregistered]})],
+            ignore_index=True)
+        df_component_values["component_class"] = None
+        df_component_values["timeseries_layout"] = None
+        df_component_values["state_layout"] = None
+        df_component_values["state"] = None
+        df_component_values.set_index("name", drop=False, inplace=True)
+
+        state_columns = {}
+
+        schema = pa.schema([("time", pa.timestamp("ns")),
+                            ("name", pa.string()),
+                            ("variable", pa.string()),
+                            ("value", pa.float64()),
+                            ("technology", pa.string()),
+                            ("month", pa.string())])
+
+        def record_batches():
+            for component_name, component in self.components.items():
+                excluded_attributes = (self.parquet_excluded_attributes
+                                       + tuple(getattr(component,
+                                                       "model_attributes", ())))
+                pickled = {}
+                columns = []
+                for key, value in component.__dict__.items():
+                    if key in excluded_attributes:
+                        continue
+                    kind, stored = self._parquet_state_encode(value)
+                    if kind is None:
+                        pickled[key] = value
+                        continue
+                    column = "state." + key + "." + kind
+                    state_columns.setdefault(column, {})[component_name] = stored
+                    columns.append(column)
+                excluded = [key for key in excluded_attributes
+                            if key in component.__dict__
+                            or key == "timeseries"
+                            and hasattr(component, "timeseries")]
+                df_component_values.at[component_name, "component_class"] = (
+                    type(component).__module__ + "." + type(component).__qualname__)
+                df_component_values.at[component_name, "state_layout"] = json.dumps(
+                    {"columns": columns, "excluded": excluded,
+                     "pickled": list(pickled)})
+                if pickled:
+                    df_component_values.at[component_name, "state"] = pickle.dumps(
+                        pickled, protocol=pickle.HIGHEST_PROTOCOL)
+
+                timeseries = getattr(component, "timeseries", None)
+                if isinstance(timeseries, pd.Series):
+                    kind = "series"
+                    timeseries = timeseries.to_frame(
+                        "timeseries" if timeseries.name is None else str(timeseries.name))
+                elif isinstance(timeseries, pd.DataFrame) and len(timeseries.columns):
+                    kind = "frame"
                 else:
-                    no_timeseries_lst.append(component)
+                    continue
+                index = pd.DatetimeIndex(timeseries.index)
+                df_component_values.at[component_name, "timeseries_layout"] = json.dumps(
+                    {"kind": kind,
+                     "columns": [str(column) for column in timeseries.columns],
+                     "index_name": index.name,
+                     "tz": None if index.tz is None else str(index.tz)})
+                if index.tz is not None:
+                    index = index.tz_convert("UTC").tz_localize(None)
+                n_steps = len(index)
+                n_columns = len(timeseries.columns)
+                values = np.column_stack([
+                    pd.to_numeric(timeseries[column], errors="coerce").to_numpy(dtype=float)
+                    for column in timeseries.columns])
+                yield pa.RecordBatch.from_arrays([
+                    pa.array(np.tile(index.to_numpy(dtype="datetime64[ns]"), n_columns)),
+                    pa.array([component_name] * (n_steps * n_columns), pa.string()),
+                    pa.array(np.repeat([str(column) for column in timeseries.columns], n_steps)),
+                    pa.array(values.T.ravel()),
+                    pa.array([df_component_values.at[component_name, "technology"]]
+                             * (n_steps * n_columns), pa.string()),
+                    pa.array(np.tile(index.strftime("%Y-%m").to_numpy(dtype=str), n_columns)),
+                ], schema=schema)
+
+        print("Exporting components to parquet:")
+        ds.write_dataset(
+            tqdm(record_batches(), total=len(self.components)),
+            os.path.join(path, "timeseries"),
+            schema=schema,
+            format="parquet",
+            partitioning=ds.partitioning(
+                pa.schema([("technology", pa.string()), ("month", pa.string())]),
+                flavor="hive"),
+            existing_data_behavior="delete_matching",
+        )
 
-        # Close the connection
-        c.close()
-        conn.close()
+        for column, values in sorted(state_columns.items()):
+            dtype = self._parquet_state_types[column.rsplit(".", 1)[1]][1]
+            df_component_values[column] = pd.Series(
+                values, dtype=object).reindex(df_component_values.index
+                                              ).astype(dtype)
 
-        return no_timeseries_lst
+        df_component_values.reset_index(drop=True).to_parquet(
+            os.path.join(path, "components.parquet"))
+
+        with open(os.path.join(path, "virtual_power_plant.json"), "w") as file:
+            json.dump({"name": self.name,
+                       "buses_with_pv": self.buses_with_pv,
+                       "buses_with_hp": self.buses_with_hp,
+                       "buses_with_bev": self.buses_with_bev,
+                       "buses_with_wind": self.buses_with_wind,
+                       "buses_with_storage": self.buses_with_storage},
+                      file, indent=2, default=str)
+
+        return path
+
+    @staticmethod
+    def read_parquet_timeseries(path, names=None, technologies=None,
+                                variables=None, start=None, end=None):
+        """Read a filtered part of the timeseries of a parquet export.
+
+        Only the partitions and row groups matching the filters are read.
+
+        Parameters
+        ----------
+        path : str
+            Directory of the export (see export_to_parquet).
+        names : list, optional
+            Component names to read.
+        technologies : list, optional
+            Technologies to read, e.g. ["pv", "hp"].
+        variables : list, optional
+            Timeseries columns to read, e.g. ["el_demand"].
+        start, end : str or pandas.Timestamp, optional
+            First and last time to read (inclusive).
+
+        Returns
+        -------
+        pandas.DataFrame
+            Long format timeseries with the columns time, name, variable,
+            value and technology.
+        """
+
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(os.path.join(path, "timeseries"),
+                             format="parquet", partitioning="hive")
+
+        expression = None
+
+        def combine(expression, condition):
+            return condition if expression is None else expression & condition
+
+        if names is not None:
+            expression = combine(expression, ds.field("name").isin(list(names)))
+        if technologies is not None:
+            expression = combine(expression,
+                                 ds.field("technology").isin(list(technologies)))
+        if variables is not None:
+            expression = combine(expression,
+                                 ds.field("variable").isin(list(variables)))
+        if start is not None:
+            start = pd.Timestamp(start)
+            expression = combine(expression,
+                                 (ds.field("month") >= start.strftime("%Y-%m"))
+                                 & (ds.field("time") >= start.to_datetime64()))
+        if end is not None:
+            end = pd.Timestamp(end)
+            expression = combine(expression,
+                                 (ds.field("month") <= end.strftime("%Y-%m"))
+                                 & (ds.field("time") <= end.to_datetime64()))
+
+        return dataset.to_table(
+            columns=["time", "name", "variable", "value", "technology"],
+            filter=expression).to_pandas()
+
+    @classmethod
+    def load_from_parquet(cls, path, environment=None, names=None,
+                          technologies=None, start=None, end=None,
+                          trusted=False):
+        """Rebuild a prepared virtual power plant from a parquet export.
+
+        The components are restored from their stored state and get their
+        timeseries from the dataset, prepare_time_series is not run. Only
+        the rows of the selected components are read. The model_attributes
+        (e.g. the pvlib PVSystem and ModelChain of photovoltaic systems)
+        are rebuilt by Component.rebuild_model; the ModelChain of wind
+        power plants, which holds the results of a run, is None (see
+        WindPower.model_results).
+
+        Unpickling runs arbitrary code of the dataset. Components of vpplib
+        are restored from their typed state columns without unpickling.
+        Attributes stored pickled, components of classes outside of vpplib
+        and exports of older versions (which pickle the whole state) are
+        only loaded with trusted=True. Only pass it for datasets of trusted
+        origin.
 
+        Parameters
+        ----------
+        path : str
+            Directory of the export (see export_to_parquet).
+        environment : Environment, optional
+            Environment assigned to all restored components.
+        names : list, optional
+            Only restore these components.
+        technologies : list, optional
+            Only restore components of these technologies.
+        start, end : str or pandas.Timestamp, optional
+            Only restore this part of the timeseries.
+        trusted : bool, optional
+            Allow unpickling and importing classes outside of vpplib
+            (default: False).
+
+        Returns
+        -------
+        VirtualPowerPlant
+            Virtual power plant with the restored components.
+
+        Raises
+        ------
+        ValueError
+            If the export needs unpickling or a class outside of vpplib and
+            trusted is False.
+        """
+
+        with open(os.path.join(path, "virtual_power_plant.json")) as file:
+            vpp_data = json.load(file)
+        vpp = cls(vpp_data.pop("name"))
+        vpp.__dict__.update(vpp_data)
+
+        filters = []
+        if names is not None:
+            filters.append(("name", "in", list(names)))
+        if technologies is not None:
+            filters.append(("technology", "in", list(technologies)))
+        df_components = pd.read_parquet(
+            os.path.join(path, "components.parquet"),
+            filters=filters or None)
+
+        df_timeseries = cls.read_parquet_timeseries(
+            path,
+            names=None if names is None else list(df_components.name),
+            technologies=technologies, start=start, end=end)
+        grouped_timeseries = dict(tuple(df_timeseries.groupby("name", sort=False)))
+
+        for row in df_components.to_dict("records"):
+            if row.get("state_layout") is None:
+                # exports of older versions pickle the whole state
+                if not trusted:
+                    raise ValueError(
+                        "The state of " + row["name"] + " is pickled. "
+                        + "Pass trusted=True to load exports of trusted "
+                        + "origin only.")
+                restored = pickle.loads(row["state"])
+                component_class, state, excluded = restored[:3]
+                columns = restored[3] if len(restored) > 3 else ()
+            else:
+                layout = json.loads(row["state_layout"])
+                component_class = cls._parquet_component_class(
+                    row["component_class"], trusted)
+                state = {}
+                if layout["pickled"]:
+                    if not trusted:
+                        raise ValueError(
+                            "The attributes " + ", ".join(layout["pickled"])
+                            + " of " + row["name"] + " are pickled. Pass "
+                            + "trusted=True to load exports of trusted "
+                            + "origin only.")
+                    state = pickle.loads(row["state"])
+                excluded = layout["excluded"]
+                columns = layout["columns"]
+            component = object.__new__(component_class)
+            component.__dict__.update(state)
+            for column in columns:
+                key, kind = column[len("state."):].rsplit(".", 1)
+                component.__dict__[key] = (
+                    cls._parquet_state_types[kind][0](row[column]))
+            for attribute in excluded:
+                setattr(component, attribute, None)
+            component.environment = environment
+            if row.get("state_layout") is not None:
+                component.rebuild_model()
+            elif ("modelchain" in excluded
+                    and not getattr(component, "lean", False)):
+                component.get_modelchain()
+
+            if row["timeseries_layout"] is not None and row["name"] in grouped_timeseries:
+                layout = json.loads(row["timeseries_layout"])
+                timeseries = grouped_timeseries[row["name"]].pivot(
+                    index="time", columns="variable", values="value")
+                timeseries = timeseries.reindex(columns=layout["columns"])
+                timeseries.columns.name = None
+                timeseries.index.name = layout["index_name"]
+                if layout["tz"] is not None:
+                    timeseries.index = timeseries.index.tz_localize(
+                        "UTC").tz_convert(layout["tz"])
+                if layout["kind"] == "series":
+                    timeseries = timeseries.iloc[:, 0].rename(
+                        None if layout["columns"][0] == "timeseries"
+                        else layout["columns"][0])
+                component.timeseries = timeseries
+
+            vpp.add_component(component)
+
+        return vpp
+
+    @staticmethod
+    def _parquet_component_class(name, trusted):
+        """Import the component class "<module>.<qualname>" of an export.
+
+        Without trusted only classes of vpplib are imported, as importing a
+        module runs its code.
+        """
+        import importlib
+
+        if not trusted and name.split(".")[0] != "vpplib":
+            raise ValueError(
+                "The component class " + name + " is not part of vpplib. "
+                + "Pass trusted=True to load exports of trusted origin only.")
+        module_name, _, qualname = name.rpartition(".")
+        while True:
+            try:
+                component_class = importlib.import_module(module_name)
+                break
+            except ImportError:
+                if "." not in module_name:
+                    raise
+                module_name, _, outer = module_name.rpartition(".")
+                qualname = outer + "." + qualname
+        for attribute in qualname.split("."):
+            component_class = getattr(component_class, attribute)
+        return component_class
 
     def get_buses_with_components(
         self,
@@ -769,153 +1381,187 @@ class VirtualPowerPlant(object):
         bev_percentage=0,
         wind_percentage=0,
         storage_percentage=0,
+        seed=None,
+        stratify_by=None,
     ):
         """
         Info
         ----
-        
-        ...
-        
+        Randomly places components on the buses of a pandapower net and
+        stores the chosen bus names in self.buses_with_pv, buses_with_hp,
+        buses_with_bev, buses_with_wind and buses_with_storage.
+
         Parameters
         ----------
-        
-        ...
-        	
-        Attributes
-        ----------
-        
-        ...
-        
-        Notes
-        -----
-        
-        ...
-        
-        References
-        ----------
-        
-        ...
-        
+        net : pandapower.pandapowerNet
+            The grid.
+        method : str
+            "random" places components on all buses of type "b",
+            "random_loadbus" on all buses with a load.
+        pv_percentage, hp_percentage, bev_percentage, wind_percentage : float
+            Share of the candidate buses in percent getting the technology.
+        storage_percentage : float
+            Share of the buses with pv in percent getting a storage.
+        seed : int or numpy.random.SeedSequence, optional
+            Seed of the placement. The placement equals variant 0 of
+            get_buses_with_components_batch with the same arguments. If
+            None, the seed is drawn from the random module, so
+            random.seed still makes the placement reproducible.
+        stratify_by : str or array-like, optional
+            Column of net.bus or labels aligned with net.bus.index. Every
+            technology is distributed over the strata (e.g. "subnet") in
+            proportion to their number of candidate buses.
+
         Returns
         -------
-        
-        ...
-        
-        """
-
-        if method == "random":
-
-            pv_amount = int(
-                round(
-                    (
-                        len(net.bus.name[net.bus.type == "b"])
-                        * (pv_percentage / 100)
-                    ),
-                    0,
-                )
-            )
-            self.buses_with_pv = random.sample(
-                list(net.bus.name[net.bus.type == "b"]), pv_amount
-            )
-
-            hp_amount = int(
-                round(
-                    (
-                        len(net.bus.name[net.bus.type == "b"])
-                        * (hp_percentage / 100)
-                    ),
-                    0,
-                )
-            )
-            self.buses_with_hp = random.sample(
-                list(net.bus.name[net.bus.type == "b"]), hp_amount
-            )
-
-            bev_amount = int(
-                round(
-                    (
-                        len(net.bus.name[net.bus.type == "b"])
-                        * (bev_percentage / 100)
-                    ),
-                    0,
-                )
-            )
-            self.buses_with_bev = random.sample(
-                list(net.bus.name[net.bus.type == "b"]), bev_amount
-            )
-
-            wind_amount = int(
-                round(
-                    (
-                        len(net.bus.name[net.bus.type == "b"])
-                        * (wind_percentage / 100)
-                    ),
-                    0,
-                )
-            )
-            self.buses_with_wind = random.sample(
-                list(net.bus.name[net.bus.type == "b"]), wind_amount
-            )
+        tuple of list
+            Bus names with pv, hp, bev, wind and storage.
 
-            # Distribution of el storage is only done for houses with pv
-            storage_amount = int(
-                round(
-                    (len(self.buses_with_pv) * (storage_percentage / 100)), 0
-                )
-            )
-            self.buses_with_storage = random.sample(
-                self.buses_with_pv, storage_amount
-            )
-
-            return (
-                self.buses_with_pv,
-                self.buses_with_hp,
-                self.buses_with_bev,
-                self.buses_with_wind,
-                self.buses_with_storage,
-            )
+        """
+        if seed is None:
+            seed = random.getrandbits(64)
+
+        placement = self.get_buses_with_components_batch(
+            net,
+            variants=[0],
+            method=method,
+            pv_percentage=pv_percentage,
+            hp_percentage=hp_percentage,
+            bev_percentage=bev_percentage,
+            wind_percentage=wind_percentage,
+            storage_percentage=storage_percentage,
+            seed=seed,
+            stratify_by=stratify_by,
+        )
 
-        elif method == "random_loadbus":
+        self.buses_with_pv = list(placement["pv"][0])
+        self.buses_with_hp = list(placement["hp"][0])
+        self.buses_with_bev = list(placement["bev"][0])
+        self.buses_with_wind = list(placement["wind"][0])
+        self.buses_with_storage = list(placement["storage"][0])
+
+        return (
+            self.buses_with_pv,
+            self.buses_with_hp,
+            self.buses_with_bev,
+            self.buses_with_wind,
+            self.buses_with_storage,
+        )
 
-            bus_lst = []
-            for bus in net.bus.index:
-                if bus in list(net.load.bus):
-                    bus_lst.append(net.bus.name[bus])
+    @staticmethod
+    def get_buses_with_components_batch(
+        net,
+        variants=1,
+        method="random",
+        pv_percentage=0,
+        hp_percentage=0,
+        bev_percentage=0,
+        wind_percentage=0,
+        storage_percentage=0,
+        seed=0,
+        stratify_by=None,
+        chunk_size=256,
+    ):
+        """
+        Info
+        ----
+        Places components for many Monte-Carlo variants of a grid at once.
 
-            pv_amount = int(round((len(bus_lst) * (pv_percentage / 100)), 0))
-            self.buses_with_pv = random.sample(bus_lst, pv_amount)
+        Every variant draws from its own generator, derived from seed and
+        the variant number. A variant is therefore identical no matter in
+        which batch or process it is generated, e.g. variants 500 to 999 of
+        one process match variants 500 to 999 of a single large batch.
 
-            hp_amount = int(round((len(bus_lst) * (hp_percentage / 100)), 0))
-            self.buses_with_hp = random.sample(bus_lst, hp_amount)
+        Parameters
+        ----------
+        net : pandapower.pandapowerNet
+            The grid.
+        variants : int or iterable of int
+            Number of variants (numbered from 0) or the variant numbers.
+        method, pv_percentage, hp_percentage, bev_percentage,
+        wind_percentage, storage_percentage, stratify_by
+            See get_buses_with_components.
+        seed : int or numpy.random.SeedSequence
+            Seed of the batch.
+        chunk_size : int
+            Number of variants drawn at once. Limits the memory of the
+            random keys to chunk_size x number of candidate buses.
 
-            bev_amount = int(round((len(bus_lst) * (bev_percentage / 100)), 0))
-            self.buses_with_bev = random.sample(bus_lst, bev_amount)
+        Returns
+        -------
+        dict of numpy.ndarray
+            Bus names per technology ("pv", "hp", "bev", "wind",
+            "storage"), each with shape (number of variants, amount).
 
-            wind_amount = int(
-                round((len(bus_lst) * (wind_percentage / 100)), 0)
+        """
+        if isinstance(variants, (int, np.integer)):
+            variants = range(variants)
+        variants = np.asarray(list(variants), dtype=np.int64)
+        if isinstance(seed, np.random.SeedSequence):
+            entropy = seed.entropy
+        else:
+            entropy = seed
+
+        names, strata = _placement_candidates(net, method, stratify_by)
+        n_candidates = len(names)
+
+        amounts = {
+            technology: int(round(n_candidates * (percentage / 100), 0))
+            for technology, percentage in (
+                ("pv", pv_percentage),
+                ("hp", hp_percentage),
+                ("bev", bev_percentage),
+                ("wind", wind_percentage),
             )
-            self.buses_with_wind = random.sample(bus_lst, wind_amount)
+        }
+        # Distribution of el storage is only done for houses with pv
+        amounts["storage"] = int(
+            round(amounts["pv"] * (storage_percentage / 100), 0)
+        )
+        for technology, amount in amounts.items():
+            if amount > n_candidates or amount < 0:
+                raise ValueError(
+                    "Cannot place " + str(amount) + " " + technology
+                    + " on " + str(n_candidates) + " buses"
+                )
 
-            # Distribution of el storage is only done for houses with pv
-            storage_amount = int(
-                round(
-                    (len(self.buses_with_pv) * (storage_percentage / 100)), 0
+        selections = {
+            technology: _stratified_selection(strata, amount)
+            for technology, amount in amounts.items()
+            if technology != "storage"
+        }
+
+        positions = {
+            technology: np.empty((len(variants), amount), dtype=np.int64)
+            for technology, amount in amounts.items()
+        }
+        for start in range(0, len(variants), chunk_size):
+            chunk = variants[start:start + chunk_size]
+            generators = [
+                np.random.default_rng(
+                    np.random.SeedSequence(entropy, spawn_key=(int(variant),))
                 )
-            )
-            self.buses_with_storage = random.sample(
-                self.buses_with_pv, storage_amount
+                for variant in chunk
+            ]
+            rows = slice(start, start + len(chunk))
+            for technology, selection in selections.items():
+                keys = np.stack([rng.random(n_candidates) for rng in generators])
+                if strata is not None:
+                    # Sort by stratum first, then randomly within the stratum
+                    keys += strata
+                ranked = np.argsort(keys, axis=1)
+                positions[technology][rows] = ranked[:, selection]
+
+            keys = np.stack([rng.random(amounts["pv"]) for rng in generators])
+            storage = np.argsort(keys, axis=1)[:, :amounts["storage"]]
+            positions["storage"][rows] = np.take_along_axis(
+                positions["pv"][rows], storage, axis=1
             )
 
-            return (
-                self.buses_with_pv,
-                self.buses_with_hp,
-                self.buses_with_bev,
-                self.buses_with_wind,
-                self.buses_with_storage,
-            )
-
-        else:
-            raise ValueError("method ", method, " is invalid")
+        return {
+            technology: names[position]
+            for technology, position in positions.items()
+        }
 
     def balance_at_timestamp(self, timestamp):
 
@@ -958,13 +1604,185 @@ class VirtualPowerPlant(object):
         result = 0
 
         # Iterate through all components
-        for i in range(0, len(self.components)):
+        for component in self.components.values():
 
             # Get balance for component at timestamp
-            balance = self.components[i].value_for_timestamp(timestamp)
+            balance = component.value_for_timestamp(timestamp)
 
             # Add balance to result
             result += balance
 
         # Return result
         return result
+
+    def balance_for_timestamps(self, timestamps):
+        """
+        Calculates the balance of all components for several timestamps.
+
+        Vectorized equivalent of balance_at_timestamp, which sums the
+        values_for_timestamps of all components.
+
+        Parameters
+        ----------
+        timestamps : list or pandas.DatetimeIndex
+            Timestamps as str ('YYYY-MM-DD hh:mm:ss') or datetime. Integer
+            positions are passed to balance_at_timestamp one by one.
+
+        Returns
+        -------
+        numpy.ndarray
+            Balance of every timestamp.
+        """
+        timestamps = list(timestamps)
+        if all(isinstance(timestamp, (int, np.integer))
+               for timestamp in timestamps):
+            return np.array(
+                [self.balance_at_timestamp(timestamp)
+                 for timestamp in timestamps],
+                dtype=float,
+            )
+
+        index = pd.DatetimeIndex(timestamps)
+        result = np.zeros(len(index))
+        for component in self.components.values():
+            result += component.values_for_timestamps(index)
+
+        return result
+
+
+# %% component placement
+
+def _placement_candidates(net, method, stratify_by=None):
+    """Return the names and stratum codes of the candidate buses."""
+    if method == "random":
+        candidates = (net.bus.type == "b").to_numpy()
+    elif method == "random_loadbus":
+        candidates = np.isin(net.bus.index.to_numpy(), net.load.bus.to_numpy())
+    else:
+        raise ValueError("method ", method, " is invalid")
+
+    names = net.bus.name.to_numpy()[candidates]
+    if stratify_by is None:
+        return names, None
+
+    if isinstance(stratify_by, str):
+        labels = net.bus[stratify_by].to_numpy()
+    else:
+        labels = np.asarray(stratify_by)
+        if len(labels) != len(net.bus):
+            raise ValueError("stratify_by must have one label per bus")
+    strata = pd.factorize(labels[candidates])[0]
+
+    return names, strata
+
+
+def _stratified_selection(strata, amount):
+    """
+    Return the columns to select from candidates ranked by (stratum, key).
+
+    Without strata the first amount candidates are selected. With strata
+    every stratum gets a quota proportional to its size (largest remainder
+    method) and its first quota candidates are selected.
+    """
+    if strata is None:
+        return slice(0, amount)
+
+    counts = np.bincount(strata)
+    exact = amount * counts / len(strata)
+    quota = np.floor(exact).astype(np.int64)
+    remainder = amount - quota.sum()
+    if remainder:
+        quota[np.argsort(quota - exact, kind="stable")[:remainder]] += 1
+
+    sorted_strata = np.sort(strata)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rank = np.arange(len(strata)) - starts[sorted_strata]
+
+    return np.flatnonzero(rank < quota[sorted_strata])
+
+
+# %% technology registry
+
+def _pv_values(component):
+    return {"power_kW": component.peak_power}
+
+
+def _ees_values(component):
+    return {"capacity_kWh": component.capacity,
+            "power_kW": component.max_power,
+            "efficiency_el": component.charge_efficiency}
+
+
+def _wea_values(component):
+    return {"power_kW": component.peak_power}
+
+
+def _bev_values(component):
+    return {"arrival_soc": random.uniform(component.battery_min,
+                                          component.battery_max),
+            "capacity_kWh": component.battery_max,
+            "power_kW": component.charging_power,
+            "efficiency_el": component.charge_efficiency}
+
+
+def _hp_values(component):
+    return {"power_kW": component.el_power}
+
+
+def _tes_values(component):
+    # Formula: E = m * cp * dT
+    return {"capacity_kWh": (component.mass
+                             * component.cp
+                             * (component.hysteresis * 2)  # dT
+                             / 3600),  # convert KJ to kW
+            "efficiency_th": component.efficiency_per_timestep}
+
+
+def _chp_values(component):
+    return {"power_kW": component.el_power,
+            "th_power_kW": component.th_power,
+            "efficiency_el": component.efficiency_el,
+            "efficiency_th": component.efficiency_th}
+
+
+def _hr_values(component):
+    return {"th_power_kW": component.el_power,  #TODO: change to power_kW after the Project
+            "efficiency_th": component.efficiency}  #TODO: Change to el_efficiency after the Project
+
+
+def _pv_timeseries(component):
+    return {"feed_in": component.timeseries[component.identifier] * -1}
+
+
+def _wea_timeseries(component):
+    return {"feed_in": component.timeseries * -1}
+
+
+def _bev_timeseries(component):
+    return {"feed_in": component.timeseries["at_home"]}
+
+
+def _hp_timeseries(component):
+    return {"cop": component.timeseries["cop"],
+            "th_energy": component.timeseries["thermal_energy_output"]}
+
+
+def _chp_timeseries(component):
+    return {"th_energy": component.timeseries["thermal_energy_output"]}
+
+
+VirtualPowerPlant.register_technology(Photovoltaic, "pv", _pv_values,
+                                      _pv_timeseries)
+VirtualPowerPlant.register_technology(ElectricalEnergyStorage, "ees",
+                                      _ees_values)
+VirtualPowerPlant.register_technology(WindPower, "wea", _wea_values,
+                                      _wea_timeseries)
+VirtualPowerPlant.register_technology(BatteryElectricVehicle, "bev",
+                                      _bev_values, _bev_timeseries)
+VirtualPowerPlant.register_technology(HeatPump, "hp", _hp_values,
+                                      _hp_timeseries)
+VirtualPowerPlant.register_technology(ThermalEnergyStorage, "tes",
+                                      _tes_values)
+VirtualPowerPlant.register_technology(CombinedHeatAndPower, "chp",
+                                      _chp_values, _chp_timeseries)
+VirtualPowerPlant.register_technology(HeatingRod, "hr", _hr_values)
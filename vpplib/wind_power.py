@@ -10,12 +10,11 @@ based on wind speed data and turbine specifications. It supports various models
 for wind speed, air density, temperature, and power output calculations.
 """
 
-from .component import Component
+import pandas as pd
 
+from .component import Component
 
-# windpowerlib imports
-from windpowerlib import ModelChain
-from windpowerlib import WindTurbine
+# windpowerlib is imported on first use inside the methods
 
 
 class WindPower(Component):
@@ -59,12 +58,24 @@ class WindPower(Component):
         Hellman exponent for wind speed calculation
     wind_turbine : WindTurbine
         WindTurbine object from windpowerlib
-    ModelChain : ModelChain
-        ModelChain object from windpowerlib
+    ModelChain : ModelChain or None
+        ModelChain object from windpowerlib. None in lean mode, see
+        release_model_results.
+    lean : bool
+        Whether the ModelChain is released after the preparation of the
+        timeseries.
     timeseries : pandas.Series
         Time series of power output in kW
     """
-    
+
+    environment_data = ("wind_data",)
+    cache_attributes = ("timeseries", "wind_turbine", "ModelChain")
+    cache_excluded_attributes = Component.cache_excluded_attributes + (
+        "lean",
+    )
+    state_attributes = ("limit",)
+    model_attributes = ("wind_turbine", "ModelChain")
+
     def __init__(
         self,
         turbine_type,
@@ -82,6 +93,7 @@ class WindPower(Component):
         unit,
         identifier=None,
         environment=None,
+        lean=False,
     ):
         """
         Initialize a WindPower object.
@@ -118,6 +130,11 @@ class WindPower(Component):
             Unique identifier for the wind power component
         environment : Environment, optional
             Environment object containing weather data and simulation parameters
+        lean : bool, optional
+            If True, the ModelChain with its intermediates (wind speed,
+            density and temperature at hub height) is released once the
+            timeseries is prepared, see release_model_results
+            (default: False).
             
         Notes
         -----
@@ -160,6 +177,7 @@ class WindPower(Component):
         self.obstacle_height = obstacle_height  # default: 0
         self.hellman_exp = hellman_exp  # None (default)
         self.ModelChain = None
+        self.lean = lean
 
         self.timeseries = None
 
@@ -188,6 +206,7 @@ class WindPower(Component):
         The 'fetch_curve' parameter determines whether to fetch the power curve
         ('power_curve') or the power coefficient curve ('power_coefficient_curve').
         """
+        from windpowerlib import WindTurbine
 
         # specification of wind turbine where power curve is provided in the oedb
         # if you want to use the power coefficient curve change the value of
@@ -204,6 +223,15 @@ class WindPower(Component):
 
         return self.wind_turbine
 
+    def rebuild_model(self):
+        """Rebuild the WindTurbine with get_wind_turbine.
+
+        Only done if the component had a WindTurbine. The ModelChain, which
+        holds the results of a run, is left None (see model_results).
+        """
+        if "wind_turbine" in self.__dict__:
+            self.get_wind_turbine()
+
     def calculate_power_output(self):
         """
         Calculate the power output of the wind turbine using ModelChain.
@@ -232,6 +260,75 @@ class WindPower(Component):
         The wind data is filtered to the specified time period if start and end
         timestamps are provided in the environment.
         """
+        # initialize ModelChain with own specifications and use run_model method
+        # to calculate power output
+        if self.environment.start == None or self.environment.end == None:
+            self.ModelChain = self.get_modelchain().run_model(
+                self.environment.wind_data
+            )
+
+        else:
+            self.ModelChain = self.get_modelchain().run_model(
+                self.environment.wind_data[
+                    self.environment.start : self.environment.end
+                ]
+            )
+
+        # write power output time series to WindPower.timeseries
+        self.timeseries = self.ModelChain.power_output / 1000  # convert to kW
+
+        if self.lean:
+            self.release_model_results()
+
+        return
+
+    @property
+    def peak_power(self):
+        """Nominal power of the wind turbine in kW."""
+        return self.wind_turbine.nominal_power / 1000
+
+    def release_model_results(self):
+        """
+        Release the windpowerlib ModelChain of the wind turbine.
+
+        The ModelChain keeps the power output and references the weather
+        data of the run. The wind turbine and the timeseries are kept, so
+        the operation and the exports are not affected. The results can be
+        recomputed with model_results.
+        """
+        self.ModelChain = None
+
+    def model_results(self):
+        """
+        Recompute the windpowerlib ModelChain of the simulation period.
+
+        The timeseries and the ModelChain attribute are not changed.
+
+        Returns
+        -------
+        windpowerlib.ModelChain
+            ModelChain after run_model, e.g. with the power_output in W.
+        """
+        if self.environment.start == None or self.environment.end == None:
+            wind_data = self.environment.wind_data
+        else:
+            wind_data = self.environment.wind_data[
+                self.environment.start : self.environment.end
+            ]
+
+        return self.get_modelchain().run_model(wind_data)
+
+    def get_modelchain(self):
+        """
+        Create the windpowerlib ModelChain of the wind turbine.
+
+        Returns
+        -------
+        windpowerlib.ModelChain
+            ModelChain with the model options of the component.
+        """
+        from windpowerlib import ModelChain
+
         # power output calculation for e126
         # own specifications for ModelChain setup
         modelchain_data = {
@@ -249,26 +346,7 @@ class WindPower(Component):
             "hellman_exp": self.hellman_exp,
         }  # None (default) or None
 
-        # initialize ModelChain with own specifications and use run_model method
-        # to calculate power output
-        if self.environment.start == None or self.environment.end == None:
-            self.ModelChain = ModelChain(
-                self.wind_turbine, **modelchain_data
-            ).run_model(self.environment.wind_data)
-
-        else:
-            self.ModelChain = ModelChain(
-                self.wind_turbine, **modelchain_data
-            ).run_model(
-                self.environment.wind_data[
-                    self.environment.start : self.environment.end
-                ]
-            )
-
-        # write power output time series to WindPower.timeseries
-        self.timeseries = self.ModelChain.power_output / 1000  # convert to kW
-
-        return
+        return ModelChain(self.wind_turbine, **modelchain_data)
 
     def prepare_time_series(self):
         """
@@ -380,6 +458,8 @@ class WindPower(Component):
         In the context of a virtual power plant, this method returns a negative value
         as wind power is considered generation (not consumption).
         """
+        if self.stream is not None:
+            return self.stream.value(timestamp) * self.limit
         if type(timestamp) == int:
             return self.timeseries.iloc[timestamp].item() * self.limit
         elif type(timestamp) == str:
@@ -389,6 +469,63 @@ class WindPower(Component):
                 "timestamp needs to be of type int or string. Stringformat: YYYY-MM-DD hh:mm:ss"
             )
 
+    def values_for_timestamps(self, timestamps):
+        """
+        Returns the values for several timestamps at once.
+
+        Vectorized equivalent of value_for_timestamp.
+
+        Parameters
+        ----------
+        timestamps : pandas.DatetimeIndex
+            Timestamps of the timeseries.
+
+        Returns
+        -------
+        numpy.ndarray
+            Power output in kW.
+        """
+        if self.stream is not None:
+            return self.stream.values(timestamps) * self.limit
+        values = self.timeseries.reindex(timestamps)
+        return values.to_numpy(dtype=float) * self.limit
+
+    def step(self, timestamp, data):
+        """
+        Calculate the power output of one timestep in streaming operation.
+
+        Parameters
+        ----------
+        timestamp : str or datetime
+            The timestamp of the timestep.
+        data : dict or pandas.Series
+            A measured power output in kW under the identifier or the
+            weather of the timestep with the (variable, height) columns of
+            environment.wind_data, e.g. ("wind_speed", 10).
+
+        Returns
+        -------
+        dict or None
+            The power output in kW, None if data holds neither a
+            measurement nor wind data.
+        """
+        if self.identifier in data:
+            return {self.identifier: float(data[self.identifier])}
+
+        weather = {key: value for key, value in dict(data).items()
+                   if isinstance(key, tuple)}
+        if not weather:
+            return None
+        if getattr(self, "wind_turbine", None) is None:
+            self.get_wind_turbine()
+        weather = pd.DataFrame(
+            [weather], index=pd.DatetimeIndex([pd.Timestamp(timestamp)])
+        )
+        weather.columns = pd.MultiIndex.from_tuples(weather.columns)
+        power = self.get_modelchain().run_model(weather).power_output
+
+        return {self.identifier: float(power.iloc[0]) / 1000}
+
     def observations_for_timestamp(self, timestamp):
         """
         Get detailed observations for a specific timestamp.